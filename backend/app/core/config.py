@@ -29,6 +29,11 @@ class Settings(BaseSettings):
     VECTOR_STORE_PATH: str = "./backend/vector_store"
     EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
     VECTOR_DB_URL: Optional[str] = None
+    VECTOR_STORE_TIMEOUT: float = 5.0
+    VECTOR_STORE_MAX_CONNECTIONS: int = 100
+    VECTOR_STORE_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    VECTOR_STORE_KEEPALIVE_EXPIRY: float = 30.0
+    VECTOR_STORE_HTTP2: bool = True
     
     # Additional Services
     MCP_ENABLED: Optional[bool] = None
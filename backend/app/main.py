@@ -1,5 +1,6 @@
 from fastapi import FastAPI
 from app.api.api import api_router
+from app.api.endpoints.empathy import empathy_service
 from app.core.config import settings
 
 app = FastAPI(
@@ -11,6 +12,11 @@ app = FastAPI(
 
 app.include_router(api_router, prefix="/api")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close the pooled vector-store connections"""
+    await empathy_service.aclose()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
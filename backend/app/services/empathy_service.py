@@ -1,7 +1,7 @@
 from openai import OpenAI
 from app.core.config import settings
 from typing import Dict, Any, Optional
-import httpx
+from vector_store_client import VectorStoreClient
 import random
 
 class EmpathyService:
@@ -14,49 +14,51 @@ class EmpathyService:
         4. Social skills
         Provide a brief analysis for each aspect."""
         self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
-        self.vector_store_url = settings.VECTOR_DB_URL
+        # Lives as long as the app so lookups reuse pooled connections
+        self.vector_store = VectorStoreClient(
+            settings.VECTOR_DB_URL,
+            timeout=settings.VECTOR_STORE_TIMEOUT,
+            max_connections=settings.VECTOR_STORE_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.VECTOR_STORE_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.VECTOR_STORE_KEEPALIVE_EXPIRY,
+            http2=settings.VECTOR_STORE_HTTP2
+        ) if settings.VECTOR_DB_URL else None
+
+    async def aclose(self) -> None:
+        if self.vector_store is not None:
+            await self.vector_store.aclose()
 
     async def _get_vector_store_response(self, message: str, mode: str) -> Optional[Dict[str, Any]]:
         """Try to get a response from vector store."""
-        if not self.vector_store_url:
+        if self.vector_store is None:
             return None
 
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
-                    f"{self.vector_store_url}/search",
-                    json={
-                        "text": message,
-                        "mode": mode,
-                        "threshold": settings.VECTOR_DB_CONFIDENCE_THRESHOLD,
-                        "limit": 1
-                    }
-                )
-                response.raise_for_status()
-                results = response.json()
-                return results[0] if results else None
-            except Exception as e:
-                print(f"Vector store error: {e}")
-                return None
+        try:
+            results = await self.vector_store.search(
+                message,
+                mode,
+                threshold=settings.VECTOR_DB_CONFIDENCE_THRESHOLD,
+                limit=1
+            )
+            return results[0] if results else None
+        except Exception as e:
+            print(f"Vector store error: {e}")
+            return None
 
     async def _store_successful_response(self, question: str, answer: str, mode: str) -> None:
         """Store successful response in vector store."""
-        if not self.vector_store_url:
+        if self.vector_store is None:
             return
 
-        async with httpx.AsyncClient() as client:
-            try:
-                await client.post(
-                    f"{self.vector_store_url}/store",
-                    json={
-                        "question": question,
-                        "answer": answer,
-                        "mode": mode,
-                        "source": "openai"
-                    }
-                )
-            except Exception as e:
-                print(f"Error storing response: {e}")
+        try:
+            await self.vector_store.store(question, {self._answer_field(mode): answer}, mode)
+        except Exception as e:
+            print(f"Error storing response: {e}")
+
+    @staticmethod
+    def _answer_field(mode: str) -> str:
+        """Field of the stored response that holds the answer for a mode"""
+        return "analysis" if mode == "analyze" else "long_version"
 
     def _should_use_vector_store(self) -> bool:
         """Determine if we should try vector store based on A/B test weights."""
@@ -87,7 +89,7 @@ class EmpathyService:
                 if vector_response:
                     return {
                         "status": "success",
-                        "analysis": vector_response["answer"],
+                        "analysis": vector_response["response"][self._answer_field(mode)],
                         "source": "vector",
                         "response_id": vector_response["id"]
                     }
@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Literal
 from os import getenv
 import logging
 
@@ -63,6 +63,55 @@ class Settings(BaseSettings):
     # OpenAI settings
     openai_api_key: str = Field(default=..., validation_alias='OPENAI_API_KEY')
     openai_model: str = Field(default='gpt-3.5-turbo', validation_alias='OPENAI_MODEL')
+    openai_timeout: float = Field(default=60.0, validation_alias='OPENAI_TIMEOUT')
+    openai_max_connections: int = Field(default=500, validation_alias='OPENAI_MAX_CONNECTIONS')
+    openai_max_keepalive_connections: int = Field(default=100, validation_alias='OPENAI_MAX_KEEPALIVE_CONNECTIONS')
+    
+    # Embedding settings
+    embedding_model: str = Field(default='text-embedding-ada-002', validation_alias='OPENAI_EMBEDDING_MODEL')
+    embedding_cache_size: int = Field(default=10000, validation_alias='EMBEDDING_CACHE_SIZE')
+    embedding_cache_path: Optional[str] = Field(
+        default=None,
+        validation_alias='EMBEDDING_CACHE_PATH',
+        description="SQLite file for the persistent embedding cache tier; memory only when unset"
+    )
+    embedding_cache_disk_max_rows: int = Field(
+        default=100000,
+        validation_alias='EMBEDDING_CACHE_DISK_MAX_ROWS',
+        description="Vectors kept in the SQLite tier; the least recently used are pruned beyond it"
+    )
+    embedding_batch_max_size: int = Field(default=64, validation_alias='EMBEDDING_BATCH_MAX_SIZE')
+    embedding_batch_max_wait_ms: float = Field(default=5.0, validation_alias='EMBEDDING_BATCH_MAX_WAIT_MS')
+    
+    # Completion deadlines and hedging
+    completion_deadline: float = Field(
+        default=20.0,
+        validation_alias='COMPLETION_DEADLINE_SECONDS',
+        description="Per-completion deadline including hedged attempts; streamed completions must produce content within it"
+    )
+    completion_hedge_quantile: float = Field(default=0.95, validation_alias='COMPLETION_HEDGE_QUANTILE')
+    completion_hedge_min_delay: float = Field(
+        default=1.0,
+        validation_alias='COMPLETION_HEDGE_MIN_DELAY',
+        description="Seconds before hedging while too few latencies are known, and the lower bound after"
+    )
+    completion_max_hedges: int = Field(default=1, validation_alias='COMPLETION_MAX_HEDGES')
+    fallback_min_certainty: float = Field(
+        default=0.8,
+        validation_alias='FALLBACK_MIN_CERTAINTY',
+        description="Lowest certainty of a stored match served as a degraded response after a timeout"
+    )
+    fallback_top_k: int = Field(default=3, validation_alias='FALLBACK_TOP_K')
+    
+    # Local model for the local_llm A/B arm (any OpenAI-compatible server, e.g. llama.cpp)
+    local_llm_base_url: Optional[str] = Field(default=None, validation_alias='LOCAL_LLM_BASE_URL')
+    local_llm_model: str = Field(default='qwen2.5-1.5b-instruct', validation_alias='LOCAL_LLM_MODEL')
+    local_llm_timeout: float = Field(default=120.0, validation_alias='LOCAL_LLM_TIMEOUT')
+    local_llm_json_mode: bool = Field(
+        default=True,
+        validation_alias='LOCAL_LLM_JSON_MODE',
+        description="Send response_format=json_object; disable for servers that reject it"
+    )
     
     # Vector DB settings
     vector_db_url: str = Field(default='http://weaviate-db:8080', validation_alias='VECTOR_DB_URL')
@@ -70,11 +119,73 @@ class Settings(BaseSettings):
         default=0.95,  # Increased from 0.3 to require much higher similarity
         description="Confidence threshold for vector database matches"
     )
+    vector_db_max_workers: int = Field(
+        default=32,
+        validation_alias='VECTOR_DB_MAX_WORKERS',
+        description="Threads used to run blocking Weaviate calls off the event loop"
+    )
+    vector_db_connect_timeout: float = Field(default=2.0, validation_alias='VECTOR_DB_CONNECT_TIMEOUT')
+    vector_db_read_timeout: float = Field(default=10.0, validation_alias='VECTOR_DB_READ_TIMEOUT')
+    vector_db_failure_threshold: int = Field(
+        default=5,
+        validation_alias='VECTOR_DB_FAILURE_THRESHOLD',
+        description="Consecutive Weaviate outage errors before the circuit opens"
+    )
+    vector_db_reset_timeout: float = Field(
+        default=30.0,
+        validation_alias='VECTOR_DB_RESET_TIMEOUT',
+        description="Seconds the circuit stays open before a reconnect is probed"
+    )
+    vector_store_url: Optional[str] = Field(
+        default=None,
+        validation_alias='VECTOR_STORE_URL',
+        description="vector-store API to store and search through instead of connecting to Weaviate directly"
+    )
+    vector_store_timeout: float = Field(default=5.0, validation_alias='VECTOR_STORE_TIMEOUT')
+    vector_store_max_connections: int = Field(default=100, validation_alias='VECTOR_STORE_MAX_CONNECTIONS')
+    vector_store_max_keepalive_connections: int = Field(default=20, validation_alias='VECTOR_STORE_MAX_KEEPALIVE_CONNECTIONS')
+    vector_store_keepalive_expiry: float = Field(default=30.0, validation_alias='VECTOR_STORE_KEEPALIVE_EXPIRY')
+    vector_store_http2: bool = Field(default=True, validation_alias='VECTOR_STORE_HTTP2')
+    store_similarity_recheck: bool = Field(
+        default=False,
+        validation_alias='STORE_SIMILARITY_RECHECK',
+        description="Search again right before storing to catch similar messages stored concurrently"
+    )
+    vector_write_batch_size: int = Field(default=100, validation_alias='VECTOR_WRITE_BATCH_SIZE')
+    vector_write_flush_interval: float = Field(
+        default=1.0,
+        validation_alias='VECTOR_WRITE_FLUSH_INTERVAL',
+        description="Seconds a queued object waits for its batch to fill before it is written"
+    )
+    vector_write_max_pending: int = Field(
+        default=10000,
+        validation_alias='VECTOR_WRITE_MAX_PENDING',
+        description="Queued objects before new writes wait for the buffer to drain"
+    )
+    vector_write_max_retries: int = Field(default=3, validation_alias='VECTOR_WRITE_MAX_RETRIES')
+    vector_write_shutdown_timeout: float = Field(
+        default=10.0,
+        validation_alias='VECTOR_WRITE_SHUTDOWN_TIMEOUT',
+        description="Seconds shutdown waits for queued writes before dropping them"
+    )
+    
+    # Batch analysis
+    batch_max_messages: int = Field(default=1000, validation_alias='BATCH_MAX_MESSAGES')
+    batch_max_concurrency: int = Field(default=16, validation_alias='BATCH_MAX_CONCURRENCY')
+    
+    # Exact-match response cache
+    response_cache_max_entries: int = Field(default=10000, validation_alias='RESPONSE_CACHE_MAX_ENTRIES')
+    response_cache_ttl_seconds: float = Field(default=3600.0, validation_alias='RESPONSE_CACHE_TTL_SECONDS')
     
     # AB Testing configuration
     ab_test_openai_weight: float = Field(default=100.0, validation_alias='AB_TEST_OPENAI_WEIGHT')
     ab_test_vector_db_weight: float = Field(default=0.0, validation_alias='AB_TEST_VECTOR_DB_WEIGHT')
     ab_test_local_llm_weight: float = Field(default=0.0, validation_alias='AB_TEST_LOCAL_LLM_WEIGHT')
+    ab_test_salt: str = Field(
+        default='',
+        validation_alias='AB_TEST_SALT',
+        description="Changing the salt reshuffles sticky user/session arm assignments"
+    )
     
     @property
     def ab_test_config(self) -> Dict[str, float]:
@@ -84,6 +195,14 @@ class Settings(BaseSettings):
             "local_llm": self.ab_test_local_llm_weight
         }
     
+    # Analyze pipeline configuration
+    analyze_fanout_enabled: bool = Field(default=True, validation_alias='ANALYZE_FANOUT_ENABLED')
+    rewrite_failure_mode: Literal['fail', 'degrade'] = Field(
+        default='fail',
+        validation_alias='REWRITE_FAILURE_MODE',
+        description="What to do when the rewrite fails during fan-out: fail the request or return the analysis only"
+    )
+    
     # Template configurations
     default_template_id: str = Field(default='ei-analysis', validation_alias='DEFAULT_TEMPLATE_ID')
     ei_system_prompt: str = Field(default=DEFAULT_EI_PROMPT)
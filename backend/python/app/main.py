@@ -1,8 +1,8 @@
 from fastapi import FastAPI, UploadFile, File, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Literal, Optional, Dict, Any
+from typing import Literal, Optional, Dict, Any, AsyncIterator
 import openai
 import os
 from dotenv import load_dotenv
@@ -12,6 +12,7 @@ from app.services.message_processor import MessageProcessor
 from app.config.settings import Settings
 from app.models.api import (
     MessageRequest,
+    BatchMessageRequest,
     RewrittenMessage,
     EmpathyResponse,
     FeedbackRequest,
@@ -47,9 +48,23 @@ app.add_middleware(
 # Initialize message processor
 processor = MessageProcessor(settings)
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await processor.aclose()
+
 @app.get("/")
 async def health_check():
-    return {"status": "healthy"}
+    vector_store = processor.vector_store.health()
+    return {
+        # The API keeps answering without Weaviate, just without stored responses
+        "status": "healthy" if vector_store["state"] == "closed" else "degraded",
+        "vector_store": vector_store
+    }
+
+@app.get("/api/metrics")
+async def get_metrics():
+    """Cache and pipeline metrics of the message processor"""
+    return processor.metrics()
 
 @app.post("/api/rewriteMessage", response_model=RewrittenMessage)
 async def rewrite_message(request: MessageRequest):
@@ -59,7 +74,7 @@ async def rewrite_message(request: MessageRequest):
     """
     try:
         logger.info("Received rewrite request")
-        result = await processor.rewrite_message(request.message)
+        result = await processor.rewrite_message(request.message, request.session_id, request.language)
         logger.info("Successfully rewrote message")
         return result
     except Exception as e:
@@ -74,13 +89,66 @@ async def analyze_message(request: MessageRequest):
     """
     try:
         logger.info("Received analyze request")
-        result = await processor.process_message(request.message)
+        result = await processor.process_message(request.message, request.session_id, request.language)
         logger.info("Successfully analyzed message")
         return result
     except Exception as e:
         logger.error(f"Error in analyze_message: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _ndjson(events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    """Serialize processor events as newline-delimited JSON, ending with an error event on failure"""
+    try:
+        async for event in events:
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+    except Exception as e:
+        logger.error(f"Error while streaming: {str(e)}", exc_info=True)
+        yield json.dumps({"event": "error", "detail": str(e)}, ensure_ascii=False) + "\n"
+
+@app.post("/api/rewriteMessage/stream")
+async def rewrite_message_stream(request: MessageRequest):
+    """
+    Streaming variant of /api/rewriteMessage.
+    Emits NDJSON events: one "section" event per finished version, then "result".
+    """
+    logger.info("Received streaming rewrite request")
+    return StreamingResponse(
+        _ndjson(processor.stream_rewrite(request.message, request.session_id, request.language)),
+        media_type="application/x-ndjson"
+    )
+
+@app.post("/api/analyzeMessage/stream")
+async def analyze_message_stream(request: MessageRequest):
+    """
+    Streaming variant of /api/analyzeMessage.
+    Emits NDJSON events: "analysis_section" per finished section, "rewrite"
+    once both versions are ready, then "result" with the full response.
+    """
+    logger.info("Received streaming analyze request")
+    return StreamingResponse(
+        _ndjson(processor.stream_message(request.message, request.session_id, request.language)),
+        media_type="application/x-ndjson"
+    )
+
+@app.post("/api/analyzeBatch")
+async def analyze_batch(request: BatchMessageRequest):
+    """
+    Analyze a batch of messages.
+    Streams one NDJSON line per input message with its index, status and result,
+    in completion order; a failing message doesn't fail the rest of the batch.
+    """
+    if len(request.messages) > settings.batch_max_messages:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch is limited to {settings.batch_max_messages} messages"
+        )
+    logger.info(f"Received batch analyze request with {len(request.messages)} messages")
+    items = processor.process_batch(request.messages, request.session_id)
+    return StreamingResponse(
+        _ndjson(item.model_dump(mode="json", by_alias=True) async for item in items),
+        media_type="application/x-ndjson"
+    )
+
 @app.post("/api/feedback")
 async def submit_feedback(request: FeedbackRequest):
     """Submit feedback for a message analysis"""
@@ -1,8 +1,16 @@
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Literal
 
 class MessageRequest(BaseModel):
     message: str
+    session_id: Optional[str] = None  # Keeps the user on the same A/B arm
+    # Language code the caller already knows (e.g. from speech-service); uk, ru
+    # and en skip text-based detection, anything else is detected as usual
+    language: Optional[str] = None
+
+class BatchMessageRequest(BaseModel):
+    messages: List[str]
+    session_id: Optional[str] = None
 
 class RewrittenMessage(BaseModel):
     model_config = ConfigDict(
@@ -11,7 +19,8 @@ class RewrittenMessage(BaseModel):
             "example": {
                 "long_version": "",
                 "short_version": "",
-                "additional": None
+                "additional": None,
+                "degraded": False
             }
         }
     )
@@ -19,6 +28,7 @@ class RewrittenMessage(BaseModel):
     long_version: str
     short_version: str
     additional_data: Dict[str, Any] | None = Field(default=None, alias="additional")  # Additional data from Weaviate
+    degraded: bool = False  # True when served from a lower-certainty stored match after a timeout
 
 class SelfAwarenessAnalysis(BaseModel):
     emotional_background: str
@@ -57,6 +67,7 @@ class EmpathyResponse(BaseModel):
                 "long_version": "",
                 "short_version": "",
                 "score": None,
+                "degraded": False,
                 "additional": None
             }
         }
@@ -67,8 +78,16 @@ class EmpathyResponse(BaseModel):
     long_version: str
     short_version: str
     score: str | None = None  # Score/certainty from vector store as string
+    degraded: bool = False  # True when part of the response could not be generated
     additional_data: Dict[str, Any] | None = Field(default=None, alias="additional")  # Additional data from Weaviate
 
+class BatchItemResult(BaseModel):
+    index: int  # Position of the message in the request
+    status: Literal["ok", "error"]
+    source: Literal["cache", "vector_store", "openai", "local_llm"] | None = None
+    result: EmpathyResponse | None = None
+    error: str | None = None
+
 class StoreMessageResponse(BaseModel):
     status: str
     similar_message: Optional['SimilarMessageInfo'] = None
@@ -0,0 +1,105 @@
+import hashlib
+import random
+from typing import Optional, Dict, Any
+
+# Upper bounds (seconds) of the per-arm latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, float("inf"))
+
+# Sources that answered without a completion
+CACHED_SOURCES = ("cache", "vector_store")
+
+
+class ArmStats:
+    """Latency, token and cache-hit counters of one A/B arm."""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.latency_total = 0.0
+        self.latency_histogram = {bucket: 0 for bucket in LATENCY_BUCKETS}
+        self.sources: Dict[str, int] = {}
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def record(self, latency: float, source: Optional[str]) -> None:
+        self.requests += 1
+        self.latency_total += latency
+        for bucket in LATENCY_BUCKETS:
+            if latency <= bucket:
+                self.latency_histogram[bucket] += 1
+                break
+        if source is None:
+            self.errors += 1
+        else:
+            self.sources[source] = self.sources.get(source, 0) + 1
+
+    def metrics(self) -> Dict[str, Any]:
+        answered = self.requests - self.errors
+        cached = sum(self.sources.get(source, 0) for source in CACHED_SOURCES)
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "avg_latency": self.latency_total / self.requests if self.requests else 0.0,
+            "latency_histogram": {
+                f"le_{bucket:g}": count for bucket, count in self.latency_histogram.items()
+            },
+            "sources": dict(self.sources),
+            "cache_hit_rate": cached / answered if answered else 0.0,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.prompt_tokens + self.completion_tokens
+        }
+
+
+class ABRouter:
+    """
+    Weighted A/B assignment of requests to arms (see Settings.ab_test_config).
+    Requests carrying a subject (user or session id) are hashed onto the arms,
+    so the same subject always lands on the same arm for a given salt and set
+    of weights; anonymous requests get an independent random draw.
+    """
+
+    def __init__(self, weights: Dict[str, float], salt: str = "", default_arm: str = "openai"):
+        self.weights = {arm: weight for arm, weight in weights.items() if weight > 0}
+        self.salt = salt
+        self.default_arm = default_arm
+        self._stats = {arm: ArmStats() for arm in weights}
+
+    def _draw(self, subject: Optional[str]) -> float:
+        """A number in [0, 1); deterministic per subject."""
+        if not subject:
+            return random.random()
+        digest = hashlib.sha256(f"{self.salt}\0{subject}".encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big") / 2 ** 64
+
+    def assign(self, subject: Optional[str] = None) -> str:
+        total = sum(self.weights.values())
+        if total <= 0:
+            return self.default_arm
+        point = self._draw(subject) * total
+        for arm, weight in self.weights.items():
+            point -= weight
+            if point < 0:
+                return arm
+        return arm
+
+    def _arm(self, arm: str) -> ArmStats:
+        return self._stats.setdefault(arm, ArmStats())
+
+    def record(self, arm: str, latency: float, source: Optional[str]) -> None:
+        """Record one finished request; a None source marks a failed one."""
+        self._arm(arm).record(latency, source)
+
+    def record_usage(self, arm: str, usage: Any) -> None:
+        """Add the token usage reported by a completion to the arm"""
+        if usage is None:
+            return
+        stats = self._arm(arm)
+        stats.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+        stats.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "weights": dict(self.weights),
+            "arms": {arm: stats.metrics() for arm, stats in self._stats.items()}
+        }
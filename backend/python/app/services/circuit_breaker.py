@@ -0,0 +1,86 @@
+import time
+from typing import Dict, Any
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Tracks the health of a dependency. After `failure_threshold` consecutive
+    failures the circuit opens and calls are refused without touching the
+    dependency. Once `reset_timeout` seconds have passed a single probe call
+    is let through (half-open): success closes the circuit, failure opens it
+    again for another `reset_timeout`.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            return HALF_OPEN
+        return self._state
+
+    def ready(self) -> bool:
+        """Whether a call would currently be let through, without claiming the probe."""
+        state = self.state
+        return state == CLOSED or (state == HALF_OPEN and not self._probing)
+
+    def allow(self) -> bool:
+        """Claim permission for one call; in half-open state only the first caller gets it."""
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and not self._probing:
+            self._state = HALF_OPEN
+            self._probing = True
+            return True
+        self.rejected += 1
+        return False
+
+    @property
+    def probing(self) -> bool:
+        return self._probing
+
+    def release_probe(self) -> None:
+        """Give up a probe that ended without a verdict (e.g. cancelled) so another caller can probe."""
+        if self._probing:
+            self._probing = False
+            self._state = OPEN
+
+    def record_success(self) -> None:
+        self._state = CLOSED
+        self._failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._probing or self._failures >= self.failure_threshold:
+            self.trip()
+
+    def trip(self) -> None:
+        """Open the circuit now, e.g. when the dependency was unreachable at startup."""
+        if self._state != OPEN:
+            self.opened += 1
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._probing = False
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "opened": self.opened,
+            "rejected": self.rejected
+        }
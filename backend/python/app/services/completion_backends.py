@@ -0,0 +1,128 @@
+import json
+import re
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import openai
+import httpx
+
+Messages = List[Dict[str, str]]
+
+
+class CompletionBackend(ABC):
+    """
+    A chat model that answers the ANALYZE/REWRITE prompts with a JSON object.
+    `name` identifies the backend in A/B telemetry and response sources.
+    """
+
+    name: str
+
+    @abstractmethod
+    async def complete(self, messages: Messages) -> Tuple[str, Any]:
+        """Return the completion text and the token usage (None when not reported)."""
+
+    @abstractmethod
+    def stream(self, messages: Messages) -> AsyncIterator[Tuple[str, Any]]:
+        """Yield (content delta, usage) pairs as the completion is generated."""
+
+    def parse(self, content: str) -> Dict[str, Any]:
+        return json.loads(content)
+
+    async def aclose(self) -> None:
+        pass
+
+
+class OpenAIBackend(CompletionBackend):
+    """Chat completions through the OpenAI API in JSON mode."""
+
+    name = "openai"
+
+    def __init__(
+        self,
+        client: openai.AsyncOpenAI,
+        model: str,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        json_mode: bool = True
+    ):
+        self.client = client
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.json_mode = json_mode
+
+    def _options(self) -> Dict[str, Any]:
+        options = {
+            "model": self.model,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens
+        }
+        if self.json_mode:
+            options["response_format"] = {"type": "json_object"}
+        return options
+
+    async def complete(self, messages: Messages) -> Tuple[str, Any]:
+        completion = await self.client.chat.completions.create(messages=messages, **self._options())
+        return completion.choices[0].message.content, getattr(completion, "usage", None)
+
+    async def stream(self, messages: Messages) -> AsyncIterator[Tuple[str, Any]]:
+        stream = await self.client.chat.completions.create(
+            messages=messages,
+            stream=True,
+            # Passed through extra_body: the pinned openai client predates stream_options
+            extra_body={"stream_options": {"include_usage": True}},
+            **self._options()
+        )
+        async for chunk in stream:
+            # The last chunk carries the token usage and no choices
+            content = chunk.choices[0].delta.content if chunk.choices else None
+            yield content or "", getattr(chunk, "usage", None)
+
+    async def aclose(self) -> None:
+        await self.client.close()
+
+
+class LocalLLMBackend(OpenAIBackend):
+    """
+    CPU-hosted model behind an OpenAI-compatible server (llama.cpp server,
+    Ollama, vLLM). Small local models don't always honour JSON mode, so the
+    first JSON object in the reply is extracted when the reply isn't pure JSON.
+    """
+
+    name = "local_llm"
+
+    @classmethod
+    def from_url(
+        cls,
+        base_url: str,
+        model: str,
+        timeout: float = 120.0,
+        json_mode: bool = True
+    ) -> "LocalLLMBackend":
+        client = openai.AsyncOpenAI(
+            base_url=base_url,
+            # Local servers ignore the key, but the client requires one
+            api_key="local",
+            http_client=httpx.AsyncClient(timeout=timeout),
+            max_retries=0
+        )
+        return cls(client, model, json_mode=json_mode)
+
+    def parse(self, content: str) -> Dict[str, Any]:
+        try:
+            return json.loads(content)
+        except json.JSONDecodeError:
+            if match := re.search(r"\{.*\}", content, re.DOTALL):
+                return json.loads(match.group(0))
+            raise
+
+
+def build_local_backend(settings) -> Optional[LocalLLMBackend]:
+    """The local_llm arm's backend, or None when LOCAL_LLM_BASE_URL is not set"""
+    if not settings.local_llm_base_url:
+        return None
+    return LocalLLMBackend.from_url(
+        settings.local_llm_base_url,
+        settings.local_llm_model,
+        timeout=settings.local_llm_timeout,
+        json_mode=settings.local_llm_json_mode
+    )
@@ -0,0 +1,93 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Any, List, Optional, Tuple
+
+EmbedFn = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+# Upper bounds of the batch size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, float("inf"))
+
+
+class EmbeddingBatcher:
+    """
+    Coalesces concurrent single-text embedding requests into batched calls.
+    A batch is sent when it reaches `max_batch_size` items or `max_wait_ms`
+    after its first item arrived, whichever comes first.
+    """
+
+    def __init__(self, embed_fn: EmbedFn, max_batch_size: int = 64, max_wait_ms: float = 5.0):
+        self.embed_fn = embed_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+
+        self.batches = 0
+        self.items = 0
+        self.max_observed_batch = 0
+        self.batch_size_histogram = {bucket: 0 for bucket in BATCH_SIZE_BUCKETS}
+
+    async def embed(self, text: str) -> List[float]:
+        """Queue a text and wait for its vector."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending[:self.max_batch_size], self._pending[self.max_batch_size:]
+        task = asyncio.ensure_future(self._send(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+        # Anything left over starts a new batch window
+        if self._pending:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+
+    async def _send(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        # Identical texts in one window share a single input slot
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        self._record(len(texts))
+        try:
+            vectors = await self.embed_fn(texts)
+            by_text = dict(zip(texts, vectors))
+            for text, future in batch:
+                if not future.done():
+                    future.set_result(by_text[text])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    def _record(self, size: int) -> None:
+        self.batches += 1
+        self.items += size
+        self.max_observed_batch = max(self.max_observed_batch, size)
+        for bucket in BATCH_SIZE_BUCKETS:
+            if size <= bucket:
+                self.batch_size_histogram[bucket] += 1
+                break
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_observed_batch,
+            "batch_size_histogram": {
+                f"le_{bucket:g}": count for bucket, count in self.batch_size_histogram.items()
+            },
+            "pending": len(self._pending)
+        }
@@ -0,0 +1,155 @@
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any
+
+
+class EmbeddingCache:
+    """
+    Content-hash keyed embedding cache.
+    The first tier is a bounded in-process LRU; the optional second tier is a
+    SQLite file that keeps vectors across restarts and warms the LRU on startup.
+    The file holds at most `max_disk_rows` vectors; the least recently used
+    rows are pruned when it grows past that.
+    """
+
+    def __init__(self, max_size: int = 10000, path: Optional[str] = None, max_disk_rows: int = 100000):
+        self.max_size = max_size
+        self.path = path
+        self.max_disk_rows = max_disk_rows
+        self._disk_rows = 0
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._disk: Optional[sqlite3.Connection] = None
+        self._disk_lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+
+        if path:
+            self._disk = sqlite3.connect(path, check_same_thread=False)
+            with self._disk_lock:
+                self._disk.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings ("
+                    "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+                )
+                self._disk.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+                self._disk_rows = self._disk.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+                self._prune()
+                self._disk.commit()
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        """Hash the embedding model and exact text into a cache key."""
+        return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector: List[float]) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _prune(self) -> None:
+        """Delete the least recently used rows over `max_disk_rows`; the caller holds the lock."""
+        excess = self._disk_rows - self.max_disk_rows
+        if excess <= 0:
+            return
+        self._disk.execute(
+            "DELETE FROM embeddings WHERE key IN "
+            "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+            (excess,)
+        )
+        self._disk_rows -= excess
+        self.disk_evictions += excess
+
+    def _disk_get(self, key: str) -> Optional[List[float]]:
+        with self._disk_lock:
+            row = self._disk.execute(
+                "SELECT vector FROM embeddings WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            # Keep vectors that are still read from being pruned
+            self._disk.execute("UPDATE embeddings SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._disk.commit()
+        return array("f", row[0]).tolist()
+
+    def _disk_put(self, key: str, vector: List[float]) -> None:
+        with self._disk_lock:
+            cursor = self._disk.execute(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                (key, array("f", vector).tobytes(), time.time())
+            )
+            if cursor.rowcount:
+                self._disk_rows += 1
+                self._prune()
+            else:
+                self._disk.execute(
+                    "UPDATE embeddings SET vector = ?, last_used = ? WHERE key = ?",
+                    (array("f", vector).tobytes(), time.time(), key)
+                )
+            self._disk.commit()
+
+    async def get(self, key: str) -> Optional[List[float]]:
+        """Look up a vector in memory, then on disk."""
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return self._memory[key]
+
+        if self._disk is not None:
+            vector = await asyncio.to_thread(self._disk_get, key)
+            if vector is not None:
+                self.disk_hits += 1
+                self._remember(key, vector)
+                return vector
+
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, vector: List[float]) -> None:
+        self._remember(key, vector)
+        if self._disk is not None:
+            await asyncio.to_thread(self._disk_put, key, vector)
+
+    def warm(self) -> int:
+        """Load the most recently stored vectors from disk into memory."""
+        if self._disk is None:
+            return 0
+        with self._disk_lock:
+            rows = self._disk.execute(
+                "SELECT key, vector FROM embeddings ORDER BY last_used DESC LIMIT ?",
+                (self.max_size,)
+            ).fetchall()
+        # Oldest first so the most recent rows end up at the MRU end
+        for key, blob in reversed(rows):
+            self._memory[key] = array("f", blob).tolist()
+        return len(rows)
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "size": len(self._memory),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "disk_rows": self._disk_rows,
+            "disk_evictions": self.disk_evictions,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            "persistent": self._disk is not None
+        }
+
+    def close(self) -> None:
+        if self._disk is not None:
+            with self._disk_lock:
+                self._disk.close()
+            self._disk = None
@@ -0,0 +1,98 @@
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Any, TypeVar
+
+T = TypeVar("T")
+
+
+class CompletionTimeout(TimeoutError):
+    """No attempt of a hedged call finished within its deadline."""
+
+
+class HedgedCaller:
+    """
+    Runs upstream calls under a deadline and hedges slow ones: when an attempt
+    hasn't finished after the recent p95 latency (`hedge_quantile`) another
+    attempt is started and the first to succeed wins. Until `min_samples`
+    latencies are known, `min_hedge_delay` is used; it is also the lower bound
+    of the delay. Failures are not retried here; the call fails once every
+    started attempt has failed.
+    """
+
+    def __init__(
+        self,
+        deadline: float = 20.0,
+        hedge_quantile: float = 0.95,
+        min_hedge_delay: float = 1.0,
+        max_hedges: int = 1,
+        window: int = 200,
+        min_samples: int = 20
+    ):
+        self.deadline = deadline
+        self.hedge_quantile = hedge_quantile
+        self.min_hedge_delay = min_hedge_delay
+        self.max_hedges = max_hedges
+        self.min_samples = min_samples
+        self._latencies: "deque[float]" = deque(maxlen=window)
+
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.timeouts = 0
+
+    def hedge_delay(self) -> float:
+        if len(self._latencies) < self.min_samples:
+            return self.min_hedge_delay
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(self.hedge_quantile * len(ordered)))
+        return max(self.min_hedge_delay, ordered[index])
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        self.calls += 1
+        started = time.perf_counter()
+        attempts: Dict[asyncio.Task, int] = {}
+
+        def launch() -> None:
+            attempts[asyncio.ensure_future(fn())] = len(attempts)
+
+        launch()
+        pending = set(attempts)
+        error: BaseException = CompletionTimeout(f"No completion within {self.deadline:g}s")
+        try:
+            async with asyncio.timeout(self.deadline):
+                while pending:
+                    can_hedge = len(attempts) <= self.max_hedges
+                    done, pending = await asyncio.wait(
+                        pending,
+                        timeout=self.hedge_delay() if can_hedge else None,
+                        return_when=asyncio.FIRST_COMPLETED
+                    )
+                    for task in done:
+                        if task.exception() is None:
+                            if attempts[task] > 0:
+                                self.hedge_wins += 1
+                            self._latencies.append(time.perf_counter() - started)
+                            return task.result()
+                        error = task.exception()
+                    if can_hedge and not done:
+                        # Still no answer after the hedge delay: start another attempt
+                        self.hedges += 1
+                        launch()
+                        pending = {task for task in attempts if not task.done()}
+        except TimeoutError:
+            self.timeouts += 1
+            raise CompletionTimeout(f"No completion within {self.deadline:g}s") from None
+        finally:
+            for task in attempts:
+                task.cancel()
+        raise error
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "timeouts": self.timeouts,
+            "hedge_delay": self.hedge_delay()
+        }
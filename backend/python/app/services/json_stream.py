@@ -0,0 +1,59 @@
+import json
+from typing import Any, List, Optional, Tuple
+
+
+class JsonSectionParser:
+    """
+    Incrementally splits a streamed JSON object into its top-level members.
+    Feed it completion tokens as they arrive; every call returns the
+    (key, value) pairs whose values were completed by that chunk.
+    """
+
+    def __init__(self):
+        self._chars: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member_start: Optional[int] = None
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far."""
+        return "".join(self._chars)
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        members = []
+        for char in chunk:
+            position = len(self._chars)
+            self._chars.append(char)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+                if self._depth == 1 and char == "{":
+                    self._member_start = position + 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    members.extend(self._member(position))
+                    self._member_start = None
+            elif char == "," and self._depth == 1:
+                members.extend(self._member(position))
+                self._member_start = position + 1
+        return members
+
+    def _member(self, end: int) -> List[Tuple[str, Any]]:
+        if self._member_start is None:
+            return []
+        fragment = "".join(self._chars[self._member_start:end]).strip()
+        if not fragment:
+            return []
+        return list(json.loads("{" + fragment + "}").items())
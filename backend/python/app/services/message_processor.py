@@ -1,13 +1,15 @@
+import asyncio
 import random
-from typing import Optional, Dict, Any
+import time
+from typing import Optional, Dict, Any, AsyncIterator, Awaitable, Callable, List, Tuple
 import openai
-import weaviate
 import httpx
 from app.config.settings import Settings
 from app.models.api import (
     EmpathyResponse, 
     EmpathyAnalysis, 
     StoreMessageResponse, 
+    BatchItemResult,
     SimilarMessageInfo,
     SelfAwarenessAnalysis,
     SelfRegulationAnalysis,
@@ -16,97 +18,123 @@ from app.models.api import (
     RewrittenMessage
 )
 from app.prompts import PromptType, get_prompt
+from app.services.vector_store import VectorStore
+from app.services.remote_vector_store import RemoteVectorStore
+from app.services.embedding_cache import EmbeddingCache
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.single_flight import SingleFlight
+from app.services.response_cache import ResponseCache
+from app.services.json_stream import JsonSectionParser
+from app.services.write_buffer import WriteBehindBuffer
+from app.services.request_context import RequestContext
+from app.services.ab_router import ABRouter
+from app.services.completion_backends import CompletionBackend, OpenAIBackend, build_local_backend
+from app.services.hedging import HedgedCaller, CompletionTimeout
 import re
 import json
 import uuid
 
+# Languages the prompts have instructions for; a caller-supplied language
+# (e.g. detected by speech-service) outside this set falls back to detection
+SUPPORTED_LANGUAGES = ("uk", "ru", "en")
+
+def normalize_message(message: str) -> str:
+    """Collapse whitespace so trivially different copies of a message compare equal"""
+    return " ".join(message.split())
+
 class MessageProcessor:
-    def __init__(self, settings: Settings):
+    def __init__(
+        self,
+        settings: Settings,
+        openai_client: Optional[openai.AsyncOpenAI] = None,
+        vector_store: Optional[VectorStore | RemoteVectorStore] = None,
+        local_backend: Optional[CompletionBackend] = None
+    ):
         self.settings = settings
-        self.openai_client = openai.OpenAI(api_key=settings.openai_api_key)
-        try:
-            self.vector_client = weaviate.Client(
-                url=settings.vector_db_url
+        # One pooled HTTP client shared by every completion and embedding request
+        self.openai_client = openai_client or openai.AsyncOpenAI(
+            api_key=settings.openai_api_key,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.openai_max_connections,
+                    max_keepalive_connections=settings.openai_max_keepalive_connections
+                ),
+                timeout=settings.openai_timeout
             )
-            self._ensure_schema()
-        except Exception as e:
-            print(f"Failed to initialize Weaviate client: {e}")
-            self.vector_client = None  # We'll handle this in methods that use vector_client
-        
-    def _ensure_schema(self):
-        """Ensure the Weaviate schema exists."""
-        try:
-            # Try to get the schema first
-            schema = self.vector_client.schema.get()
-            classes = [c["class"] for c in schema.get("classes", [])]
-            if "ChatMessage" in classes:
-                print("ChatMessage schema already exists")
-                return
-                
-            # Create schema if it doesn't exist
-            class_obj = {
-                "class": "ChatMessage",
-                "vectorizer": "text2vec-transformers",
-                "moduleConfig": {
-                    "text2vec-transformers": {
-                        "vectorizeClassName": False
-                    }
-                },
-                "properties": [
-                    {
-                        "name": "message",
-                        "dataType": ["text"],
-                        "moduleConfig": {
-                            "text2vec-transformers": {
-                                "skip": False,
-                                "vectorizePropertyName": False
-                            }
-                        }
-                    },
-                    {
-                        "name": "response",
-                        "dataType": ["text"],
-                        "moduleConfig": {
-                            "text2vec-transformers": {
-                                "skip": True
-                            }
-                        }
-                    },
-                    {
-                        "name": "feedback",
-                        "dataType": ["text"],
-                        "moduleConfig": {
-                            "text2vec-transformers": {
-                                "skip": True
-                            }
-                        }
-                    },
-                    {
-                        "name": "type",
-                        "dataType": ["text"],
-                        "moduleConfig": {
-                            "text2vec-transformers": {
-                                "skip": True
-                            }
-                        }
-                    },
-                    {
-                        "name": "rating",
-                        "dataType": ["int"],
-                        "moduleConfig": {
-                            "text2vec-transformers": {
-                                "skip": True
-                            }
-                        }
-                    }
-                ]
-            }
-            self.vector_client.schema.create_class(class_obj)
-            print("Successfully created ChatMessage schema")
-        except Exception as e:
-            print(f"Error ensuring schema: {e}")
-            if "already exists" not in str(e):
-                raise
+        )
+        # Completion backend per A/B arm; arms without their own backend use OpenAI
+        self.backends: Dict[str, CompletionBackend] = {
+            "openai": OpenAIBackend(self.openai_client, settings.openai_model)
+        }
+        if local_backend is None:
+            local_backend = build_local_backend(settings)
+        if local_backend is not None:
+            self.backends["local_llm"] = local_backend
+        elif settings.ab_test_local_llm_weight > 0:
+            print("AB_TEST_LOCAL_LLM_WEIGHT is set but LOCAL_LLM_BASE_URL is not; the local_llm arm will use OpenAI")
+        # Each backend hedges against its own latency distribution
+        self.hedgers = {
+            name: HedgedCaller(
+                deadline=settings.completion_deadline,
+                hedge_quantile=settings.completion_hedge_quantile,
+                min_hedge_delay=settings.completion_hedge_min_delay,
+                max_hedges=settings.completion_max_hedges
+            )
+            for name in self.backends
+        }
+        if vector_store is None:
+            # Through the vector-store API when it is configured, otherwise straight to Weaviate
+            vector_store = RemoteVectorStore(settings) if settings.vector_store_url else VectorStore(settings)
+            vector_store.connect()
+        self.vector_store = vector_store
+        # New objects are written with batch imports off the request path
+        self.write_buffer = WriteBehindBuffer(
+            vector_store,
+            max_batch_size=settings.vector_write_batch_size,
+            flush_interval=settings.vector_write_flush_interval,
+            max_pending=settings.vector_write_max_pending,
+            max_retries=settings.vector_write_max_retries,
+            on_drop=self._on_write_dropped
+        )
+        self.embedding_cache = EmbeddingCache(
+            max_size=settings.embedding_cache_size,
+            path=settings.embedding_cache_path,
+            max_disk_rows=settings.embedding_cache_disk_max_rows
+        )
+        if warmed := self.embedding_cache.warm():
+            print(f"Warmed embedding cache with {warmed} vectors")
+        self.embedding_batcher = EmbeddingBatcher(
+            self._embed_batch,
+            max_batch_size=settings.embedding_batch_max_size,
+            max_wait_ms=settings.embedding_batch_max_wait_ms
+        )
+        self.single_flight = SingleFlight()
+        self.response_cache = ResponseCache(
+            max_entries=settings.response_cache_max_entries,
+            ttl_seconds=settings.response_cache_ttl_seconds
+        )
+        self.router = ABRouter(settings.ab_test_config, salt=settings.ab_test_salt)
+
+    async def aclose(self) -> None:
+        """Release pooled connections and worker threads"""
+        for backend in self.backends.values():
+            await backend.aclose()
+        await self.write_buffer.close(self.settings.vector_write_shutdown_timeout)
+        await self.vector_store.aclose()
+        self.embedding_cache.close()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Runtime metrics of the processor's caches and pools"""
+        return {
+            "embedding_cache": self.embedding_cache.metrics(),
+            "embedding_batches": self.embedding_batcher.metrics(),
+            "single_flight": self.single_flight.metrics(),
+            "response_cache": self.response_cache.metrics(),
+            "write_buffer": self.write_buffer.metrics(),
+            "vector_store": self.vector_store.health(),
+            "ab_test": self.router.metrics(),
+            "completions": {name: hedger.metrics() for name, hedger in self.hedgers.items()}
+        }
         
     def _detect_language(self, text: str) -> str:
         """
@@ -155,239 +183,652 @@ class MessageProcessor:
             }
         
         return FullAnalysis(**analysis_data)
+
+    def _backend(self, context: RequestContext) -> CompletionBackend:
+        return self.backends.get(context.arm, self.backends["openai"])
+
+    def _prompt_messages(self, prompt_type: PromptType, context: RequestContext) -> List[Dict[str, str]]:
+        """The same ANALYZE/REWRITE prompts are sent to every backend"""
+        return [
+            {
+                "role": "system",
+                "content": get_prompt(prompt_type, context.lang)
+            },
+            {
+                "role": "user",
+                "content": context.message
+            }
+        ]
+
+    async def _complete_json(self, prompt_type: PromptType, context: RequestContext) -> Dict[str, Any]:
+        """
+        Run a JSON-mode chat completion for the given prompt and parse the result.
+        Slow calls are hedged; CompletionTimeout is raised when the deadline passes.
+        """
+        backend = self._backend(context)
+        messages = self._prompt_messages(prompt_type, context)
+        content, usage = await self.hedgers[backend.name].call(lambda: backend.complete(messages))
+        self.router.record_usage(context.arm, usage)
+        context.source = backend.name
+        return backend.parse(content)
+
+    async def _stream_completion(self, prompt_type: PromptType, context: RequestContext) -> AsyncIterator[str]:
+        """
+        Run a JSON-mode chat completion and yield its content as it is generated.
+        CompletionTimeout is raised when no content arrives within the deadline;
+        once the first chunk is in, the rest of the stream isn't timed.
+        """
+        backend = self._backend(context)
+        context.source = backend.name
+        chunks = backend.stream(self._prompt_messages(prompt_type, context))
+        deadline = asyncio.get_running_loop().time() + self.settings.completion_deadline
+        try:
+            first = True
+            while True:
+                try:
+                    if first:
+                        async with asyncio.timeout_at(deadline):
+                            content, usage = await anext(chunks)
+                    else:
+                        content, usage = await anext(chunks)
+                except StopAsyncIteration:
+                    return
+                except TimeoutError:
+                    self.hedgers[backend.name].timeouts += 1
+                    raise CompletionTimeout(f"No streamed content within {self.settings.completion_deadline:g}s")
+                self.router.record_usage(context.arm, usage)
+                if content:
+                    first = False
+                    yield content
+        finally:
+            await chunks.aclose()
+
+    async def _analyze_and_rewrite(self, context: RequestContext) -> Tuple[Dict[str, Any], Optional[RewrittenMessage]]:
+        """
+        Issue the ANALYZE completion and the rewrite concurrently and join the results.
+        Returns the analysis data and the rewritten message, or None for the rewrite
+        when it failed and rewrite_failure_mode is 'degrade'.
+        """
+        analysis_result, rewrite_result = await asyncio.gather(
+            self._complete_json(PromptType.ANALYZE, context),
+            self._shared_rewrite(self._new_context(context.message, context.arm, context.lang)),
+            return_exceptions=True
+        )
+        if isinstance(analysis_result, BaseException):
+            raise analysis_result
+        if isinstance(rewrite_result, BaseException):
+            if self.settings.rewrite_failure_mode != "degrade":
+                raise rewrite_result
+            print(f"Rewrite failed, returning degraded response: {rewrite_result}")
+            return analysis_result, None
+        return analysis_result, rewrite_result
         
-    async def rewrite_message(self, message: str) -> RewrittenMessage:
+    def _request_key(self, message: str, mode: str, arm: str, lang: str) -> str:
+        """Key identifying requests that must produce the same result"""
+        return f"{mode}\0{arm}\0{lang}\0{normalize_message(message)}"
+
+    def _response_cache_key(self, context: RequestContext, mode: str) -> str:
+        """Responses are only reused for the same language and A/B arm"""
+        return ResponseCache.make_key(normalize_message(context.message), mode, context.lang, context.arm)
+
+    def _cache_response(self, context: RequestContext, mode: str, response) -> None:
+        """Remember a response that is backed by a vector store object"""
+        if response.additional_data and (object_id := response.additional_data.get("id")):
+            self.response_cache.put(self._response_cache_key(context, mode), response, object_id)
+
+    def _new_context(self, message: str, arm: str, lang: Optional[str] = None) -> RequestContext:
+        """`lang` is a language code the caller already knows; detected from the text when missing or unsupported"""
+        if lang not in SUPPORTED_LANGUAGES:
+            lang = self._detect_language(message)
+        return RequestContext(message=message, lang=lang, arm=arm)
+
+    async def _routed(
+        self,
+        message: str,
+        session_id: Optional[str],
+        run: Callable[[RequestContext], Awaitable[Any]],
+        language: Optional[str] = None
+    ) -> Any:
+        """Assign the request to an A/B arm, run it and record the arm's telemetry"""
+        context = self._new_context(message, self.router.assign(session_id), language)
+        started = time.perf_counter()
+        try:
+            response = await run(context)
+        except Exception:
+            self.router.record(context.arm, time.perf_counter() - started, None)
+            raise
+        self.router.record(context.arm, time.perf_counter() - started, context.source)
+        return response
+
+    async def rewrite_message(self, message: str, session_id: Optional[str] = None, language: Optional[str] = None) -> RewrittenMessage:
         """Rewrite a message to be more empathetic without analysis"""
+        return await self._routed(message, session_id, self._shared_rewrite, language)
+
+    async def _shared_rewrite(self, context: RequestContext) -> RewrittenMessage:
+        # Identical concurrent requests share one completion and one insert
+        response, shared = await self.single_flight.do(
+            self._request_key(context.message, "rewrite", context.arm, context.lang),
+            lambda: self._rewrite_message(context)
+        )
+        if shared:
+            context.source = "shared"
+            return response.model_copy(deep=True)
+        return response
+
+    async def _rewrite_message(self, context: RequestContext) -> RewrittenMessage:
         try:
             # First check if we have a similar message in vector store
-            if self._should_use_vector_store():
-                print("Using vector store...")
-                vector_response = await self._get_vector_store_response(message, mode="rewrite")
-                if vector_response:
-                    print(f"Got vector response with score: {vector_response.score}")
-                    return RewrittenMessage(
-                        long_version=vector_response.long_version,
-                        short_version=vector_response.short_version,
-                        additional_data=vector_response.additional_data
-                    )
+            if self._uses_vector_store(context):
+                if stored := await self._lookup_rewrite(context):
+                    return stored
 
             # If no vector response or not using vector store, proceed with OpenAI
             print("Using OpenAI...")
-            # Detect message language
-            lang = self._detect_language(message)
-            
-            # Get rewrite prompt
-            rewrite_prompt = get_prompt(PromptType.REWRITE, lang)
-            
             # Get rewritten versions
-            rewrite_completion = self.openai_client.chat.completions.create(
-                model=self.settings.openai_model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": rewrite_prompt
-                    },
-                    {
-                        "role": "user",
-                        "content": message
-                    }
-                ],
-                temperature=0.7,
-                max_tokens=2000,
-                response_format={"type": "json_object"}
-            )
-            
-            # Parse response
-            rewrite_text = rewrite_completion.choices[0].message.content
-            rewrite_data = json.loads(rewrite_text)
-            
-            # Create response object
-            response = RewrittenMessage(**rewrite_data)
-            
-            # Store in vector database if available
-            if self.vector_client:
-                # Get vector representation
-                vector = await self._get_message_vector(message)
-                
-                # Store the message
-                result = self.vector_client.data_object.create(
-                    class_name="ChatMessage",
-                    data_object={
-                        "message": message,
-                        "response": json.dumps(rewrite_data),
-                        "feedback": "positive",
-                        "type": "rewrite"
-                    },
-                    vector=vector
-                )
-                
-                # Add the ID to the response
-                response.additional_data = {"id": result}
-            
-            return response
+            rewrite_data = await self._complete_json(PromptType.REWRITE, context)
+            return await self._store_rewrite(context, rewrite_data)
+        except CompletionTimeout as e:
+            if fallback := await self._nearest_match(context, "rewrite"):
+                print(f"Rewrite timed out, returning nearest stored rewrite: {e}")
+                response = RewrittenMessage.model_validate(json.loads(fallback["response"]))
+                response.additional_data = {"id": fallback["_additional"]["id"]}
+                response.degraded = True
+                return response
+            print(f"Error rewriting message: {str(e)}")
+            raise
         except Exception as e:
             print(f"Error rewriting message: {str(e)}")
             raise
 
-    def _should_use_vector_store(self) -> bool:
-        """Determine if we should try vector store based on A/B test weights."""
-        print(f"A/B test weights - OpenAI: {self.settings.ab_test_openai_weight}, Vector DB: {self.settings.ab_test_vector_db_weight}")
-        # Always use vector store if its weight is greater than 0
-        should_use = self.settings.ab_test_vector_db_weight > 0
-        print(f"Should use vector store: {should_use}")
-        return should_use
+    async def _lookup_rewrite(self, context: RequestContext) -> Optional[RewrittenMessage]:
+        """Find a stored rewrite for the message in the exact-match cache or the vector store"""
+        # Byte-identical repeats are answered without an embedding or a search
+        if (cached := self.response_cache.get(self._response_cache_key(context, "rewrite"))) is not None:
+            print("Got exact-match cached response")
+            context.source = "cache"
+            return cached
 
-    async def _get_vector_store_response(self, message: str, mode: str = "analyze") -> Optional[EmpathyResponse]:
+        print("Using vector store...")
+        vector_response = await self._get_vector_store_response(context, mode="rewrite")
+        if vector_response:
+            print(f"Got vector response with score: {vector_response.score}")
+            response = RewrittenMessage(
+                long_version=vector_response.long_version,
+                short_version=vector_response.short_version,
+                additional_data=vector_response.additional_data
+            )
+            self._cache_response(context, "rewrite", response)
+            context.source = "vector_store"
+            return response
+        return None
+
+    async def _store_rewrite(self, context: RequestContext, rewrite_data: Dict[str, Any]) -> RewrittenMessage:
+        """Build the rewrite response and store it in the vector database if available"""
+        message = context.message
+        # Create response object
+        response = RewrittenMessage(**rewrite_data)
+        
+        # Store in vector database if available
+        if self.vector_store.available:
+            # Queue the message for the next batch import
+            result = await self.write_buffer.add(
+                data_object=self._rewrite_object(message, rewrite_data),
+                vector=await self._context_vector(context)
+            )
+            
+            # Add the ID to the response
+            response.additional_data = {"id": result}
+            self._cache_response(context, "rewrite", response)
+        
+        return response
+
+    def _uses_vector_store(self, context: RequestContext) -> bool:
+        """Whether the request's A/B arm answers from stored responses first"""
+        print(f"A/B test arm: {context.arm}")
+        return context.arm == "vector_db"
+
+    async def _context_vector(self, context: RequestContext) -> List[float]:
+        """Embedding of the request's message, computed at most once per request"""
+        if context.vector is None:
+            context.vector = await self._get_message_vector(context.message)
+        return context.vector
+
+    async def _search_similar(self, context: RequestContext, mode: str) -> List[Dict[str, Any]]:
+        """Near-vector matches of the request's message for a mode, recorded on the context"""
+        messages = await self.vector_store.search_near_vector(
+            await self._context_vector(context),
+            certainty=self.settings.vector_db_confidence_threshold,
+            mode=mode,
+            text=context.message
+        )
+        context.matches[mode] = messages
+        return messages
+
+    async def _get_vector_store_response(self, context: RequestContext, mode: str = "analyze") -> Optional[EmpathyResponse]:
         """Try to get a response from vector store."""
         try:
-            if not self.vector_client:
+            if not self.vector_store.available:
                 return None
 
             print(f"Vector store confidence threshold from settings: {self.settings.vector_db_confidence_threshold}")
-            # Get vector representation of the message
-            vector = await self._get_message_vector(message)
-
             # Search for similar messages with matching type
-            query = (
-                self.vector_client.query
-                .get("ChatMessage", ["message", "response", "type"])
-                .with_near_vector({
-                    "vector": vector,
-                    "certainty": self.settings.vector_db_confidence_threshold
-                })
-                .with_where({
-                    "operator": "Equal",
-                    "path": ["type"],
-                    "valueText": mode
-                })
-                .with_additional(["certainty", "id"])
-                .with_limit(1)
-            )
-            
-            result = query.do()
+            messages = await self._search_similar(context, mode)
             
             # Check if similar message found
-            if messages := result.get("data", {}).get("Get", {}).get("ChatMessage", []):
-                message_data = messages[0]
-                response_data = json.loads(message_data["response"])
-                certainty = message_data["_additional"]["certainty"]
-                message_id = message_data["_additional"]["id"]
-                
-                # Create response object
-                response = EmpathyResponse.model_validate(response_data)
-                # Add the message ID to additional_data field
-                response.additional_data = {"id": message_id}
-                # Add certainty as score
-                response.score = str(certainty)
-                
-                return response
+            if messages:
+                return self._response_from_match(messages[0])
                 
             return None
         except Exception as e:
             print(f"Error getting vector store response: {e}")
             return None
 
-    async def process_message(self, message: str) -> EmpathyResponse:
+    def _response_from_match(self, message_data: Dict[str, Any]) -> EmpathyResponse:
+        """Build a response from a ChatMessage search result"""
+        response_data = json.loads(message_data["response"])
+        certainty = message_data["_additional"]["certainty"]
+        message_id = message_data["_additional"]["id"]
+        
+        # Create response object
+        response = EmpathyResponse.model_validate(response_data)
+        # Add the message ID to additional_data field
+        response.additional_data = {"id": message_id}
+        # Add certainty as score
+        response.score = str(certainty)
+        
+        return response
+
+    async def process_message(self, message: str, session_id: Optional[str] = None, language: Optional[str] = None) -> EmpathyResponse:
         """Process a text message and return empathy analysis"""
+        return await self._routed(message, session_id, self._shared_analysis, language)
+
+    async def _shared_analysis(self, context: RequestContext) -> EmpathyResponse:
+        # Identical concurrent requests share one analysis and one insert
+        response, shared = await self.single_flight.do(
+            self._request_key(context.message, "analyze", context.arm, context.lang),
+            lambda: self._process_message(context)
+        )
+        if shared:
+            context.source = "shared"
+            return response.model_copy(deep=True)
+        return response
+
+    async def _process_message(self, context: RequestContext) -> EmpathyResponse:
         try:
             # Check vector store first based on A/B test
-            if self._should_use_vector_store():
-                print("Using vector store...")
-                vector_response = await self._get_vector_store_response(message, mode="analyze")
-                if vector_response:
-                    print(f"Got vector response with score: {vector_response.score}")
-                    return vector_response
+            if self._uses_vector_store(context):
+                if stored := await self._lookup_analysis(context):
+                    return stored
 
             # If no vector response or not using vector store, proceed with OpenAI
             print("Using OpenAI...")
-            lang = self._detect_language(message)
-            analyze_prompt = get_prompt(PromptType.ANALYZE, lang)
-            
-            analysis_completion = self.openai_client.chat.completions.create(
-                model=self.settings.openai_model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": analyze_prompt
-                    },
-                    {
-                        "role": "user",
-                        "content": message
-                    }
-                ],
-                temperature=0.7,
-                max_tokens=2000,
-                response_format={"type": "json_object"}
+            if self.settings.analyze_fanout_enabled:
+                # Both completions are independent, so run them at the same time
+                analysis_data, rewritten = await self._analyze_and_rewrite(context)
+            else:
+                analysis_data = await self._complete_json(PromptType.ANALYZE, context)
+                rewritten = await self._shared_rewrite(self._new_context(context.message, context.arm, context.lang))
+            return await self._store_analysis(context, analysis_data, rewritten)
+        except CompletionTimeout as e:
+            if fallback := await self._nearest_match(context, "analyze"):
+                print(f"Analysis timed out, returning nearest stored analysis: {e}")
+                response = self._response_from_match(fallback)
+                response.degraded = True
+                return response
+            print(f"Error processing message: {str(e)}")
+            raise
+        except Exception as e:
+            print(f"Error processing message: {str(e)}")
+            raise
+
+    async def _nearest_match(self, context: RequestContext, mode: str) -> Optional[Dict[str, Any]]:
+        """
+        Best stored match for a request whose completion timed out, searching the
+        top fallback_top_k results down to fallback_min_certainty, i.e. also below
+        the regular vector_db_confidence_threshold.
+        """
+        if not self.vector_store.available:
+            return None
+        try:
+            matches = await self.vector_store.search_near_vector(
+                await self._context_vector(context),
+                certainty=self.settings.fallback_min_certainty,
+                mode=mode,
+                limit=self.settings.fallback_top_k,
+                text=context.message
             )
-            
-            # Get the analysis
-            analysis_text = analysis_completion.choices[0].message.content
-            analysis_data = json.loads(analysis_text)
-            print(f"Got OpenAI analysis: {analysis_data}")
-            
-            # Then, get the rewritten versions using the rewrite_message method
-            rewritten = await self.rewrite_message(message)
-            print(f"Got rewritten versions: {rewritten}")
-            
-            # Combine the results
+        except Exception as e:
+            print(f"Error searching for a fallback match: {e}")
+            return None
+        if not matches:
+            return None
+        context.source = "fallback"
+        return max(matches, key=lambda match: match["_additional"]["certainty"])
+
+    async def _lookup_analysis(self, context: RequestContext) -> Optional[EmpathyResponse]:
+        """Find a stored analysis for the message in the exact-match cache or the vector store"""
+        # Byte-identical repeats are answered without an embedding or a search
+        if (cached := self.response_cache.get(self._response_cache_key(context, "analyze"))) is not None:
+            print("Got exact-match cached response")
+            context.source = "cache"
+            return cached
+
+        print("Using vector store...")
+        vector_response = await self._get_vector_store_response(context, mode="analyze")
+        if vector_response:
+            print(f"Got vector response with score: {vector_response.score}")
+            self._cache_response(context, "analyze", vector_response)
+            context.source = "vector_store"
+            return vector_response
+        return None
+
+    async def _store_analysis(
+        self,
+        context: RequestContext,
+        analysis_data: Dict[str, Any],
+        rewritten: Optional[RewrittenMessage]
+    ) -> EmpathyResponse:
+        """Combine the analysis with the rewrite and store the result if it is complete"""
+        message = context.message
+        print(f"Got OpenAI analysis: {analysis_data}")
+        print(f"Got rewritten versions: {rewritten}")
+        
+        # Combine the results
+        if rewritten is None or rewritten.degraded:
+            result = {
+                "analysis": analysis_data,
+                "long_version": rewritten.long_version if rewritten else "",
+                "short_version": rewritten.short_version if rewritten else "",
+                "degraded": True
+            }
+        else:
             result = {
                 "analysis": analysis_data,
                 "long_version": rewritten.long_version,
                 "short_version": rewritten.short_version
             }
+        
+        # Create response
+        response = EmpathyResponse(**result)
+        print(f"Created response object: {response}")
+        
+        # Store successful OpenAI response in vector store
+        if response.degraded:
+            print("Degraded response, skipping storage")
+        elif self.vector_store.available:  # Only store if we have a vector client
+            print("Attempting to store response in vector store...")
+            store_result = await self.store_good_message(message, response, mode="analyze", context=context)
+            print(f"Store result: {store_result}")
             
-            # Create response
-            response = EmpathyResponse(**result)
-            print(f"Created response object: {response}")
-            
-            # Store successful OpenAI response in vector store
-            if self.vector_client:  # Only store if we have a vector client
-                print("Attempting to store response in vector store...")
-                store_result = await self.store_good_message(message, response, mode="analyze")
-                print(f"Store result: {store_result}")
-                
-                # If the message was stored (not just found similar), the ID will be in additional_data
-                if store_result.status == "stored":
-                    print(f"Message stored with ID: {response.additional_data['id']}")
-                elif store_result.status == "similar_exists" and store_result.similar_message:
-                    # Use the ID from the similar message
-                    response.additional_data = {"id": store_result.similar_message.response.additional_data["id"]}
-                    print(f"Using existing message ID: {response.additional_data['id']}")
-            else:
-                print("No vector client available, skipping storage")
-            
-            return response
-        except Exception as e:
-            print(f"Error processing message: {str(e)}")
+            # If the message was stored (not just found similar), the ID will be in additional_data
+            if store_result.status == "stored":
+                print(f"Message stored with ID: {response.additional_data['id']}")
+            elif store_result.status == "similar_exists" and store_result.similar_message:
+                # Use the ID from the similar message
+                response.additional_data = {"id": store_result.similar_message.response.additional_data["id"]}
+                print(f"Using existing message ID: {response.additional_data['id']}")
+            self._cache_response(context, "analyze", response)
+        else:
+            print("No vector client available, skipping storage")
+        
+        return response
+
+    async def _routed_stream(
+        self,
+        message: str,
+        session_id: Optional[str],
+        stream: Callable[[RequestContext], AsyncIterator[Dict[str, Any]]],
+        language: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Streaming counterpart of _routed; latency is measured up to the last event"""
+        context = self._new_context(message, self.router.assign(session_id), language)
+        started = time.perf_counter()
+        try:
+            async for event in stream(context):
+                yield event
+        except Exception:
+            self.router.record(context.arm, time.perf_counter() - started, None)
             raise
+        self.router.record(context.arm, time.perf_counter() - started, context.source)
 
-    async def store_good_message(self, message: str, response: EmpathyResponse, mode: str = "analyze") -> StoreMessageResponse:
-        """Store a good message-response pair in the vector database if similar doesn't exist"""
+    def stream_rewrite(self, message: str, session_id: Optional[str] = None, language: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Rewrite a message and yield NDJSON-ready events as they become available:
+        a "section" event per completed version, then the final "result".
+        Stored responses are yielded immediately as the "result".
+        """
+        return self._routed_stream(message, session_id, self._stream_rewrite, language)
+
+    async def _stream_rewrite(self, context: RequestContext) -> AsyncIterator[Dict[str, Any]]:
+        if self._uses_vector_store(context):
+            if stored := await self._lookup_rewrite(context):
+                yield {"event": "result", "source": context.source, "data": stored.model_dump(mode="json", by_alias=True)}
+                return
+
+        parser = JsonSectionParser()
+        async for chunk in self._stream_completion(PromptType.REWRITE, context):
+            for section, value in parser.feed(chunk):
+                yield {"event": "section", "section": section, "data": value}
+
+        response = await self._store_rewrite(context, json.loads(parser.text))
+        yield {"event": "result", "source": context.source, "data": response.model_dump(mode="json", by_alias=True)}
+
+    def stream_message(self, message: str, session_id: Optional[str] = None, language: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Analyze a message and yield NDJSON-ready events as they become available:
+        an "analysis_section" event per completed analysis section, a "rewrite"
+        event with both versions as soon as the rewrite is done, then the final
+        "result". Stored responses are yielded immediately as the "result".
+        """
+        return self._routed_stream(message, session_id, self._stream_message, language)
+
+    async def _stream_message(self, context: RequestContext) -> AsyncIterator[Dict[str, Any]]:
+        if self._uses_vector_store(context):
+            if stored := await self._lookup_analysis(context):
+                yield {"event": "result", "source": context.source, "data": stored.model_dump(mode="json", by_alias=True)}
+                return
+
+        events: asyncio.Queue = asyncio.Queue()
+        parser = JsonSectionParser()
+
+        async def stream_analysis() -> Dict[str, Any]:
+            async for chunk in self._stream_completion(PromptType.ANALYZE, context):
+                for section, value in parser.feed(chunk):
+                    await events.put({"event": "analysis_section", "section": section, "data": value})
+            return json.loads(parser.text)
+
+        async def rewrite() -> RewrittenMessage:
+            rewritten = await self._shared_rewrite(self._new_context(context.message, context.arm, context.lang))
+            await events.put({
+                "event": "rewrite",
+                "data": {
+                    "long_version": rewritten.long_version,
+                    "short_version": rewritten.short_version
+                }
+            })
+            return rewritten
+
+        analysis_task = asyncio.create_task(stream_analysis())
+        rewrite_task = asyncio.create_task(rewrite())
+        tasks = {analysis_task, rewrite_task}
         try:
-            # Get vector representation of the message
-            vector = await self._get_message_vector(message)
+            # Forward events from both completions in the order they arrive
+            while tasks:
+                getter = asyncio.create_task(events.get())
+                done, _ = await asyncio.wait(tasks | {getter}, return_when=asyncio.FIRST_COMPLETED)
+                if getter in done:
+                    yield getter.result()
+                else:
+                    getter.cancel()
+                tasks -= done
+            while not events.empty():
+                yield events.get_nowait()
 
-            # First check if similar message exists
-            query = (
-                self.vector_client.query
-                .get("ChatMessage", ["message", "response", "type"])
-                .with_near_vector({
-                    "vector": vector,
-                    "certainty": self.settings.vector_db_confidence_threshold
-                })
-                .with_where({
-                    "operator": "Equal",
-                    "path": ["type"],
-                    "valueText": mode
-                })
-                .with_additional(["certainty", "id"])
-                .with_limit(1)
+            analysis_data = analysis_task.result()
+            try:
+                rewritten = rewrite_task.result()
+            except Exception as e:
+                if self.settings.rewrite_failure_mode != "degrade":
+                    raise
+                print(f"Rewrite failed, returning degraded response: {e}")
+                rewritten = None
+
+            response = await self._store_analysis(context, analysis_data, rewritten)
+            yield {"event": "result", "source": context.source, "data": response.model_dump(mode="json", by_alias=True)}
+        finally:
+            for task in (analysis_task, rewrite_task):
+                task.cancel()
+
+    async def process_batch(self, messages: List[str], session_id: Optional[str] = None) -> AsyncIterator[BatchItemResult]:
+        """
+        Analyze many messages, yielding one result per input position as soon as it is resolved.
+        Duplicates are computed once, vector store hits are resolved in bulk, misses
+        run through bounded-concurrency completions and new results are queued on the
+        write-behind buffer. A failing message only fails its own items.
+        The whole batch is routed to one A/B arm; each item is recorded on it
+        with its latency from the start of the batch.
+        """
+        arm = self.router.assign(session_id)
+        started = time.perf_counter()
+        # Group input positions by normalized text so duplicates are computed once
+        positions: Dict[str, List[int]] = {}
+        originals: Dict[str, str] = {}
+        for index, message in enumerate(messages):
+            key = normalize_message(message)
+            positions.setdefault(key, []).append(index)
+            originals.setdefault(key, message)
+
+        def items(key: str, **fields) -> List[BatchItemResult]:
+            results = [BatchItemResult(index=index, **fields) for index in positions[key]]
+            latency = time.perf_counter() - started
+            for result in results:
+                self.router.record(arm, latency, result.source if result.status == "ok" else None)
+            return results
+
+        pending = []
+        for key in positions:
+            if key:
+                pending.append(key)
+            else:
+                for item in items(key, status="error", error="Message is empty"):
+                    yield item
+        contexts = {key: self._new_context(originals[key], arm) for key in pending}
+
+        vectors: Dict[str, List[float]] = {}
+        use_vector_store = self.vector_store.available
+        if use_vector_store and arm == "vector_db":
+            misses = []
+            for key in pending:
+                if (cached := self.response_cache.get(self._response_cache_key(contexts[key], "analyze"))) is not None:
+                    for item in items(key, status="ok", source="cache", result=cached):
+                        yield item
+                else:
+                    misses.append(key)
+            pending = misses
+
+            # Concurrent lookups are coalesced into batched embeddings requests
+            embedded = await asyncio.gather(
+                *(self._get_message_vector(originals[key]) for key in pending),
+                return_exceptions=True
             )
-            
-            result = query.do()
+            vectors = {
+                key: vector for key, vector in zip(pending, embedded)
+                if not isinstance(vector, BaseException)
+            }
+            searched = [key for key in pending if key in vectors]
+            try:
+                matches = await self.vector_store.search_near_vector_many(
+                    [vectors[key] for key in searched],
+                    certainty=self.settings.vector_db_confidence_threshold,
+                    mode="analyze",
+                    texts=[originals[key] for key in searched]
+                )
+            except Exception as e:
+                print(f"Error in bulk vector search: {e}")
+                matches = [[] for _ in searched]
+
+            hits = set()
+            for key, found in zip(searched, matches):
+                if found:
+                    response = self._response_from_match(found[0])
+                    self._cache_response(contexts[key], "analyze", response)
+                    hits.add(key)
+                    for item in items(key, status="ok", source="vector_store", result=response):
+                        yield item
+            pending = [key for key in pending if key not in hits]
+
+        semaphore = asyncio.Semaphore(self.settings.batch_max_concurrency)
+
+        async def analyze(key: str):
+            async with semaphore:
+                context = contexts[key]
+                try:
+                    analysis_data, rewrite_data = await asyncio.gather(
+                        self._complete_json(PromptType.ANALYZE, context),
+                        self._complete_json(PromptType.REWRITE, context)
+                    )
+                    response = EmpathyResponse(
+                        analysis=analysis_data,
+                        long_version=rewrite_data["long_version"],
+                        short_version=rewrite_data["short_version"]
+                    )
+                    return key, response, rewrite_data, None
+                except Exception as e:
+                    return key, None, None, e
+
+        async def store(key: str, response: EmpathyResponse, rewrite_data: Dict[str, Any]) -> None:
+            if not use_vector_store:
+                return
+            try:
+                if key not in vectors:
+                    vectors[key] = await self._get_message_vector(originals[key])
+                object_id = await self.write_buffer.add(self._analysis_object(originals[key], response), vectors[key])
+                await self.write_buffer.add(self._rewrite_object(originals[key], rewrite_data), vectors[key])
+                response.additional_data = {"id": object_id}
+                self._cache_response(contexts[key], "analyze", response)
+            except Exception as e:
+                print(f"Error queueing batch item for import: {e}")
+
+        tasks = [asyncio.create_task(analyze(key)) for key in pending]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                key, response, rewrite_data, error = await next_done
+                if error is not None:
+                    print(f"Error analyzing batch item: {error}")
+                    for item in items(key, status="error", error=str(error)):
+                        yield item
+                    continue
+
+                await store(key, response, rewrite_data)
+                for item in items(key, status="ok", source=contexts[key].source, result=response):
+                    yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def store_good_message(
+        self,
+        message: str,
+        response: EmpathyResponse,
+        mode: str = "analyze",
+        context: Optional[RequestContext] = None
+    ) -> StoreMessageResponse:
+        """
+        Store a good message-response pair in the vector database if similar doesn't exist.
+        The embedding and search results already on `context` are reused; the search is
+        only repeated when store_similarity_recheck is enabled.
+        """
+        try:
+            if context is None:
+                context = self._new_context(message, "vector_db")
+
+            # First check if similar message exists
+            messages = context.matches.get(mode)
+            if messages is None or self.settings.store_similarity_recheck:
+                messages = await self._search_similar(context, mode)
 
             # Check if similar message found
-            if messages := result.get("data", {}).get("Get", {}).get("ChatMessage", []):
+            if messages:
                 similar_message = messages[0]
                 response_data = json.loads(similar_message["response"])
                 similar_response = EmpathyResponse.model_validate(response_data)
@@ -402,27 +843,10 @@ class MessageProcessor:
                     )
                 )
             
-            # If no similar message found, store the new one
-            response_data = response.model_dump()
-            # Remove id field if it's None to avoid Weaviate validation error
-            if response_data.get('id') is None:
-                del response_data['id']
-            # Handle score field
-            if response_data.get('score') is None:
-                response_data['score'] = "0"  # Default score as string
-            else:
-                response_data['score'] = str(response_data['score'])
-                
-            result = self.vector_client.data_object.create(
-                class_name="ChatMessage",
-                data_object={
-                    "message": message,
-                    "response": json.dumps(response_data),
-                    "feedback": "positive",
-                    "type": mode,
-                    "rating": 0  # Initial rating
-                },
-                vector=vector
+            # If no similar message found, queue the new one for the next batch import
+            result = await self.write_buffer.add(
+                data_object=self._analysis_object(message, response, mode),
+                vector=await self._context_vector(context)
             )
             
             # Update response with the new ID in additional_data field
@@ -433,6 +857,34 @@ class MessageProcessor:
             print(f"Error in store_good_message: {e}")
             raise
 
+    def _analysis_object(self, message: str, response: EmpathyResponse, mode: str = "analyze") -> Dict[str, Any]:
+        """ChatMessage properties for a stored analysis response"""
+        response_data = response.model_dump()
+        # Remove id field if it's None to avoid Weaviate validation error
+        if response_data.get('id') is None:
+            del response_data['id']
+        # Handle score field
+        if response_data.get('score') is None:
+            response_data['score'] = "0"  # Default score as string
+        else:
+            response_data['score'] = str(response_data['score'])
+        return {
+            "message": message,
+            "response": json.dumps(response_data),
+            "feedback": "positive",
+            "type": mode,
+            "rating": 0  # Initial rating
+        }
+
+    def _rewrite_object(self, message: str, rewrite_data: Dict[str, Any]) -> Dict[str, Any]:
+        """ChatMessage properties for a stored rewrite response"""
+        return {
+            "message": message,
+            "response": json.dumps(rewrite_data),
+            "feedback": "positive",
+            "type": "rewrite"
+        }
+
     async def remove_from_vector_db(self, message: str, response: EmpathyResponse):
         """Remove a message-response pair from the vector database"""
         try:
@@ -440,46 +892,44 @@ class MessageProcessor:
             vector = await self._get_message_vector(message)
 
             # Find and delete similar vectors
-            query = (
-                self.vector_client.query
-                .get("ChatMessage", ["_additional {id}"])
-                .with_near_vector({
-                    "vector": vector,
-                    "certainty": 0.95  # High certainty for deletion
-                })
-                .with_limit(1)
+            objects = await self.vector_store.search_near_vector(
+                vector,
+                certainty=0.95,  # High certainty for deletion
+                text=message
             )
-            
-            result = query.do()
 
             # Delete if found
-            if objects := result.get("data", {}).get("Get", {}).get("ChatMessage", []):
+            if objects:
                 object_id = objects[0]["_additional"]["id"]
-                self.vector_client.data_object.delete(
-                    class_name="ChatMessage",
-                    uuid=object_id
-                )
+                await self.vector_store.delete(object_id)
+                self.response_cache.invalidate_id(object_id)
         except Exception as e:
             print(f"Error in remove_from_vector_db: {e}")
             # Don't raise - removal is optional
 
     async def _get_message_vector(self, message: str) -> list:
         """Get vector representation of a message using OpenAI embeddings"""
-        response = self.openai_client.embeddings.create(
-            model="text-embedding-ada-002",
-            input=message
+        cache_key = EmbeddingCache.make_key(self.settings.embedding_model, message)
+        if (vector := await self.embedding_cache.get(cache_key)) is not None:
+            return vector
+
+        # Concurrent callers are coalesced into one batched embeddings request
+        vector = await self.embedding_batcher.embed(message)
+        await self.embedding_cache.put(cache_key, vector)
+        return vector
+
+    async def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed several texts with a single OpenAI embeddings request"""
+        response = await self.openai_client.embeddings.create(
+            model=self.settings.embedding_model,
+            input=texts
         )
-        return response.data[0].embedding
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
 
-    def _list_all_objects(self):
+    async def _list_all_objects(self):
         """List all objects in the database for debugging"""
         try:
-            result = (
-                self.vector_client.query
-                .get("ChatMessage", ["message", "response", "feedback"])
-                .with_additional(["id"])
-                .do()
-            )
+            result = await self.vector_store.list_all()
             print(f"All objects in database: {result}")
             return result
         except Exception as e:
@@ -489,13 +939,17 @@ class MessageProcessor:
     async def process_feedback(self, message_id: str, liked: bool) -> None:
         """Process feedback for a message"""
         try:
-            if not self.vector_client:
+            if not self.vector_store.available:
                 print("Vector client not initialized")
                 return
+
+            # The vector-store API keeps feedback with the object and can't list, rate or delete
+            remote = isinstance(self.vector_store, RemoteVectorStore)
             
             # List all objects for debugging
-            print("Current objects in database:")
-            self._list_all_objects()
+            if not remote:
+                print("Current objects in database:")
+                await self._list_all_objects()
             
             # Validate UUID format
             try:
@@ -506,23 +960,22 @@ class MessageProcessor:
                 print(f"Invalid UUID format: {message_id}")
                 raise ValueError("Invalid message ID format")
 
-            # Get current object to check rating
-            result = (
-                self.vector_client.query
-                .get("ChatMessage", ["rating"])
-                .with_where({
-                    "operator": "Equal",
-                    "path": ["id"],
-                    "valueString": message_id
-                })
-                .do()
-            )
+            # Make sure a freshly queued object has reached Weaviate
+            if self.write_buffer.is_pending(message_id) and not await self.write_buffer.wait_for(message_id):
+                print(f"Message {message_id} was never stored")
+                return
+
+            if remote:
+                await self.vector_store.feedback(message_id, liked)
+                if not liked:
+                    # Stop answering from a disliked response
+                    self.response_cache.invalidate_id(message_id)
+                return
 
-            current_rating = 0  # Default rating
-            if objects := result.get("data", {}).get("Get", {}).get("ChatMessage", []):
-                rating = objects[0].get("rating")
-                # Handle None rating
-                current_rating = 0 if rating is None else rating
+            # Get current object to check rating
+            rating = await self.vector_store.get_rating(message_id)
+            # Handle None rating
+            current_rating = 0 if rating is None else rating
 
             new_rating = current_rating + (1 if liked else -1)
             print(f"Updating rating from {current_rating} to {new_rating}")
@@ -530,17 +983,14 @@ class MessageProcessor:
             if new_rating <= 0 and not liked:
                 # Delete the message if rating is 0 or below and got a dislike
                 print(f"Deleting message {message_id} due to negative rating")
-                self.vector_client.data_object.delete(
-                    class_name="ChatMessage",
-                    uuid=message_id
-                )
+                await self.vector_store.delete(message_id)
+                self.response_cache.invalidate_id(message_id)
                 print(f"Successfully deleted message {message_id}")
             else:
                 # Update rating
                 print(f"Updating rating to {new_rating} for message {message_id}")
-                self.vector_client.data_object.update(
-                    uuid=message_id,
-                    class_name="ChatMessage",
+                await self.vector_store.update(
+                    message_id,
                     data_object={
                         "rating": new_rating,
                         "feedback": "positive" if liked else "negative"
@@ -550,26 +1000,26 @@ class MessageProcessor:
             
             # List objects after update for verification
             print("Objects after update:")
-            self._list_all_objects()
+            await self._list_all_objects()
         except Exception as e:
             print(f"Error processing feedback: {e}")
             raise
 
+    def _on_write_dropped(self, object_id: str) -> None:
+        """Stop serving responses that point to an object the buffer failed to write"""
+        self.response_cache.invalidate_id(object_id)
+
     async def clear_vector_store(self) -> None:
         """Clear all objects from the vector store"""
         try:
-            if not self.vector_client:
+            if not self.vector_store.available:
                 print("Vector client not initialized")
                 return
                 
-            # Delete all objects of class ChatMessage
-            self.vector_client.batch.delete_objects(
-                class_name="ChatMessage",
-                where={
-                    "operator": "NotNull",
-                    "path": ["id"]
-                }
-            )
+            # Delete all objects of class ChatMessage, including queued ones
+            await self.write_buffer.flush()
+            await self.vector_store.clear()
+            self.response_cache.clear()
             print("Vector store cleared successfully")
         except Exception as e:
             print(f"Error clearing vector store: {e}")
@@ -0,0 +1,191 @@
+import asyncio
+import json
+from typing import Optional, Dict, Any, List, Tuple
+import httpx
+from vector_store_client import VectorStoreClient
+from app.config.settings import Settings
+from app.services.circuit_breaker import CircuitBreaker, CLOSED
+from app.services.vector_store import VectorStoreUnavailable
+
+# The vector-store API calls rewrites "edit"
+SERVICE_MODES = {"analyze": "analyze", "rewrite": "edit"}
+
+
+def is_service_outage(error: Exception) -> bool:
+    """Errors that mean the vector-store API is unreachable or failing, as opposed to a rejected request"""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return isinstance(error, (httpx.TransportError, VectorStoreUnavailable))
+
+
+def certainty_to_score(certainty: float) -> float:
+    """Weaviate certainty is 1 - distance / 2, the API's score is 1 - distance"""
+    return max(0.0, 2.0 * certainty - 1.0)
+
+
+def score_to_certainty(score: float) -> float:
+    return (1.0 + score) / 2.0
+
+
+class RemoteVectorStore:
+    """
+    The VectorStore interface on top of the vector-store API, so MessageProcessor
+    stores and searches through the service instead of its own Weaviate
+    connection. Used when VECTOR_STORE_URL is set.
+
+    The processor's embeddings (from EmbeddingCache) are sent with every
+    search and store, so the service never vectorizes a message itself; the
+    collection behind VECTOR_STORE_URL must hold vectors from the same
+    OPENAI_EMBEDDING_MODEL only.
+
+    Matches come back in the shape of ChatMessage search results. The API has
+    no delete, list or rating update: feedback goes through /feedback and the
+    service keeps it with the object.
+    """
+
+    def __init__(self, settings: Settings, client: Optional[VectorStoreClient] = None):
+        self.settings = settings
+        self.client = client or VectorStoreClient(
+            settings.vector_store_url,
+            timeout=settings.vector_store_timeout,
+            max_connections=settings.vector_store_max_connections,
+            max_keepalive_connections=settings.vector_store_max_keepalive_connections,
+            keepalive_expiry=settings.vector_store_keepalive_expiry,
+            http2=settings.vector_store_http2
+        )
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.vector_db_failure_threshold,
+            reset_timeout=settings.vector_db_reset_timeout
+        )
+
+    @property
+    def available(self) -> bool:
+        return self.breaker.ready()
+
+    def health(self) -> Dict[str, Any]:
+        return {"connected": True, **self.breaker.metrics(), "client": self.client.metrics()}
+
+    def connect(self) -> bool:
+        """Nothing to set up; the first request opens a pooled connection."""
+        return True
+
+    async def _run(self, call):
+        """Await one API call, guarded by the circuit breaker."""
+        if not self.breaker.allow():
+            raise VectorStoreUnavailable("vector-store circuit is open")
+        probe = self.breaker.probing
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            if probe:
+                self.breaker.release_probe()
+            raise
+        except Exception as e:
+            if is_service_outage(e):
+                self.breaker.record_failure()
+                if self.breaker.state != CLOSED:
+                    print(f"vector-store unavailable, opening circuit for {self.breaker.reset_timeout:g}s: {e}")
+            else:
+                self.breaker.record_success()
+            raise
+        if probe:
+            print("vector-store reachable again, circuit closed")
+        self.breaker.record_success()
+        return result
+
+    @staticmethod
+    def _match(item: Dict[str, Any], mode: str) -> Dict[str, Any]:
+        """A ChatMessage-shaped search result from an API response"""
+        fields = ("analysis", "long_version", "short_version") if mode == "analyze" else ("long_version", "short_version")
+        return {
+            "message": item["message"],
+            "response": json.dumps({name: item["response"].get(name) for name in fields}),
+            "type": mode,
+            "_additional": {"id": item["id"], "certainty": score_to_certainty(item.get("score") or 0.0)}
+        }
+
+    async def search_near_vector(
+        self,
+        vector: List[float],
+        certainty: float,
+        mode: Optional[str] = None,
+        limit: int = 1,
+        text: str = ""
+    ) -> List[Dict[str, Any]]:
+        """Stored messages closer than `certainty`, best first; without `mode` both modes are searched."""
+        matches = []
+        for found_mode in [mode] if mode else SERVICE_MODES:
+            found = await self._run(lambda: self.client.search(
+                text,
+                SERVICE_MODES[found_mode],
+                threshold=certainty_to_score(certainty),
+                limit=limit,
+                vector=vector
+            ))
+            matches.extend(self._match(item, found_mode) for item in found)
+        matches.sort(key=lambda match: match["_additional"]["certainty"], reverse=True)
+        return matches[:limit]
+
+    async def search_near_vector_many(
+        self,
+        vectors: List[List[float]],
+        certainty: float,
+        mode: Optional[str] = None,
+        limit: int = 1,
+        texts: Optional[List[str]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """One search per vector, sent concurrently over the pooled client."""
+        texts = texts or [""] * len(vectors)
+        return list(await asyncio.gather(*(
+            self.search_near_vector(vector, certainty, mode, limit, text)
+            for vector, text in zip(vectors, texts)
+        )))
+
+    async def create_many(
+        self,
+        objects: List[Tuple[Dict[str, Any], List[float]]],
+        ids: List[str]
+    ) -> List[Optional[str]]:
+        """
+        Store ChatMessage objects under their ids; None marks objects that failed.
+        The stores run concurrently; the service batches its own imports.
+        """
+        async def store(data_object: Dict[str, Any], vector: List[float], object_id: str) -> Optional[str]:
+            try:
+                await self._run(lambda: self.client.store(
+                    data_object["message"],
+                    json.loads(data_object["response"]),
+                    SERVICE_MODES[data_object["type"]],
+                    vector=vector,
+                    object_id=object_id
+                ))
+                return object_id
+            except VectorStoreUnavailable:
+                raise
+            except Exception as e:
+                print(f"Storing object {object_id} failed: {e}")
+                return None
+
+        results = await asyncio.gather(
+            *(store(data_object, vector, object_id) for (data_object, vector), object_id in zip(objects, ids)),
+            return_exceptions=True
+        )
+        if any(isinstance(result, VectorStoreUnavailable) for result in results):
+            # The whole batch is held; objects already stored are overwritten under the same id
+            raise VectorStoreUnavailable("vector-store circuit is open")
+        return [None if isinstance(result, BaseException) else result for result in results]
+
+    async def feedback(self, object_id: str, liked: bool) -> None:
+        await self._run(lambda: self.client.feedback(object_id, liked))
+
+    async def delete(self, object_id: str) -> None:
+        raise NotImplementedError("The vector-store API can't delete objects")
+
+    async def list_all(self):
+        raise NotImplementedError("The vector-store API can't list objects")
+
+    async def clear(self) -> None:
+        raise NotImplementedError("The vector-store API can't delete objects")
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
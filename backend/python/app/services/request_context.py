@@ -0,0 +1,19 @@
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, List
+
+
+@dataclass
+class RequestContext:
+    """
+    State computed once per request and reused by later pipeline stages:
+    the detected language, the message embedding and the near-vector search
+    results per mode. A mode missing from `matches` has not been searched yet.
+    `arm` is the A/B arm the request was assigned to and `source` records
+    what finally answered it (cache, vector_store, shared or a completion backend).
+    """
+    message: str
+    lang: str
+    arm: str = "openai"
+    source: str = "openai"
+    vector: Optional[List[float]] = None
+    matches: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
@@ -0,0 +1,86 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Set, Tuple
+from pydantic import BaseModel
+
+
+class ResponseCache:
+    """
+    Exact-match cache of stored responses keyed by a hash of the normalized
+    message, mode, language and A/B arm. Entries expire after `ttl_seconds` and can be dropped by
+    the id of the vector store object they were served from.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, BaseModel, Optional[str]]]" = OrderedDict()
+        self._keys_by_id: Dict[str, Set[str]] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(normalized_message: str, mode: str, lang: str, arm: str) -> str:
+        return hashlib.sha256(f"{mode}\0{arm}\0{lang}\0{normalized_message}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[BaseModel]:
+        """Return a copy of the cached response, or None when absent or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, response, _ = entry
+        if expires_at < time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return response.model_copy(deep=True)
+
+    def put(self, key: str, response: BaseModel, object_id: Optional[str] = None) -> None:
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, response.model_copy(deep=True), object_id)
+        if object_id:
+            self._keys_by_id.setdefault(object_id, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str) -> None:
+        _, _, object_id = self._entries.pop(key)
+        if object_id and (keys := self._keys_by_id.get(object_id)):
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_id[object_id]
+
+    def invalidate_id(self, object_id: str) -> int:
+        """Drop every entry served from the given vector store object."""
+        keys = self._keys_by_id.pop(object_id, set())
+        for key in keys:
+            self._entries.pop(key, None)
+        self.invalidations += len(keys)
+        return len(keys)
+
+    def clear(self) -> None:
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        self._keys_by_id.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
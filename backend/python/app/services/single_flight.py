@@ -0,0 +1,37 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Any, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Runs at most one computation per key at a time.
+    Callers that arrive while a computation for their key is in flight wait for
+    it and receive the same result (or exception) instead of starting their own.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+        self.leaders = 0
+        self.shared = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """Return the result for `key` and whether it was shared from another caller."""
+        if (call := self._calls.get(key)) is not None:
+            self.shared += 1
+            return await asyncio.shield(call), True
+
+        call = asyncio.ensure_future(fn())
+        self._calls[key] = call
+        call.add_done_callback(lambda _: self._calls.pop(key, None))
+        self.leaders += 1
+        # Shielded so a cancelled leader doesn't cancel the waiters' computation
+        return await asyncio.shield(call), False
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "leaders": self.leaders,
+            "shared": self.shared,
+            "in_flight": len(self._calls)
+        }
@@ -0,0 +1,399 @@
+import asyncio
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Optional, Dict, Any, List, Tuple
+import requests
+import weaviate
+from weaviate.exceptions import UnexpectedStatusCodeException, WeaviateStartUpError
+from app.config.settings import Settings
+from app.services.circuit_breaker import CircuitBreaker, CLOSED
+
+CLASS_NAME = "ChatMessage"
+
+CHAT_MESSAGE_CLASS = {
+    "class": CLASS_NAME,
+    "vectorizer": "text2vec-transformers",
+    "moduleConfig": {
+        "text2vec-transformers": {
+            "vectorizeClassName": False
+        }
+    },
+    "properties": [
+        {
+            "name": "message",
+            "dataType": ["text"],
+            "moduleConfig": {
+                "text2vec-transformers": {
+                    "skip": False,
+                    "vectorizePropertyName": False
+                }
+            }
+        },
+        {
+            "name": "response",
+            "dataType": ["text"],
+            "moduleConfig": {
+                "text2vec-transformers": {
+                    "skip": True
+                }
+            }
+        },
+        {
+            "name": "feedback",
+            "dataType": ["text"],
+            "moduleConfig": {
+                "text2vec-transformers": {
+                    "skip": True
+                }
+            }
+        },
+        {
+            "name": "type",
+            "dataType": ["text"],
+            "moduleConfig": {
+                "text2vec-transformers": {
+                    "skip": True
+                }
+            }
+        },
+        {
+            "name": "rating",
+            "dataType": ["int"],
+            "moduleConfig": {
+                "text2vec-transformers": {
+                    "skip": True
+                }
+            }
+        }
+    ]
+}
+
+
+class VectorStoreUnavailable(Exception):
+    """Raised instead of calling Weaviate while its circuit is open."""
+
+
+def is_outage(error: Exception) -> bool:
+    """Errors that mean Weaviate is unreachable or failing, as opposed to a rejected request"""
+    if isinstance(error, UnexpectedStatusCodeException):
+        return error.status_code >= 500
+    return isinstance(error, (
+        requests.exceptions.ConnectionError,
+        requests.exceptions.Timeout,
+        ConnectionError,
+        TimeoutError,
+        WeaviateStartUpError,
+        VectorStoreUnavailable
+    ))
+
+
+class VectorStore:
+    """
+    Async access layer for the ChatMessage class in Weaviate.
+    The weaviate client is synchronous, so every call is offloaded to a
+    dedicated thread pool to keep the event loop free.
+
+    All calls go through a circuit breaker. While it is open the store reports
+    itself unavailable and is skipped without a network round-trip; the first
+    call after `vector_db_reset_timeout` reconnects and re-checks the schema
+    before it runs.
+    """
+
+    def __init__(self, settings: Settings, client: Optional[weaviate.Client] = None):
+        self.settings = settings
+        self.client = client
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.vector_db_max_workers,
+            thread_name_prefix="weaviate"
+        )
+        # client.batch is a single shared buffer, so batch imports run one at a time
+        self._batch_lock = threading.Lock()
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.vector_db_failure_threshold,
+            reset_timeout=settings.vector_db_reset_timeout
+        )
+
+    @property
+    def available(self) -> bool:
+        return self.breaker.ready()
+
+    def health(self) -> Dict[str, Any]:
+        return {"connected": self.client is not None, **self.breaker.metrics()}
+
+    def _reconnect(self) -> None:
+        """Create the client if needed and make sure the schema exists; raises on failure."""
+        if self.client is None:
+            pool_size = self.settings.vector_db_max_workers
+            self.client = weaviate.Client(
+                url=self.settings.vector_db_url,
+                timeout_config=(self.settings.vector_db_connect_timeout, self.settings.vector_db_read_timeout),
+                additional_config=weaviate.Config(
+                    connection_config=weaviate.ConnectionConfig(
+                        session_pool_connections=pool_size,
+                        session_pool_maxsize=pool_size
+                    )
+                )
+            )
+        self._ensure_schema()
+
+    def connect(self) -> bool:
+        """Create the Weaviate client and make sure the schema exists."""
+        try:
+            self._reconnect()
+            self.breaker.record_success()
+            return True
+        except Exception as e:
+            print(f"Failed to initialize Weaviate client, retrying in {self.breaker.reset_timeout:g}s: {e}")
+            self.client = None
+            self.breaker.trip()  # Callers check `available` before using the store
+            return False
+
+    def _ensure_schema(self):
+        """Ensure the Weaviate schema exists."""
+        try:
+            # Try to get the schema first
+            schema = self.client.schema.get()
+            classes = [c["class"] for c in schema.get("classes", [])]
+            if CLASS_NAME in classes:
+                print("ChatMessage schema already exists")
+                return
+
+            # Create schema if it doesn't exist
+            self.client.schema.create_class(CHAT_MESSAGE_CLASS)
+            print("Successfully created ChatMessage schema")
+        except Exception as e:
+            print(f"Error ensuring schema: {e}")
+            if "already exists" not in str(e):
+                raise
+
+    async def _run(self, fn, *args, **kwargs):
+        """Run a blocking client call on the Weaviate thread pool, guarded by the circuit breaker."""
+        if not self.breaker.allow():
+            raise VectorStoreUnavailable("Weaviate circuit is open")
+        probe = self.breaker.probing
+        loop = asyncio.get_running_loop()
+        try:
+            if probe or self.client is None:
+                # Reconnect and re-check the schema before trusting Weaviate again
+                await loop.run_in_executor(self._executor, self._reconnect)
+            result = await loop.run_in_executor(self._executor, partial(fn, *args, **kwargs))
+        except asyncio.CancelledError:
+            if probe:
+                self.breaker.release_probe()
+            raise
+        except Exception as e:
+            if is_outage(e):
+                self.breaker.record_failure()
+                if self.breaker.state != CLOSED:
+                    print(f"Weaviate unavailable, opening circuit for {self.breaker.reset_timeout:g}s: {e}")
+            else:
+                # Weaviate answered, it just rejected this request
+                self.breaker.record_success()
+            raise
+        if probe:
+            print("Weaviate reachable again, circuit closed")
+        self.breaker.record_success()
+        return result
+
+    def _near_vector_query(
+        self,
+        vector: List[float],
+        certainty: float,
+        mode: Optional[str],
+        limit: int
+    ):
+        query = (
+            self.client.query
+            .get(CLASS_NAME, ["message", "response", "type"])
+            .with_near_vector({
+                "vector": vector,
+                "certainty": certainty
+            })
+            .with_additional(["certainty", "id"])
+            .with_limit(limit)
+        )
+        if mode is not None:
+            query = query.with_where({
+                "operator": "Equal",
+                "path": ["type"],
+                "valueText": mode
+            })
+        return query
+
+    def _search_near_vector(
+        self,
+        vector: List[float],
+        certainty: float,
+        mode: Optional[str],
+        limit: int
+    ) -> List[Dict[str, Any]]:
+        result = self._near_vector_query(vector, certainty, mode, limit).do()
+        return result.get("data", {}).get("Get", {}).get(CLASS_NAME, []) or []
+
+    def _search_near_vector_many(
+        self,
+        vectors: List[List[float]],
+        certainty: float,
+        mode: Optional[str],
+        limit: int
+    ) -> List[List[Dict[str, Any]]]:
+        # One GraphQL request with an aliased Get per vector
+        queries = [
+            self._near_vector_query(vector, certainty, mode, limit).with_alias(f"q{index}")
+            for index, vector in enumerate(vectors)
+        ]
+        result = self.client.query.multi_get(queries).do()
+        found = result.get("data", {}).get("Get", {}) or {}
+        return [found.get(f"q{index}") or [] for index in range(len(vectors))]
+
+    async def search_near_vector(
+        self,
+        vector: List[float],
+        certainty: float,
+        mode: Optional[str] = None,
+        limit: int = 1,
+        text: str = ""
+    ) -> List[Dict[str, Any]]:
+        """
+        Return stored messages closer than `certainty`, optionally filtered by type.
+        `text` is the message the vector was made from; only RemoteVectorStore sends it.
+        """
+        return await self._run(self._search_near_vector, vector, certainty, mode, limit)
+
+    async def search_near_vector_many(
+        self,
+        vectors: List[List[float]],
+        certainty: float,
+        mode: Optional[str] = None,
+        limit: int = 1,
+        texts: Optional[List[str]] = None,
+        chunk_size: int = 50
+    ) -> List[List[Dict[str, Any]]]:
+        """Run several near-vector searches in as few requests as possible."""
+        results = []
+        for start in range(0, len(vectors), chunk_size):
+            results.extend(await self._run(
+                self._search_near_vector_many,
+                vectors[start:start + chunk_size],
+                certainty,
+                mode,
+                limit
+            ))
+        return results
+
+    def _create(self, data_object: Dict[str, Any], vector: List[float]) -> str:
+        return self.client.data_object.create(
+            class_name=CLASS_NAME,
+            data_object=data_object,
+            vector=vector
+        )
+
+    async def create(self, data_object: Dict[str, Any], vector: List[float]) -> str:
+        """Insert a ChatMessage object and return its id."""
+        return await self._run(self._create, data_object, vector)
+
+    def _create_many(
+        self,
+        objects: List[Tuple[Dict[str, Any], List[float]]],
+        ids: Optional[List[str]]
+    ) -> List[Optional[str]]:
+        if ids is None:
+            ids = [str(uuid.uuid4()) for _ in objects]
+        with self._batch_lock:
+            for (data_object, vector), object_id in zip(objects, ids):
+                self.client.batch.add_data_object(
+                    data_object=data_object,
+                    class_name=CLASS_NAME,
+                    uuid=object_id,
+                    vector=vector
+                )
+            try:
+                results = self.client.batch.create_objects() or []
+            finally:
+                # A failed import leaves its objects in the shared batch; don't resend them with the next one
+                self.client.batch.empty_objects()
+
+        failed = {
+            item.get("id") for item in results
+            if (item.get("result") or {}).get("errors")
+        }
+        if failed:
+            print(f"Batch import failed for {len(failed)} of {len(objects)} objects")
+        return [None if object_id in failed else object_id for object_id in ids]
+
+    async def create_many(
+        self,
+        objects: List[Tuple[Dict[str, Any], List[float]]],
+        ids: Optional[List[str]] = None
+    ) -> List[Optional[str]]:
+        """Insert ChatMessage objects with one batch request; None marks objects that failed."""
+        return await self._run(self._create_many, objects, ids)
+
+    def _update(self, object_id: str, data_object: Dict[str, Any]) -> None:
+        self.client.data_object.update(
+            uuid=object_id,
+            class_name=CLASS_NAME,
+            data_object=data_object
+        )
+
+    async def update(self, object_id: str, data_object: Dict[str, Any]) -> None:
+        await self._run(self._update, object_id, data_object)
+
+    def _delete(self, object_id: str) -> None:
+        self.client.data_object.delete(
+            class_name=CLASS_NAME,
+            uuid=object_id
+        )
+
+    async def delete(self, object_id: str) -> None:
+        await self._run(self._delete, object_id)
+
+    def _get_rating(self, object_id: str) -> Optional[int]:
+        result = (
+            self.client.query
+            .get(CLASS_NAME, ["rating"])
+            .with_where({
+                "operator": "Equal",
+                "path": ["id"],
+                "valueString": object_id
+            })
+            .do()
+        )
+        if objects := result.get("data", {}).get("Get", {}).get(CLASS_NAME, []):
+            return objects[0].get("rating")
+        return None
+
+    async def get_rating(self, object_id: str) -> Optional[int]:
+        return await self._run(self._get_rating, object_id)
+
+    def _list_all(self):
+        return (
+            self.client.query
+            .get(CLASS_NAME, ["message", "response", "feedback"])
+            .with_additional(["id"])
+            .do()
+        )
+
+    async def list_all(self):
+        return await self._run(self._list_all)
+
+    def _clear(self) -> None:
+        self.client.batch.delete_objects(
+            class_name=CLASS_NAME,
+            where={
+                "operator": "NotNull",
+                "path": ["id"]
+            }
+        )
+
+    async def clear(self) -> None:
+        """Delete all ChatMessage objects."""
+        await self._run(self._clear)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+
+    async def aclose(self) -> None:
+        self.close()
@@ -0,0 +1,166 @@
+import asyncio
+import uuid
+from collections import deque
+from typing import Optional, Dict, Any, List, Tuple, Callable
+from app.services.vector_store import VectorStore, VectorStoreUnavailable
+
+# (object id, properties, vector, attempt)
+PendingWrite = Tuple[str, Dict[str, Any], List[float], int]
+
+
+class WriteBehindBuffer:
+    """
+    Collects new ChatMessage objects and writes them with Weaviate batch imports
+    off the request path. Ids are assigned up front so callers can return them
+    immediately. A batch is flushed when it reaches `max_batch_size` objects or
+    `flush_interval` seconds after its first object; `max_pending` bounds the
+    queue so producers wait when the store falls behind. Objects that still fail
+    after `max_retries` are dropped and reported through `on_drop`. While the
+    store's circuit is open objects stay queued without using up their retries.
+    """
+
+    def __init__(
+        self,
+        store: VectorStore,
+        max_batch_size: int = 100,
+        flush_interval: float = 1.0,
+        max_pending: int = 10000,
+        max_retries: int = 3,
+        on_drop: Optional[Callable[[str], Any]] = None
+    ):
+        self.store = store
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.on_drop = on_drop
+        self._queue: Optional[asyncio.Queue] = None
+        self._max_pending = max_pending
+        self._worker: Optional[asyncio.Task] = None
+        self._retries: "deque[PendingWrite]" = deque()
+        self._batch: List[PendingWrite] = []
+        # Resolves to True once the object is written, False if it was dropped
+        self._results: Dict[str, asyncio.Future] = {}
+
+        self.written = 0
+        self.batches = 0
+        self.retried = 0
+        self.dropped = 0
+
+    def _ensure_worker(self) -> asyncio.Queue:
+        if self._worker is None or self._worker.done():
+            # Objects the previous writer still held are retried by the new one
+            self._retries.extend(self._batch)
+            self._batch = []
+            if self._queue is not None:
+                while not self._queue.empty():
+                    self._retries.append(self._queue.get_nowait())
+            self._queue = asyncio.Queue(maxsize=self._max_pending)
+            self._worker = asyncio.create_task(self._run())
+        return self._queue
+
+    async def add(self, data_object: Dict[str, Any], vector: List[float]) -> str:
+        """Queue an object for insertion and return the id it will be stored under."""
+        object_id = str(uuid.uuid4())
+        queue = self._ensure_worker()
+        self._results[object_id] = asyncio.get_running_loop().create_future()
+        # Waits here when max_pending objects are already queued
+        await queue.put((object_id, data_object, vector, 0))
+        return object_id
+
+    def is_pending(self, object_id: str) -> bool:
+        return object_id in self._results
+
+    async def wait_for(self, object_id: str) -> bool:
+        """Wait until one queued object is written; False if it was dropped or is unknown."""
+        result = self._results.get(object_id)
+        if result is None:
+            return False
+        self._ensure_worker()
+        return await asyncio.shield(result)
+
+    async def _next_batch(self) -> List[PendingWrite]:
+        batch = []
+        while self._retries and len(batch) < self.max_batch_size:
+            batch.append(self._retries.popleft())
+        if not batch:
+            batch.append(await self._queue.get())
+
+        try:
+            async with asyncio.timeout(self.flush_interval):
+                while len(batch) < self.max_batch_size:
+                    batch.append(await self._queue.get())
+        except TimeoutError:
+            pass
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            self._batch = await self._next_batch()
+            await self._write(self._batch)
+            self._batch = []
+
+    def _settle(self, object_id: str, written: bool) -> None:
+        result = self._results.pop(object_id, None)
+        if result is not None and not result.done():
+            result.set_result(written)
+
+    async def _write(self, batch: List[PendingWrite]) -> None:
+        try:
+            ids = await self.store.create_many(
+                [(data_object, vector) for _, data_object, vector, _ in batch],
+                ids=[object_id for object_id, _, _, _ in batch]
+            )
+        except VectorStoreUnavailable:
+            # Weaviate is known to be down: hold the batch until the circuit lets a probe through
+            self._retries.extendleft(reversed(batch))
+            await asyncio.sleep(self.flush_interval)
+            return
+        except Exception as e:
+            print(f"Batch import of {len(batch)} objects failed: {e}")
+            ids = [None] * len(batch)
+        self.batches += 1
+
+        for (object_id, data_object, vector, attempt), stored_id in zip(batch, ids):
+            if stored_id is not None:
+                self.written += 1
+                self._settle(object_id, True)
+            elif attempt < self.max_retries:
+                self.retried += 1
+                self._retries.append((object_id, data_object, vector, attempt + 1))
+            else:
+                print(f"Dropping object {object_id} after {attempt + 1} failed attempts")
+                self.dropped += 1
+                self._settle(object_id, False)
+                if self.on_drop is not None:
+                    self.on_drop(object_id)
+
+    async def flush(self) -> None:
+        """Wait until every object queued so far has been written or dropped."""
+        if self._results:
+            self._ensure_worker()
+            await asyncio.gather(*(asyncio.shield(result) for result in list(self._results.values())))
+
+    async def close(self, timeout: Optional[float] = None) -> None:
+        """Flush outstanding objects and stop the background writer; objects not written within `timeout` are lost."""
+        try:
+            async with asyncio.timeout(timeout):
+                await self.flush()
+        except TimeoutError:
+            print(f"Shutting down with {len(self._results)} objects not written")
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "queued": (self._queue.qsize() if self._queue is not None else 0) + len(self._retries),
+            "pending": len(self._results),
+            "written": self.written,
+            "batches": self.batches,
+            "retried": self.retried,
+            "dropped": self.dropped
+        }
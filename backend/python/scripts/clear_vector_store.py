@@ -14,7 +14,9 @@ async def main():
     
     print("Clearing vector store...")
     await processor.clear_vector_store()
+    await processor.aclose()
+    print(f"Note: a running backend keeps serving cached responses for up to {settings.response_cache_ttl_seconds:g}s; restart it to drop them now")
     print("Done!")
 
 if __name__ == "__main__":
-    asyncio.run(main()) 
\ No newline at end of file
+    asyncio.run(main())
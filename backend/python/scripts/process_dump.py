@@ -0,0 +1,265 @@
+"""
+Run a JSONL or CSV dump of messages through MessageProcessor.
+
+Used to pre-warm the vector store with historical messages. Input is read
+lazily line by line and results are appended to OUTPUT as JSONL, so memory
+stays constant regardless of the input size. Progress is checkpointed to
+OUTPUT.checkpoint; rerunning the same command resumes where it stopped and
+skips every line that already has a result in OUTPUT.
+
+    python scripts/process_dump.py messages.jsonl results.jsonl --concurrency 8 --requests-per-minute 300
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+import time
+from typing import Callable, Iterator, Optional, Tuple
+
+import openai
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config.settings import Settings
+from app.services.message_processor import MessageProcessor
+
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError)
+
+
+def read_messages(
+    path: str,
+    fmt: str,
+    field: str,
+    skip_through: int,
+    is_done: Callable[[int], bool] = lambda line_number: False
+) -> Iterator[Tuple[int, str]]:
+    """Yield (line number, message) pairs after `skip_through` that are not done yet, one line at a time."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            # DictReader consumes the header, so data rows start at line 1
+            for line_number, row in enumerate(csv.DictReader(f), start=1):
+                if line_number > skip_through and not is_done(line_number) and row.get(field):
+                    yield line_number, row[field]
+            return
+
+        for line_number, line in enumerate(f, start=1):
+            if line_number <= skip_through or is_done(line_number) or not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                print(f"Skipping malformed line {line_number}")
+                continue
+            message = record if isinstance(record, str) else record.get(field)
+            if message:
+                yield line_number, message
+
+
+class RateLimiter:
+    """Spaces out request starts to stay under a requests-per-minute budget."""
+
+    def __init__(self, requests_per_minute: float):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_start - now
+            self._next_start = max(now, self._next_start) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def back_off(self, seconds: float) -> None:
+        """Push every following request start back after an upstream rate-limit response."""
+        self._next_start = max(self._next_start, time.monotonic() + seconds)
+
+
+class Checkpoint:
+    """
+    Tracks the highest line number below which every line has completed, plus
+    the lines above it that finished out of order.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.completed_through = 0
+        self._done_above: set = set()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                state = json.load(f)
+            self.completed_through = state["completed_through"]
+            for line_number in state.get("done_above", []):
+                self.mark_done(line_number)
+
+    def is_done(self, line_number: int) -> bool:
+        return line_number <= self.completed_through or line_number in self._done_above
+
+    def recover(self, output_path: str) -> int:
+        """
+        Mark lines that already have a result in the output file as done, so
+        results written after the last save are not computed again. A partly
+        written last record is cut off. Returns the number of lines recovered.
+        """
+        if not os.path.exists(output_path):
+            return 0
+        recovered = 0
+        complete_size = 0
+        with open(output_path, "rb") as f:
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break
+                complete_size += len(raw)
+                try:
+                    line_number = json.loads(raw)["line"]
+                except (ValueError, KeyError, TypeError):
+                    continue
+                if not self.is_done(line_number):
+                    self.mark_done(line_number)
+                    recovered += 1
+        if complete_size < os.path.getsize(output_path):
+            with open(output_path, "r+b") as f:
+                f.truncate(complete_size)
+        return recovered
+
+    def mark_done(self, line_number: int) -> None:
+        self._done_above.add(line_number)
+        while self.completed_through + 1 in self._done_above:
+            self.completed_through += 1
+            self._done_above.discard(self.completed_through)
+
+    def mark_skipped(self, line_number: int) -> None:
+        """Blank or unreadable lines count as done so they don't hold back the checkpoint."""
+        self.mark_done(line_number)
+
+    def save(self) -> None:
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"completed_through": self.completed_through, "done_above": sorted(self._done_above)}, f)
+        os.replace(tmp_path, self.path)
+
+
+async def process_one(
+    processor: MessageProcessor,
+    mode: str,
+    message: str,
+    limiter: RateLimiter,
+    max_retries: int
+) -> dict:
+    for attempt in range(max_retries + 1):
+        await limiter.wait()
+        try:
+            if mode == "rewrite":
+                result = await processor.rewrite_message(message)
+            else:
+                result = await processor.process_message(message)
+            return {"status": "ok", "result": result.model_dump(mode="json", by_alias=True)}
+        except RETRYABLE_ERRORS as e:
+            if attempt == max_retries:
+                return {"status": "error", "error": str(e)}
+            delay = retry_after(e) or min(2 ** attempt, 60)
+            print(f"Upstream throttled or unavailable, retrying in {delay:.1f}s: {e}")
+            limiter.back_off(delay)
+        except Exception as e:
+            return {"status": "error", "error": str(e)}
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds requested by the upstream Retry-After header, if any."""
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+async def process_dump(processor: MessageProcessor, args: argparse.Namespace) -> int:
+    """Process every pending line of args.input and return the number of results written."""
+    fmt = args.format or ("csv" if args.input.lower().endswith(".csv") else "jsonl")
+    checkpoint = Checkpoint(f"{args.output}.checkpoint")
+    if recovered := checkpoint.recover(args.output):
+        print(f"Found {recovered} results written after the last checkpoint")
+    if checkpoint.completed_through:
+        print(f"Resuming after line {checkpoint.completed_through}")
+
+    limiter = RateLimiter(args.requests_per_minute)
+    slots = asyncio.Semaphore(args.concurrency)
+    window_open = asyncio.Condition()
+    in_flight = set()
+    processed = 0
+    started = time.monotonic()
+
+    with open(args.output, "a", encoding="utf-8") as output:
+        async def run(line_number: int, message: str):
+            nonlocal processed
+            try:
+                outcome = await process_one(processor, args.mode, message, limiter, args.max_retries)
+                output.write(json.dumps({"line": line_number, "message": message, **outcome}, ensure_ascii=False) + "\n")
+                processed += 1
+                async with window_open:
+                    checkpoint.mark_done(line_number)
+                    window_open.notify_all()
+                if processed % args.checkpoint_every == 0:
+                    output.flush()
+                    checkpoint.save()
+                    rate = processed / (time.monotonic() - started)
+                    print(f"Processed {processed} messages ({rate:.1f}/s), checkpoint at line {checkpoint.completed_through}")
+            finally:
+                slots.release()
+
+        previous_line = checkpoint.completed_through
+        for line_number, message in read_messages(
+            args.input, fmt, args.field, checkpoint.completed_through, checkpoint.is_done
+        ):
+            # Lines without a message still advance the checkpoint
+            for skipped in range(previous_line + 1, line_number):
+                if not checkpoint.is_done(skipped):
+                    checkpoint.mark_skipped(skipped)
+            previous_line = line_number
+
+            # Keep memory bounded even if one slow line holds back the checkpoint
+            async with window_open:
+                await window_open.wait_for(lambda: line_number - checkpoint.completed_through <= args.window)
+            await slots.acquire()
+            task = asyncio.create_task(run(line_number, message))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+
+        if in_flight:
+            await asyncio.gather(*in_flight)
+        output.flush()
+        checkpoint.save()
+
+    print(f"Done! Processed {processed} messages, checkpoint at line {checkpoint.completed_through}")
+    return processed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL or CSV file with one message per line")
+    parser.add_argument("output", help="JSONL file results are appended to")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="Input format (default: from the file extension)")
+    parser.add_argument("--field", default="message", help="JSON key or CSV column holding the message text")
+    parser.add_argument("--mode", choices=["analyze", "rewrite"], default="analyze")
+    parser.add_argument("--concurrency", type=int, default=8, help="Messages processed at the same time")
+    parser.add_argument("--requests-per-minute", type=float, default=0, help="Upper bound on started messages per minute (0 = unlimited)")
+    parser.add_argument("--max-retries", type=int, default=5, help="Retries for rate-limited or timed-out messages")
+    parser.add_argument("--window", type=int, default=1000, help="Max lines in progress past the checkpoint")
+    parser.add_argument("--checkpoint-every", type=int, default=100, help="Save the checkpoint after this many results")
+    args = parser.parse_args()
+
+    processor = MessageProcessor(Settings())
+    try:
+        await process_dump(processor, args)
+    finally:
+        await processor.aclose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
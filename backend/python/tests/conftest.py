@@ -0,0 +1,168 @@
+import asyncio
+import json
+import sys
+import time
+import uuid
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# Add backend/python directory to Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from app.config.settings import Settings
+from app.prompts import PromptType, PROMPTS
+
+ANALYSIS_RESPONSE = {
+    "self_awareness": {
+        "emotional_background": "Test emotional background",
+        "present_elements": "Test present elements",
+        "missing_elements": "Test missing elements",
+        "step_back_analysis": "Test step back analysis"
+    },
+    "self_regulation": {
+        "current_phrasing": "Test current phrasing",
+        "improvement_examples": "Test improvement examples",
+        "alternative_phrases": "Test alternative phrases"
+    },
+    "empathy": {
+        "missing_elements": "Test missing elements",
+        "potential_additions": "Test potential additions",
+        "understanding_examples": "Test understanding examples"
+    },
+    "social_skills": {
+        "current_impact": "Test current impact",
+        "improvements": "Test improvements",
+        "examples": "Test examples"
+    }
+}
+
+REWRITE_RESPONSE = {
+    "long_version": "Test long version",
+    "short_version": "Test short version"
+}
+
+
+class StubOpenAI:
+    """Stand-in for openai.AsyncOpenAI that sleeps instead of calling the API."""
+
+    def __init__(self, latency: float = 0.0, fail_on: tuple = ()):
+        self.latency = latency
+        self.fail_on = fail_on
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.completion_calls = 0
+        self.embedding_calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create_completion))
+        self.embeddings = SimpleNamespace(create=self._create_embedding)
+
+    async def _create_completion(self, model, messages, **kwargs):
+        self.completion_calls += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+        if messages[-1]["content"] in self.fail_on:
+            raise RuntimeError("Upstream error")
+        is_analyze = messages[0]["content"].startswith(PROMPTS[PromptType.ANALYZE])
+        content = json.dumps(ANALYSIS_RESPONSE if is_analyze else REWRITE_RESPONSE)
+        if kwargs.get("stream"):
+            return self._stream(content)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=10, completion_tokens=20, total_tokens=30)
+        )
+
+    async def _stream(self, content: str, chunk_size: int = 7):
+        for start in range(0, len(content), chunk_size):
+            yield SimpleNamespace(choices=[
+                SimpleNamespace(delta=SimpleNamespace(content=content[start:start + chunk_size]))
+            ])
+
+    async def _create_embedding(self, model, input, **kwargs):
+        self.embedding_calls += 1
+        await asyncio.sleep(self.latency)
+        texts = input if isinstance(input, list) else [input]
+        return SimpleNamespace(data=[
+            SimpleNamespace(index=index, embedding=[float(len(text)), 1.0, 0.0])
+            for index, text in enumerate(texts)
+        ])
+
+    async def close(self):
+        pass
+
+
+class StubQuery:
+    def __init__(self, latency: float, objects: list = ()):
+        self.latency = latency
+        self.objects = list(objects)
+        self.certainty = 0.0
+
+    def __getattr__(self, name):
+        if name.startswith("with_"):
+            return lambda *args, **kwargs: self
+        raise AttributeError(name)
+
+    def with_near_vector(self, content):
+        self.certainty = content.get("certainty", 0.0)
+        return self
+
+    def do(self):
+        time.sleep(self.latency)
+        found = [item for item in self.objects if item["_additional"]["certainty"] >= self.certainty]
+        return {"data": {"Get": {"ChatMessage": found}}}
+
+
+class StubWeaviate:
+    """Blocking stand-in for weaviate.Client with an empty ChatMessage class."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.created = []
+        self._batch_objects = []
+        # Search results returned by every near-vector query above their certainty
+        self.matches = []
+        self.searches = 0
+        self.query = SimpleNamespace(
+            get=self._get,
+            multi_get=lambda queries: StubQuery(latency)
+        )
+        self.batch = SimpleNamespace(
+            add_data_object=self._add_batch_object,
+            create_objects=self._create_batch_objects,
+            empty_objects=self._batch_objects.clear
+        )
+        self.data_object = SimpleNamespace(
+            create=self._create,
+            update=lambda **kwargs: time.sleep(latency),
+            delete=lambda **kwargs: time.sleep(latency)
+        )
+
+    def _get(self, *args, **kwargs):
+        self.searches += 1
+        return StubQuery(self.latency, self.matches)
+
+    def _create(self, class_name, data_object, vector=None, **kwargs):
+        time.sleep(self.latency)
+        self.created.append(data_object)
+        return str(uuid.uuid4())
+
+    def _add_batch_object(self, data_object, class_name, uuid=None, vector=None, **kwargs):
+        self._batch_objects.append((uuid, data_object))
+        return uuid
+
+    def _create_batch_objects(self):
+        time.sleep(self.latency)
+        objects = list(self._batch_objects)
+        self._batch_objects.clear()
+        self.created.extend(data_object for _, data_object in objects)
+        return [{"id": object_id, "result": {}} for object_id, _ in objects]
+
+
+@pytest.fixture
+def settings():
+    return Settings(OPENAI_API_KEY="test_openai_api_key_for_testing_only")
@@ -0,0 +1,51 @@
+import asyncio
+
+from app.services.ab_router import ABRouter
+from app.services.message_processor import MessageProcessor
+from app.services.vector_store import VectorStore
+from tests.conftest import StubOpenAI, StubWeaviate
+
+
+def test_assignment_follows_all_weights():
+    router = ABRouter({"openai": 50.0, "vector_db": 30.0, "local_llm": 20.0})
+
+    counts = {"openai": 0, "vector_db": 0, "local_llm": 0}
+    for i in range(10000):
+        counts[router.assign(f"session-{i}")] += 1
+
+    assert 4500 < counts["openai"] < 5500
+    assert 2500 < counts["vector_db"] < 3500
+    assert 1500 < counts["local_llm"] < 2500
+
+
+def test_assignment_is_sticky_per_subject():
+    router = ABRouter({"openai": 1.0, "vector_db": 1.0})
+
+    assert len({router.assign("session-1") for _ in range(50)}) == 1
+    assert ABRouter({"openai": 0.0, "vector_db": 0.0}).assign("session-1") == "openai"
+    assert ABRouter({"openai": 0.0, "vector_db": 5.0}).assign() == "vector_db"
+
+
+def test_processor_records_per_arm_telemetry(settings):
+    settings.ab_test_openai_weight = 0.0
+    settings.ab_test_vector_db_weight = 100.0
+    processor = MessageProcessor(
+        settings,
+        openai_client=StubOpenAI(),
+        vector_store=VectorStore(settings, client=StubWeaviate())
+    )
+
+    async def run():
+        await processor.process_message("Test message", session_id="user-1")
+        await processor.process_message("Test message", session_id="user-1")
+        await processor.aclose()
+
+    asyncio.run(run())
+
+    arm = processor.metrics()["ab_test"]["arms"]["vector_db"]
+    assert arm["requests"] == 2
+    assert arm["sources"] == {"openai": 1, "cache": 1}
+    assert arm["cache_hit_rate"] == 0.5
+    # Analyze and rewrite completions of the first request
+    assert arm["total_tokens"] == 60
+    assert sum(arm["latency_histogram"].values()) == 2
@@ -0,0 +1,41 @@
+import asyncio
+
+from app.services.message_processor import MessageProcessor
+from app.services.vector_store import VectorStore
+from tests.conftest import StubOpenAI, StubWeaviate
+
+
+def test_process_batch_reports_every_item(settings):
+    settings.ab_test_openai_weight = 0.0
+    settings.ab_test_vector_db_weight = 100.0
+    upstream = StubOpenAI(fail_on=("Broken message",))
+    store = StubWeaviate()
+    processor = MessageProcessor(
+        settings,
+        openai_client=upstream,
+        vector_store=VectorStore(settings, client=store)
+    )
+    messages = ["First message", "First  message", "   ", "Second message", "Broken message"]
+
+    async def collect():
+        items = [item async for item in processor.process_batch(messages)]
+        await processor.aclose()
+        return items
+
+    results = {item.index: item for item in asyncio.run(collect())}
+
+    assert sorted(results) == list(range(len(messages)))
+    assert [results[i].status for i in range(len(messages))] == ["ok", "ok", "error", "ok", "error"]
+    assert results[0].result.additional_data == results[1].result.additional_data
+    # Both duplicates and the empty message are skipped upstream
+    assert upstream.completion_calls == 6
+    # Analysis and rewrite of the two good messages go in one batch import
+    assert len(store.created) == 4
+    assert processor.write_buffer.metrics()["batches"] == 1
+    assert processor.embedding_batcher.metrics()["batches"] == 1
+    # Every item is recorded on the batch's arm with its real source
+    assert {results[i].source for i in (0, 1, 3)} == {"openai"}
+    arm = processor.metrics()["ab_test"]["arms"]["vector_db"]
+    assert arm["requests"] == len(messages)
+    assert arm["errors"] == 2
+    assert arm["sources"] == {"openai": 3}
@@ -0,0 +1,150 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+from app.services.vector_store import VectorStore, VectorStoreUnavailable
+from app.services.write_buffer import WriteBehindBuffer
+from tests.conftest import StubWeaviate
+
+
+class OutageWeaviate(StubWeaviate):
+    """StubWeaviate whose calls raise ConnectionError while `down` is set."""
+
+    def __init__(self):
+        super().__init__()
+        self.down = False
+        self.calls = 0
+        self.classes = []
+        self.schema = SimpleNamespace(get=self._get_schema, create_class=self._create_class)
+        self.batch.create_objects = self._guard(self.batch.create_objects)
+        self.data_object.update = self._guard(self.data_object.update)
+
+    def _guard(self, fn):
+        def call(*args, **kwargs):
+            self.calls += 1
+            if self.down:
+                raise ConnectionError("Connection refused")
+            return fn(*args, **kwargs)
+        return call
+
+    def _get_schema(self):
+        if self.down:
+            raise ConnectionError("Connection refused")
+        return {"classes": [{"class": name} for name in self.classes]}
+
+    def _create_class(self, schema_class):
+        self.classes.append(schema_class["class"])
+
+
+def test_breaker_opens_after_threshold_and_probes_once():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    # Only one probe at a time
+    assert not breaker.ready()
+    assert not breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.metrics()["opened"] == 2
+
+
+def test_open_circuit_bypasses_weaviate(settings):
+    settings.vector_db_failure_threshold = 2
+    settings.vector_db_reset_timeout = 60
+    client = OutageWeaviate()
+    client.down = True
+    store = VectorStore(settings, client=client)
+
+    async def run():
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                await store.update("id", {"rating": 1})
+        started = time.perf_counter()
+        with pytest.raises(VectorStoreUnavailable):
+            await store.update("id", {"rating": 1})
+        return time.perf_counter() - started
+
+    elapsed = asyncio.run(run())
+
+    assert not store.available
+    assert client.calls == 2
+    assert elapsed < 0.01
+    assert store.health()["state"] == OPEN
+
+
+def test_recovery_reconnects_and_recreates_schema(settings):
+    settings.vector_db_failure_threshold = 1
+    settings.vector_db_reset_timeout = 0.05
+    client = OutageWeaviate()
+    store = VectorStore(settings, client=client)
+
+    async def run():
+        client.down = True
+        with pytest.raises(ConnectionError):
+            await store.update("id", {"rating": 1})
+        # Weaviate comes back empty, e.g. after losing its volume
+        client.down = False
+        await asyncio.sleep(0.06)
+        assert store.available
+        await store.update("id", {"rating": 1})
+
+    asyncio.run(run())
+
+    assert client.classes == ["ChatMessage"]
+    assert store.health()["state"] == CLOSED
+
+
+def test_unreachable_at_startup_retries_connect(settings, monkeypatch):
+    settings.vector_db_reset_timeout = 0.05
+    client = OutageWeaviate()
+    client.down = True
+    monkeypatch.setattr("app.services.vector_store.weaviate.Client", lambda *args, **kwargs: client)
+    store = VectorStore(settings)
+
+    assert not store.connect()
+    assert store.client is None
+    assert not store.available
+
+    client.down = False
+    time.sleep(0.06)
+    asyncio.run(store.update("id", {"rating": 1}))
+
+    assert store.client is client
+    assert store.health() == {**store.breaker.metrics(), "connected": True}
+
+
+def test_write_buffer_holds_writes_while_circuit_is_open(settings):
+    settings.vector_db_failure_threshold = 1
+    settings.vector_db_reset_timeout = 0.1
+    client = OutageWeaviate()
+    client.down = True
+    store = VectorStore(settings, client=client)
+    buffer = WriteBehindBuffer(store, max_batch_size=10, flush_interval=0.02, max_retries=1)
+
+    async def run():
+        object_id = await buffer.add({"message": "Hello"}, [0.1])
+        await asyncio.sleep(0.05)
+        client.down = False
+        written = await buffer.wait_for(object_id)
+        await buffer.close()
+        return written
+
+    assert asyncio.run(run()) is True
+    assert buffer.metrics()["dropped"] == 0
+    assert len(client.created) == 1
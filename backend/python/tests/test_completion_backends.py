@@ -0,0 +1,92 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from app.services.completion_backends import LocalLLMBackend
+from app.services.message_processor import MessageProcessor
+from app.services.vector_store import VectorStore
+from tests.conftest import StubOpenAI, StubWeaviate, REWRITE_RESPONSE
+
+
+class ChattyLocalModel(StubOpenAI):
+    """Local model that wraps its JSON in prose, as small models often do."""
+
+    async def _create_completion(self, model, messages, **kwargs):
+        completion = await super()._create_completion(model, messages, **kwargs)
+        content = completion.choices[0].message.content
+        wrapped = f"Sure! Here is the result:\n```json\n{content}\n```"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=wrapped))], usage=None)
+
+
+def test_local_llm_arm_uses_local_backend(settings):
+    settings.ab_test_openai_weight = 0.0
+    settings.ab_test_local_llm_weight = 100.0
+    upstream = StubOpenAI()
+    local = ChattyLocalModel()
+    processor = MessageProcessor(
+        settings,
+        openai_client=upstream,
+        vector_store=VectorStore(settings, client=StubWeaviate()),
+        local_backend=LocalLLMBackend(local, "local-model")
+    )
+
+    async def run():
+        response = await processor.rewrite_message("Test message")
+        await processor.aclose()
+        return response
+
+    response = asyncio.run(run())
+
+    assert response.long_version == REWRITE_RESPONSE["long_version"]
+    assert local.completion_calls == 1
+    assert upstream.completion_calls == 0
+    arm = processor.metrics()["ab_test"]["arms"]["local_llm"]
+    assert arm["sources"] == {"local_llm": 1}
+
+
+def test_batch_reports_the_local_backend_as_source(settings):
+    settings.ab_test_openai_weight = 0.0
+    settings.ab_test_local_llm_weight = 100.0
+    processor = MessageProcessor(
+        settings,
+        openai_client=StubOpenAI(),
+        vector_store=VectorStore(settings, client=StubWeaviate()),
+        local_backend=LocalLLMBackend(ChattyLocalModel(), "local-model")
+    )
+
+    async def collect():
+        items = [item async for item in processor.process_batch(["Test message"])]
+        await processor.aclose()
+        return items
+
+    items = asyncio.run(collect())
+
+    assert [item.source for item in items] == ["local_llm"]
+    assert processor.metrics()["ab_test"]["arms"]["local_llm"]["sources"] == {"local_llm": 1}
+
+
+def test_local_llm_arm_falls_back_to_openai_without_backend(settings):
+    settings.ab_test_openai_weight = 0.0
+    settings.ab_test_local_llm_weight = 100.0
+    upstream = StubOpenAI()
+    processor = MessageProcessor(
+        settings,
+        openai_client=upstream,
+        vector_store=VectorStore(settings, client=StubWeaviate())
+    )
+
+    async def run():
+        await processor.rewrite_message("Test message")
+        await processor.aclose()
+
+    asyncio.run(run())
+
+    assert upstream.completion_calls == 1
+    assert processor.metrics()["ab_test"]["arms"]["local_llm"]["sources"] == {"openai": 1}
+
+
+def test_local_backend_parses_pure_and_wrapped_json():
+    backend = LocalLLMBackend(StubOpenAI(), "local-model")
+
+    assert backend.parse(json.dumps(REWRITE_RESPONSE)) == REWRITE_RESPONSE
+    assert backend.parse(f"Result: {json.dumps(REWRITE_RESPONSE)} Hope it helps") == REWRITE_RESPONSE
@@ -0,0 +1,45 @@
+import asyncio
+
+from app.services.embedding_batcher import EmbeddingBatcher
+
+
+def test_concurrent_requests_share_one_batch():
+    calls = []
+
+    async def embed(texts):
+        calls.append(list(texts))
+        return [[float(len(text))] for text in texts]
+
+    batcher = EmbeddingBatcher(embed, max_batch_size=64, max_wait_ms=5)
+
+    async def run():
+        return await asyncio.gather(*(
+            batcher.embed(text) for text in ["a", "bb", "ccc", "bb"]
+        ))
+
+    vectors = asyncio.run(run())
+
+    assert vectors == [[1.0], [2.0], [3.0], [2.0]]
+    assert calls == [["a", "bb", "ccc"]]
+    assert batcher.metrics()["max_batch_size"] == 3
+
+
+def test_full_batch_is_sent_without_waiting():
+    calls = []
+
+    async def embed(texts):
+        calls.append(len(texts))
+        return [[0.0] for _ in texts]
+
+    batcher = EmbeddingBatcher(embed, max_batch_size=2, max_wait_ms=10_000)
+
+    async def run():
+        await asyncio.wait_for(
+            asyncio.gather(*(batcher.embed(str(i)) for i in range(4))),
+            timeout=1
+        )
+
+    asyncio.run(run())
+
+    assert calls == [2, 2]
+    assert batcher.metrics()["batches"] == 2
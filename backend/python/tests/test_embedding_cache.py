@@ -0,0 +1,59 @@
+import asyncio
+
+from app.services.embedding_cache import EmbeddingCache
+
+
+def test_lru_evicts_least_recently_used():
+    cache = EmbeddingCache(max_size=2)
+
+    async def run():
+        await cache.put("a", [1.0])
+        await cache.put("b", [2.0])
+        await cache.get("a")  # "b" becomes least recently used
+        await cache.put("c", [3.0])
+        return await cache.get("a"), await cache.get("b")
+
+    a, b = asyncio.run(run())
+
+    assert a == [1.0]
+    assert b is None
+    metrics = cache.metrics()
+    assert metrics["evictions"] == 1
+    assert metrics["hits"] == 2
+    assert metrics["misses"] == 1
+
+
+def test_disk_tier_warms_after_restart(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    key = EmbeddingCache.make_key("text-embedding-ada-002", "Test message")
+
+    cache = EmbeddingCache(max_size=10, path=path)
+    asyncio.run(cache.put(key, [0.5, -0.25]))
+    cache.close()
+
+    restarted = EmbeddingCache(max_size=10, path=path)
+    assert restarted.warm() == 1
+    assert asyncio.run(restarted.get(key)) == [0.5, -0.25]
+    assert restarted.metrics()["hits"] == 1
+    restarted.close()
+
+
+def test_disk_tier_prunes_least_recently_used_rows(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    cache = EmbeddingCache(max_size=1, path=path, max_disk_rows=2)
+
+    async def run():
+        await cache.put("a", [1.0])
+        await cache.put("b", [2.0])
+        await cache.get("a")  # Read back from disk, so "b" is the least recently used row
+        await cache.put("c", [3.0])
+
+    asyncio.run(run())
+    cache.close()
+
+    restarted = EmbeddingCache(max_size=10, path=path, max_disk_rows=2)
+    assert restarted.warm() == 2
+    assert asyncio.run(restarted.get("b")) is None
+    assert asyncio.run(restarted.get("a")) == [1.0]
+    assert cache.metrics()["disk_evictions"] == 1
+    restarted.close()
@@ -0,0 +1,74 @@
+import asyncio
+import json
+import uuid
+
+import pytest
+
+from app.services.hedging import HedgedCaller, CompletionTimeout
+from app.services.message_processor import MessageProcessor
+from app.services.vector_store import VectorStore
+from tests.conftest import StubOpenAI, StubWeaviate, ANALYSIS_RESPONSE, REWRITE_RESPONSE
+
+
+def test_slow_call_is_hedged_and_fast_attempt_wins():
+    hedger = HedgedCaller(deadline=1.0, min_hedge_delay=0.05)
+    latencies = iter([0.5, 0.01])
+
+    async def call():
+        await asyncio.sleep(next(latencies))
+        return "done"
+
+    assert asyncio.run(hedger.call(call)) == "done"
+    assert hedger.metrics()["hedges"] == 1
+    assert hedger.metrics()["hedge_wins"] == 1
+
+
+def test_hedge_delay_follows_recent_p95():
+    hedger = HedgedCaller(min_hedge_delay=0.01, min_samples=10)
+    hedger._latencies.extend([0.1] * 95 + [2.0] * 5)
+
+    assert hedger.hedge_delay() == 2.0
+    hedger._latencies.extend([0.1] * 100)
+    assert hedger.hedge_delay() == 0.1
+
+
+def test_deadline_raises_completion_timeout():
+    hedger = HedgedCaller(deadline=0.05, min_hedge_delay=0.01)
+
+    async def call():
+        await asyncio.sleep(1)
+
+    with pytest.raises(CompletionTimeout):
+        asyncio.run(hedger.call(call))
+    assert hedger.metrics()["timeouts"] == 1
+
+
+def test_timed_out_analysis_falls_back_to_nearest_match(settings):
+    settings.completion_deadline = 0.05
+    settings.completion_hedge_min_delay = 0.02
+    store = StubWeaviate()
+    # Below the 0.95 confidence threshold, so never served as a regular hit
+    stored_id = str(uuid.uuid4())
+    store.matches = [{
+        "message": "Similar message",
+        "response": json.dumps({"analysis": ANALYSIS_RESPONSE, **REWRITE_RESPONSE}),
+        "type": "analyze",
+        "_additional": {"certainty": 0.85, "id": stored_id}
+    }]
+    processor = MessageProcessor(
+        settings,
+        openai_client=StubOpenAI(latency=1.0),
+        vector_store=VectorStore(settings, client=store)
+    )
+
+    async def run():
+        response = await processor.process_message("Test message")
+        await processor.aclose()
+        return response
+
+    response = asyncio.run(run())
+
+    assert response.degraded is True
+    assert response.additional_data == {"id": stored_id}
+    assert response.long_version == REWRITE_RESPONSE["long_version"]
+    assert processor.metrics()["ab_test"]["arms"]["openai"]["sources"] == {"fallback": 1}
@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+from app.services.message_processor import MessageProcessor
+from app.services.vector_store import VectorStore
+from tests.conftest import StubOpenAI, StubWeaviate
+
+
+def test_process_message_concurrency_scales(settings):
+    """Hundreds of in-flight requests on one event loop finish in roughly the time of one"""
+    upstream = StubOpenAI(latency=0.05)
+    processor = MessageProcessor(
+        settings,
+        openai_client=upstream,
+        vector_store=VectorStore(settings, client=StubWeaviate(latency=0.005))
+    )
+
+    async def timed(count: int) -> float:
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            processor.process_message(f"Test message number {i}")
+            for i in range(count)
+        ))
+        return time.perf_counter() - start
+
+    async def run():
+        single = await timed(1)
+        burst = await timed(200)
+        await processor.aclose()
+        return single, burst
+
+    single, burst = asyncio.run(run())
+
+    # Serial execution would take ~200x as long as a single request
+    assert burst < single * 20
+    # Analyze and rewrite completions for every request were in flight together
+    assert upstream.peak_in_flight >= 200
+
+
+def test_process_message_fanout_degrades_on_rewrite_failure(settings):
+    """With REWRITE_FAILURE_MODE=degrade a failed rewrite still returns the analysis"""
+    settings.rewrite_failure_mode = "degrade"
+    upstream = StubOpenAI()
+    processor = MessageProcessor(
+        settings,
+        openai_client=upstream,
+        vector_store=VectorStore(settings, client=StubWeaviate())
+    )
+
+    async def fail_rewrite(context):
+        raise RuntimeError("Rewrite upstream error")
+
+    processor._shared_rewrite = fail_rewrite
+
+    async def run():
+        response = await processor.process_message("Test message")
+        await processor.aclose()
+        return response
+
+    response = asyncio.run(run())
+
+    assert response.degraded is True
+    assert response.analysis is not None
+    assert response.long_version == ""
+    assert processor.vector_store.client.created == []
+
+
+def test_identical_concurrent_requests_share_one_computation(settings):
+    """Concurrent copies of a message trigger a single analyze and rewrite"""
+    upstream = StubOpenAI(latency=0.05)
+    store = StubWeaviate()
+    processor = MessageProcessor(
+        settings,
+        openai_client=upstream,
+        vector_store=VectorStore(settings, client=store)
+    )
+
+    async def run():
+        responses = await asyncio.gather(*(
+            processor.process_message("Test  message ") for _ in range(20)
+        ))
+        await processor.aclose()
+        return responses
+
+    responses = asyncio.run(run())
+
+    assert upstream.completion_calls == 2
+    assert len({response.additional_data["id"] for response in responses}) == 1
+    assert len(store.created) == 2
+    assert processor.single_flight.metrics()["shared"] == 19
@@ -0,0 +1,108 @@
+import asyncio
+import json
+from argparse import Namespace
+
+from app.models.api import RewrittenMessage
+from scripts.process_dump import Checkpoint, RateLimiter, process_dump
+
+
+class StubProcessor:
+    """Rewrites messages, holding back the ones listed in `slow` for `delay` seconds."""
+
+    def __init__(self, slow: tuple = (), delay: float = 0.05):
+        self.slow = slow
+        self.delay = delay
+        self.seen = []
+        self.started_while_slow = 0
+
+    async def rewrite_message(self, message: str) -> RewrittenMessage:
+        self.seen.append(message)
+        if message in self.slow:
+            await asyncio.sleep(self.delay)
+            self.started_while_slow = len(self.seen) - 1
+        return RewrittenMessage(long_version=message.upper(), short_version=message)
+
+
+def dump_args(tmp_path, **overrides) -> Namespace:
+    args = dict(
+        input=str(tmp_path / "messages.jsonl"),
+        output=str(tmp_path / "results.jsonl"),
+        format=None,
+        field="message",
+        mode="rewrite",
+        concurrency=4,
+        requests_per_minute=0,
+        max_retries=0,
+        window=1000,
+        checkpoint_every=1
+    )
+    args.update(overrides)
+    return Namespace(**args)
+
+
+def write_messages(path, lines):
+    path.write_text("".join(json.dumps({"message": text}) + "\n" if text else "\n" for text in lines))
+
+
+def test_checkpoint_advances_over_contiguous_lines(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / "out.checkpoint"))
+
+    checkpoint.mark_done(2)
+    checkpoint.mark_done(3)
+    assert checkpoint.completed_through == 0
+    checkpoint.mark_skipped(1)
+    assert checkpoint.completed_through == 3
+    checkpoint.mark_done(5)
+    checkpoint.save()
+
+    reloaded = Checkpoint(str(tmp_path / "out.checkpoint"))
+    assert reloaded.completed_through == 3
+    assert reloaded.is_done(5) and not reloaded.is_done(4)
+
+
+def test_resume_skips_lines_already_in_output(tmp_path):
+    write_messages(tmp_path / "messages.jsonl", ["one", "", "two", "three", "four"])
+    args = dump_args(tmp_path)
+    # A previous run finished lines 3 and 5 but never saved its checkpoint
+    with open(args.output, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"line": 3, "status": "ok"}) + "\n")
+        f.write(json.dumps({"line": 5, "status": "ok"}) + "\n")
+        f.write('{"line": 4, "sta')
+
+    processor = StubProcessor()
+    assert asyncio.run(process_dump(processor, args)) == 2
+
+    assert sorted(processor.seen) == ["one", "three"]
+    with open(args.output, encoding="utf-8") as f:
+        lines = sorted(json.loads(line)["line"] for line in f)
+    assert lines == [1, 3, 4, 5]
+    assert Checkpoint(f"{args.output}.checkpoint").completed_through == 5
+
+    # Nothing is left to do on a second resume
+    assert asyncio.run(process_dump(StubProcessor(), args)) == 0
+
+
+def test_window_bounds_lines_ahead_of_checkpoint(tmp_path):
+    write_messages(tmp_path / "messages.jsonl", [f"message {i}" for i in range(1, 21)])
+    args = dump_args(tmp_path, window=3, concurrency=10)
+    processor = StubProcessor(slow=("message 1",), delay=0.1)
+
+    asyncio.run(process_dump(processor, args))
+
+    # Only lines 2 and 3 may start while line 1 is still running
+    assert processor.started_while_slow == 2
+    assert len(processor.seen) == 20
+
+
+def test_rate_limiter_spaces_out_starts():
+    limiter = RateLimiter(requests_per_minute=600)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for _ in range(4):
+            await limiter.wait()
+        return loop.time() - start
+
+    # Four starts at 0.1s intervals take at least 0.3s
+    assert asyncio.run(run()) >= 0.29
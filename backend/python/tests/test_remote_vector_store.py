@@ -0,0 +1,91 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from vector_store_client import VectorStoreClient
+
+from app.services.message_processor import MessageProcessor
+from app.services.remote_vector_store import RemoteVectorStore
+from tests.conftest import StubOpenAI
+
+
+class FakeVectorStoreAPI:
+    """In-memory /search, /store and /feedback; objects stored with the query's vector match with `score`."""
+
+    def __init__(self, score: float = 0.98):
+        self.score = score
+        self.objects = {}
+        self.searches = []
+        self.feedback = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        if request.url.path == "/store":
+            self.objects[payload["id"]] = payload
+            return httpx.Response(200, json=payload)
+        if request.url.path == "/search":
+            self.searches.append(payload)
+            found = [
+                {"id": object_id, "message": item["message"], "response": item["response"], "score": self.score}
+                for object_id, item in self.objects.items()
+                if item["mode"] == payload["mode"] and item["vector"] == payload["vector"] and self.score >= payload["threshold"]
+            ]
+            return httpx.Response(200, json=found)
+        self.feedback.append(payload)
+        return httpx.Response(200, json={"status": "success"})
+
+
+def remote_processor(settings, api):
+    settings.ab_test_openai_weight = 0.0
+    settings.ab_test_vector_db_weight = 100.0
+    client = VectorStoreClient("http://vector-store:8082", transport=httpx.MockTransport(api))
+    return MessageProcessor(settings, openai_client=StubOpenAI(), vector_store=RemoteVectorStore(settings, client=client))
+
+
+def test_processor_stores_and_finds_through_the_api(settings):
+    api = FakeVectorStoreAPI()
+
+    async def run():
+        processor = remote_processor(settings, api)
+        stored = await processor.process_message("Test message")
+        await processor.aclose()
+        # A fresh processor has no cached responses, so the hit comes from the API
+        processor = remote_processor(settings, api)
+        found = await processor.process_message("Test message")
+        await processor.aclose()
+        return stored, found
+
+    stored, found = asyncio.run(run())
+
+    # Stored under the ids the write buffer handed out, rewrites as "edit"
+    assert stored.additional_data["id"] in api.objects
+    assert sorted(item["mode"] for item in api.objects.values()) == ["analyze", "edit"]
+    # Every search and store carries the processor's embedding
+    vector = [float(len("Test message")), 1.0, 0.0]
+    assert all(item["vector"] == vector for item in api.objects.values())
+    assert all(search["vector"] == vector for search in api.searches)
+    assert found.additional_data["id"] == stored.additional_data["id"]
+    assert found.long_version == stored.long_version
+    # certainty 0.95 is a score (1 - cosine distance) of 0.9, and back
+    assert api.searches[0]["threshold"] == pytest.approx(2 * settings.vector_db_confidence_threshold - 1)
+    assert float(found.score) == pytest.approx(0.99)
+
+
+def test_feedback_goes_to_the_api(settings):
+    api = FakeVectorStoreAPI()
+
+    async def run():
+        processor = remote_processor(settings, api)
+        response = await processor.process_message("Test message")
+        await processor.process_feedback(response.additional_data["id"], False)
+        cached = processor.response_cache.get(
+            processor._response_cache_key(processor._new_context("Test message", "vector_db"), "analyze")
+        )
+        await processor.aclose()
+        return response, cached
+
+    response, cached = asyncio.run(run())
+
+    assert api.feedback == [{"response_id": response.additional_data["id"], "is_positive": False}]
+    assert cached is None
@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from app.services.message_processor import MessageProcessor
+from app.services.vector_store import VectorStore
+from tests.conftest import StubOpenAI, StubWeaviate
+
+
+@pytest.mark.parametrize("recheck, searches", [(False, 2), (True, 3)])
+def test_store_reuses_lookup_vector_and_matches(settings, recheck, searches):
+    settings.ab_test_openai_weight = 0.0
+    settings.ab_test_vector_db_weight = 100.0
+    settings.store_similarity_recheck = recheck
+    upstream = StubOpenAI()
+    store = StubWeaviate()
+    processor = MessageProcessor(
+        settings,
+        openai_client=upstream,
+        vector_store=VectorStore(settings, client=store)
+    )
+
+    async def run():
+        response = await processor.process_message("Test message")
+        await processor.aclose()
+        return response
+
+    response = asyncio.run(run())
+
+    assert response.additional_data["id"]
+    # One embedding shared by the analyze lookup, the rewrite lookup and both inserts
+    assert upstream.embedding_calls == 1
+    # Analyze and rewrite lookups; storing repeats the search only on recheck
+    assert store.searches == searches
+    assert len(store.created) == 2
+
+
+class RecordingOpenAI(StubOpenAI):
+    def __init__(self):
+        super().__init__()
+        self.system_prompts = []
+
+    async def _create_completion(self, model, messages, **kwargs):
+        self.system_prompts.append(messages[0]["content"])
+        return await super()._create_completion(model, messages, **kwargs)
+
+
+@pytest.mark.parametrize("language, expected", [("uk", "Ukrainian"), ("pl", "Russian"), (None, "Russian")])
+def test_supplied_language_replaces_text_detection(settings, language, expected):
+    settings.ab_test_openai_weight = 100.0
+    settings.ab_test_vector_db_weight = 0.0
+    upstream = RecordingOpenAI()
+    processor = MessageProcessor(settings, openai_client=upstream, vector_store=VectorStore(settings, client=StubWeaviate()))
+
+    async def run():
+        await processor.process_message("Привет, как дела", language=language)
+        await processor.aclose()
+
+    asyncio.run(run())
+
+    # Unsupported codes fall back to detection, which reads this text as Russian
+    assert upstream.system_prompts
+    assert all(f"Respond in {expected}" in prompt for prompt in upstream.system_prompts)
@@ -0,0 +1,67 @@
+import asyncio
+
+from app.services.message_processor import MessageProcessor
+from app.services.response_cache import ResponseCache
+from app.services.vector_store import VectorStore
+from app.models.api import RewrittenMessage
+from tests.conftest import StubOpenAI, StubWeaviate
+
+
+def test_repeated_message_skips_embedding_and_search(settings):
+    settings.ab_test_openai_weight = 0.0
+    settings.ab_test_vector_db_weight = 100.0
+    upstream = StubOpenAI()
+    processor = MessageProcessor(
+        settings,
+        openai_client=upstream,
+        vector_store=VectorStore(settings, client=StubWeaviate())
+    )
+
+    async def run():
+        first = await processor.process_message("Test message")
+        calls = (upstream.completion_calls, upstream.embedding_calls)
+        second = await processor.process_message("Test   message")
+
+        assert (upstream.completion_calls, upstream.embedding_calls) == calls
+        assert second.additional_data == first.additional_data
+        assert processor.response_cache.metrics()["hits"] == 1
+
+        # A dislike that deletes the stored object also drops the cached copy
+        await processor.process_feedback(first.additional_data["id"], liked=False)
+        await processor.aclose()
+
+    asyncio.run(run())
+    key = processor._response_cache_key(processor._new_context("Test message", "vector_db"), "analyze")
+    assert processor.response_cache.get(key) is None
+
+
+def test_responses_are_cached_per_language_and_arm(settings):
+    settings.ab_test_openai_weight = 0.0
+    settings.ab_test_vector_db_weight = 100.0
+    processor = MessageProcessor(
+        settings,
+        openai_client=StubOpenAI(),
+        vector_store=VectorStore(settings, client=StubWeaviate())
+    )
+
+    async def run():
+        await processor.process_message("Test message", language="en")
+        await processor.process_message("Test message", language="uk")
+        await processor.aclose()
+
+    asyncio.run(run())
+    english = processor._new_context("Test message", "vector_db", "en")
+
+    assert processor.response_cache.metrics()["hits"] == 0
+    assert processor.response_cache.get(processor._response_cache_key(english, "analyze")) is not None
+    english.arm = "openai"
+    assert processor.response_cache.get(processor._response_cache_key(english, "analyze")) is None
+
+
+def test_entries_expire_after_ttl():
+    cache = ResponseCache(ttl_seconds=0)
+    key = ResponseCache.make_key("Test message", "rewrite", "en", "vector_db")
+    cache.put(key, RewrittenMessage(long_version="Long", short_version="Short"), "id")
+
+    assert cache.get(key) is None
+    assert cache.metrics()["expirations"] == 1
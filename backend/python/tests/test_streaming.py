@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from app.services.hedging import CompletionTimeout
+from app.services.json_stream import JsonSectionParser
+from app.services.message_processor import MessageProcessor
+from app.services.vector_store import VectorStore
+from tests.conftest import StubOpenAI, StubWeaviate, ANALYSIS_RESPONSE, REWRITE_RESPONSE
+
+
+def test_parser_emits_members_as_they_complete():
+    parser = JsonSectionParser()
+
+    assert parser.feed('{"a": {"text": "x, }"}, "b"') == [("a", {"text": "x, }"})]
+    assert parser.feed(': [1, 2]') == []
+    assert parser.feed('}') == [("b", [1, 2])]
+
+
+def test_stream_message_yields_sections_before_result(settings):
+    processor = MessageProcessor(
+        settings,
+        openai_client=StubOpenAI(latency=0.01),
+        vector_store=VectorStore(settings, client=StubWeaviate())
+    )
+
+    async def collect():
+        events = [event async for event in processor.stream_message("Test message")]
+        await processor.aclose()
+        return events
+
+    events = asyncio.run(collect())
+
+    sections = [event["section"] for event in events if event["event"] == "analysis_section"]
+    assert sections == list(ANALYSIS_RESPONSE)
+    rewrite = next(event for event in events if event["event"] == "rewrite")
+    assert rewrite["data"] == REWRITE_RESPONSE
+    assert events[-1]["event"] == "result"
+    assert events[-1]["data"]["additional"]["id"]
+
+
+def test_stream_without_content_before_the_deadline_times_out(settings):
+    settings.completion_deadline = 0.05
+    processor = MessageProcessor(
+        settings,
+        openai_client=StubOpenAI(latency=1.0),
+        vector_store=VectorStore(settings, client=StubWeaviate())
+    )
+
+    async def collect():
+        try:
+            return [event async for event in processor.stream_rewrite("Test message")]
+        finally:
+            await processor.aclose()
+
+    with pytest.raises(CompletionTimeout):
+        asyncio.run(collect())
+    assert processor.metrics()["completions"]["openai"]["timeouts"] == 1
@@ -0,0 +1,58 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from vector_store_client import VectorStoreClient
+
+
+def test_requests_share_one_pooled_client():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.url.path == "/search":
+            return httpx.Response(200, json=[{"id": "1", "message": "Hi", "response": {}, "score": 0.97}])
+        return httpx.Response(200, json={"id": "2", "message": "Hi", "response": {}})
+
+    client = VectorStoreClient("http://vector-store:8082/", transport=httpx.MockTransport(handler))
+
+    async def run():
+        results = await asyncio.gather(*(client.search("Hi", "analyze", threshold=0.9, limit=1) for _ in range(5)))
+        stored = await client.store("Hi", {"analysis": {}}, "analyze")
+        await client.aclose()
+        return results, stored
+
+    results, stored = asyncio.run(run())
+
+    assert results[0][0]["score"] == 0.97
+    assert stored["id"] == "2"
+    assert str(requests[0].url) == "http://vector-store:8082/search"
+    assert json.loads(requests[0].content) == {"text": "Hi", "mode": "analyze", "limit": 1, "offset": 0, "threshold": 0.9}
+    assert client.metrics()["requests"] == 6
+    assert client._client.is_closed
+
+
+def test_http_errors_are_raised_and_counted():
+    client = VectorStoreClient(
+        "http://vector-store:8082",
+        transport=httpx.MockTransport(lambda request: httpx.Response(500, json={"detail": "down"}))
+    )
+
+    async def run():
+        with pytest.raises(httpx.HTTPStatusError):
+            await client.feedback("id", True)
+        await client.aclose()
+
+    asyncio.run(run())
+
+    assert client.metrics()["errors"] == 1
+
+
+def test_http2_falls_back_without_h2(monkeypatch):
+    monkeypatch.setattr("vector_store_client.HTTP2_AVAILABLE", False)
+    client = VectorStoreClient("http://vector-store:8082", http2=True)
+    asyncio.run(client.aclose())
+
+    assert client.http2 is False
@@ -0,0 +1,101 @@
+import asyncio
+
+from app.services.vector_store import VectorStore
+from app.services.write_buffer import WriteBehindBuffer
+from tests.conftest import StubWeaviate
+
+
+class FlakyWeaviate(StubWeaviate):
+    """Rejects every object in the first `failures` batch imports."""
+
+    def __init__(self, failures: int):
+        super().__init__()
+        self.failures = failures
+
+    def _create_batch_objects(self):
+        if self.failures:
+            self.failures -= 1
+            objects = list(self._batch_objects)
+            self._batch_objects.clear()
+            return [{"id": object_id, "result": {"errors": ["unavailable"]}} for object_id, _ in objects]
+        return super()._create_batch_objects()
+
+
+def test_objects_are_written_in_batches(settings):
+    store = StubWeaviate()
+    buffer = WriteBehindBuffer(VectorStore(settings, client=store), max_batch_size=10, flush_interval=0.05)
+
+    async def run():
+        ids = [await buffer.add({"message": f"Message {i}"}, [0.1]) for i in range(25)]
+        # Nothing is written until a batch fills or the interval passes
+        pending = buffer.is_pending(ids[-1])
+        await buffer.close()
+        return ids, pending
+
+    ids, pending = asyncio.run(run())
+
+    assert pending is True
+    assert len(set(ids)) == 25
+    assert len(store.created) == 25
+    assert buffer.metrics()["batches"] == 3
+    assert buffer.metrics()["pending"] == 0
+
+
+def test_failed_objects_are_retried_then_dropped(settings):
+    store = FlakyWeaviate(failures=1)
+    dropped = []
+    buffer = WriteBehindBuffer(
+        VectorStore(settings, client=store),
+        flush_interval=0.01,
+        max_retries=1,
+        on_drop=dropped.append
+    )
+
+    async def run():
+        retried_id = await buffer.add({"message": "Retried"}, [0.1])
+        assert await buffer.wait_for(retried_id) is True
+        store.failures = 2
+        dropped_id = await buffer.add({"message": "Dropped"}, [0.1])
+        assert await buffer.wait_for(dropped_id) is False
+        await buffer.close()
+        return dropped_id
+
+    dropped_id = asyncio.run(run())
+
+    assert store.created == [{"message": "Retried"}]
+    assert dropped == [dropped_id]
+    metrics = buffer.metrics()
+    assert metrics["retried"] == 2
+    assert metrics["dropped"] == 1
+
+
+def test_full_buffer_makes_writers_wait(settings):
+    store = StubWeaviate(latency=0.05)
+    buffer = WriteBehindBuffer(VectorStore(settings, client=store), max_batch_size=2, flush_interval=0.01, max_pending=2)
+
+    async def run():
+        for i in range(10):
+            await buffer.add({"message": f"Message {i}"}, [0.1])
+            assert buffer.metrics()["queued"] <= 2
+        await buffer.close()
+
+    asyncio.run(run())
+
+    assert len(store.created) == 10
+
+
+def test_restarted_writer_keeps_queued_objects(settings):
+    store = StubWeaviate()
+    buffer = WriteBehindBuffer(VectorStore(settings, client=store), flush_interval=0.01)
+
+    async def run():
+        object_id = await buffer.add({"message": "Queued"}, [0.1])
+        # Simulate the writer dying before it picked the object up
+        buffer._worker.cancel()
+        await asyncio.sleep(0)
+        assert await buffer.wait_for(object_id) is True
+        await buffer.close()
+
+    asyncio.run(run())
+
+    assert store.created == [{"message": "Queued"}]
@@ -0,0 +1,123 @@
+"""
+Async client for the vector-store service (/search, /store, /feedback).
+
+Shared by both backends and installed as its own distribution
+(pip install ./vector-store-client), so it only depends on httpx. Create one
+client per application and close it on shutdown: it keeps a pooled
+httpx.AsyncClient, so lookups reuse warm connections instead of paying TCP
+(and TLS) setup on every call. With the h2 package installed requests are multiplexed over
+HTTP/2; otherwise the pool falls back to HTTP/1.1 keep-alive.
+"""
+import importlib.util
+from typing import Optional, Dict, Any, List
+import httpx
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class VectorStoreClient:
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float = 5.0,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        http2: bool = True,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry
+            ),
+            http2=self.http2,
+            transport=transport
+        )
+
+        self.requests = 0
+        self.errors = 0
+
+    async def _request(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None) -> Any:
+        self.requests += 1
+        try:
+            response = await self._client.request(method, path, json=payload)
+            response.raise_for_status()
+        except httpx.HTTPError:
+            self.errors += 1
+            raise
+        return response.json()
+
+    async def search(
+        self,
+        text: str,
+        mode: str,
+        threshold: Optional[float] = None,
+        limit: int = 5,
+        offset: int = 0,
+        strategy: Optional[str] = None,
+        alpha: Optional[float] = None,
+        vector: Optional[List[float]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Stored responses of `mode` scoring at least `threshold`, best match
+        first. `strategy` is "vector", "bm25" or "hybrid"; options left unset
+        use the service's configuration. A precomputed `vector` skips the
+        service's embedding step and must come from the model the stored
+        vectors were made with.
+        """
+        payload = {"text": text, "mode": mode, "limit": limit, "offset": offset}
+        for name, value in (
+            ("threshold", threshold), ("strategy", strategy), ("alpha", alpha), ("vector", vector)
+        ):
+            if value is not None:
+                payload[name] = value
+        return await self._request("POST", "/search", payload)
+
+    async def store(
+        self,
+        message: str,
+        response: Dict[str, Any],
+        mode: str,
+        vector: Optional[List[float]] = None,
+        object_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Store a response for `message`; returns the stored object with its id.
+        With `object_id` the object is stored under that UUID, so a retried
+        store doesn't create a second copy.
+        """
+        payload = {"message": message, "response": response, "mode": mode}
+        if vector is not None:
+            payload["vector"] = vector
+        if object_id is not None:
+            payload["id"] = object_id
+        return await self._request("POST", "/store", payload)
+
+    async def revectorize(self) -> Dict[str, Any]:
+        """Start re-embedding every stored message with the service's local model."""
+        return await self._request("POST", "/revectorize")
+
+    async def feedback(self, response_id: str, is_positive: bool) -> Dict[str, Any]:
+        return await self._request("POST", "/feedback", {
+            "response_id": response_id,
+            "is_positive": is_positive
+        })
+
+    async def health(self) -> Dict[str, Any]:
+        return await self._request("GET", "/health")
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "http2": self.http2,
+            "requests": self.requests,
+            "errors": self.errors
+        }
@@ -2,6 +2,7 @@ import os
 import sys
 import pytest
 from pathlib import Path
+
 from tests.constants import TEST_ENV
 from fastapi.testclient import TestClient
 from app.main import app
@@ -0,0 +1,192 @@
+import asyncio
+from collections import deque
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+
+# Whisper works on 16 kHz mono audio
+SAMPLE_RATE = 16000
+# Whisper decodes 30-second windows
+WINDOW_SAMPLES = 30 * SAMPLE_RATE
+
+# ffmpeg reading any container from stdin and writing 16 kHz mono s16le to stdout
+FFMPEG_DECODE = [
+    "ffmpeg", "-nostdin", "-loglevel", "error",
+    "-i", "pipe:0",
+    "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE),
+    "pipe:1"
+]
+
+
+class AudioDecodeError(Exception):
+    """ffmpeg could not decode the input"""
+
+
+def pcm_to_float(data: bytes) -> np.ndarray:
+    """16-bit little-endian PCM to float32 samples in [-1, 1)"""
+    return np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768.0
+
+
+async def decode_audio(data: bytes) -> np.ndarray:
+    """
+    Decode a complete file held in memory to 16 kHz mono float32. The bytes
+    are piped through ffmpeg, so nothing touches the disk and concurrent
+    requests can't collide.
+    """
+    process = await asyncio.create_subprocess_exec(
+        *FFMPEG_DECODE,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await process.communicate(data)
+    if process.returncode != 0:
+        raise AudioDecodeError(stderr.decode(errors="replace").strip() or f"ffmpeg exited with code {process.returncode}")
+    return pcm_to_float(stdout)
+
+
+class Segment(NamedTuple):
+    start: float  # seconds from the start of the stream
+    end: float
+    audio: np.ndarray
+
+
+class EnergyVAD:
+    """Frame-level voice activity from RMS energy"""
+
+    def __init__(self, threshold_db: float = -40.0):
+        self.threshold_db = threshold_db
+
+    def is_speech(self, frame: np.ndarray) -> bool:
+        rms = float(np.sqrt(np.mean(np.square(frame), dtype=np.float64)))
+        return 20 * np.log10(max(rms, 1e-10)) > self.threshold_db
+
+
+class StreamSegmenter:
+    """
+    Cuts a PCM stream into speech segments as it arrives. A segment starts at
+    the first speech frame (plus a short pre-roll) and ends after `silence_ms`
+    of silence or at `max_segment_s`, so at most one segment of audio is held
+    no matter how long the stream runs.
+    """
+
+    def __init__(
+        self,
+        vad: EnergyVAD,
+        frame_ms: int = 30,
+        silence_ms: int = 600,
+        min_speech_ms: int = 250,
+        max_segment_s: float = 20.0,
+        pre_roll_ms: int = 300
+    ):
+        self.vad = vad
+        self.frame_size = SAMPLE_RATE * frame_ms // 1000
+        self.silence_frames = max(1, silence_ms // frame_ms)
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.max_frames = max(1, int(max_segment_s * 1000) // frame_ms)
+        self._pre_roll = deque(maxlen=pre_roll_ms // frame_ms)
+        # Odd byte and partial frame left over from the last feed
+        self._remainder = b""
+        self._partial = np.zeros(0, dtype=np.float32)
+        self._frames: List[np.ndarray] = []
+        self._start = 0
+        self._speech_frames = 0
+        self._silent_run = 0
+        self._position = 0  # samples consumed
+
+    @property
+    def buffered_samples(self) -> int:
+        return len(self._partial) + sum(len(frame) for frame in self._pre_roll) + len(self._frames) * self.frame_size
+
+    def feed(self, data: bytes) -> List[Segment]:
+        """Add 16 kHz mono s16le audio; returns the segments it completed."""
+        data = self._remainder + data
+        usable = len(data) - len(data) % 2
+        self._remainder = data[usable:]
+        samples = np.concatenate([self._partial, pcm_to_float(data[:usable])])
+
+        segments = []
+        whole = len(samples) - len(samples) % self.frame_size
+        for offset in range(0, whole, self.frame_size):
+            segment = self._add_frame(samples[offset:offset + self.frame_size])
+            if segment is not None:
+                segments.append(segment)
+        self._partial = samples[whole:]
+        return segments
+
+    def flush(self) -> List[Segment]:
+        """End of stream: the segment in progress, if it holds enough speech."""
+        segment = self._close() if self._frames else None
+        self._remainder = b""
+        self._partial = np.zeros(0, dtype=np.float32)
+        self._pre_roll.clear()
+        return [segment] if segment is not None else []
+
+    def _add_frame(self, frame: np.ndarray) -> Optional[Segment]:
+        speech = self.vad.is_speech(frame)
+        self._position += len(frame)
+        if not self._frames:
+            if not speech:
+                self._pre_roll.append(frame)
+                return None
+            self._frames = list(self._pre_roll) + [frame]
+            self._pre_roll.clear()
+            self._start = self._position - len(self._frames) * self.frame_size
+            self._speech_frames = 1
+            self._silent_run = 0
+            return None
+
+        self._frames.append(frame)
+        if speech:
+            self._speech_frames += 1
+            self._silent_run = 0
+        else:
+            self._silent_run += 1
+        if self._silent_run >= self.silence_frames or len(self._frames) >= self.max_frames:
+            return self._close()
+        return None
+
+    def _close(self) -> Optional[Segment]:
+        frames, self._frames = self._frames, []
+        if self._speech_frames < self.min_speech_frames:
+            return None
+        end = self._start + len(frames) * self.frame_size
+        return Segment(self._start / SAMPLE_RATE, end / SAMPLE_RATE, np.concatenate(frames))
+
+
+class FfmpegStream:
+    """
+    A long-running ffmpeg that turns a compressed stream written in pieces
+    (e.g. MediaRecorder webm chunks) into 16 kHz mono s16le.
+    """
+
+    def __init__(self, process: asyncio.subprocess.Process):
+        self.process = process
+
+    @classmethod
+    async def start(cls) -> "FfmpegStream":
+        process = await asyncio.create_subprocess_exec(
+            *FFMPEG_DECODE,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        return cls(process)
+
+    async def write(self, data: bytes) -> None:
+        self.process.stdin.write(data)
+        await self.process.stdin.drain()
+
+    async def close_input(self) -> None:
+        """Signal end of input; read() drains what ffmpeg still holds."""
+        if not self.process.stdin.is_closing():
+            self.process.stdin.close()
+
+    async def read(self, size: int = 65536) -> bytes:
+        """Decoded PCM as it becomes available; b"" once ffmpeg has exited"""
+        return await self.process.stdout.read(size)
+
+    async def kill(self) -> None:
+        if self.process.returncode is None:
+            self.process.kill()
+        await self.process.wait()
@@ -0,0 +1,197 @@
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from audio import SAMPLE_RATE, WINDOW_SAMPLES
+
+logger = logging.getLogger(__name__)
+
+# The silence rule model.transcribe applies with no_speech_threshold=0.6
+NO_SPEECH_THRESHOLD = 0.6
+LOGPROB_THRESHOLD = -1.0
+
+
+def pad_window(segment: np.ndarray) -> np.ndarray:
+    """Zero-pad or trim to Whisper's 30-second window"""
+    segment = segment[:WINDOW_SAMPLES].astype(np.float32, copy=False)
+    return np.pad(segment, (0, WINDOW_SAMPLES - len(segment)))
+
+
+class WhisperBackend(ABC):
+    """
+    A Whisper runtime that decodes batches of up to 30-second, 16 kHz
+    segments. WHISPER_BACKEND picks one; the scheduler calls decode_batch
+    from its inference thread.
+    """
+
+    name = ""
+
+    def __init__(self, model_size: str, device: str, languages: Optional[List[str]] = None):
+        self.model_size = model_size
+        self.device = device
+        # Detection only chooses among these; empty allows every Whisper language
+        self.languages = languages or []
+
+    @abstractmethod
+    def decode_batch(self, segments: List[np.ndarray], language: Optional[str]) -> List[Dict[str, Any]]:
+        """
+        {"text", "language"} per segment; text is empty for silence. With
+        `language` None each segment's language is identified first.
+        """
+
+    def pick_language(self, probs: Dict[str, float]) -> str:
+        """The most likely allowed language code"""
+        allowed = {code: prob for code, prob in probs.items() if code in self.languages} or probs
+        return max(allowed, key=allowed.get)
+
+    def warm_up(self) -> None:
+        """Decode a second of silence so the first request doesn't pay for lazy initialization."""
+        self.decode_batch([np.zeros(SAMPLE_RATE, dtype=np.float32)], "en")
+
+    def describe(self) -> Dict[str, Any]:
+        return {"backend": self.name, "model_size": self.model_size, "device": self.device}
+
+
+class OpenAIWhisperBackend(WhisperBackend):
+    """The reference PyTorch implementation (fp32 on CPU)"""
+
+    name = "openai-whisper"
+
+    def __init__(self, model_size: str, device: Optional[str] = None, languages: Optional[List[str]] = None):
+        import torch
+        import whisper
+
+        self.torch = torch
+        self.whisper = whisper
+        super().__init__(model_size, device or ("cuda" if torch.cuda.is_available() else "cpu"), languages)
+        self.model = whisper.load_model(model_size, device=self.device)
+
+    def decode_batch(self, segments: List[np.ndarray], language: Optional[str]) -> List[Dict[str, Any]]:
+        whisper = self.whisper
+        mel = self.torch.stack([
+            whisper.log_mel_spectrogram(pad_window(segment), self.model.dims.n_mels)
+            for segment in segments
+        ]).to(self.model.device)
+
+        if not self.model.is_multilingual:
+            languages = ["en"] * len(segments)
+        elif language is None:
+            _, probs = self.model.detect_language(mel)
+            languages = [self.pick_language(found) for found in probs]
+        else:
+            languages = [language] * len(segments)
+
+        # DecodingOptions take one language, so each language is decoded as its own batch
+        results = [None] * len(segments)
+        for lang in set(languages):
+            indexes = [i for i, found in enumerate(languages) if found == lang]
+            options = whisper.DecodingOptions(
+                task='transcribe',
+                language=lang,
+                fp16=self.device != "cpu",  # FP16 isn't supported on CPU
+                temperature=0.0,  # Greedy decoding
+                without_timestamps=True
+            )
+            for i, result in zip(indexes, whisper.decode(self.model, mel[indexes], options)):
+                results[i] = {
+                    "text": "" if result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob < LOGPROB_THRESHOLD else result.text.strip(),
+                    "language": lang
+                }
+        return results
+
+
+class FasterWhisperBackend(WhisperBackend):
+    """
+    CTranslate2 through faster-whisper, with int8 weights by default: about a
+    quarter of the fp32 memory, so `base` or `small` fits where PyTorch only
+    fits `tiny`.
+    """
+
+    name = "faster-whisper"
+
+    def __init__(
+        self,
+        model_size: str,
+        device: Optional[str] = None,
+        compute_type: str = "int8",
+        cpu_threads: int = 0,
+        languages: Optional[List[str]] = None
+    ):
+        from faster_whisper import WhisperModel
+        from faster_whisper.tokenizer import Tokenizer
+
+        super().__init__(model_size, device or "cpu", languages)
+        self.compute_type = compute_type
+        self.Tokenizer = Tokenizer
+        # cpu_threads=0 leaves the thread count to OMP_NUM_THREADS
+        self.model = WhisperModel(model_size, device=self.device, compute_type=compute_type, cpu_threads=cpu_threads)
+        self._tokenizers: Dict[Optional[str], Any] = {}
+
+    def _tokenizer(self, language: Optional[str]):
+        if language not in self._tokenizers:
+            self._tokenizers[language] = self.Tokenizer(
+                self.model.hf_tokenizer,
+                self.model.model.is_multilingual,
+                task="transcribe",
+                language=language
+            )
+        return self._tokenizers[language]
+
+    def decode_batch(self, segments: List[np.ndarray], language: Optional[str]) -> List[Dict[str, Any]]:
+        features = np.stack([
+            self.model.feature_extractor(pad_window(segment), padding=False)[:, :self.model.feature_extractor.nb_max_frames]
+            for segment in segments
+        ])
+        encoder_output = self.model.encode(features)
+
+        if not self.model.model.is_multilingual:
+            languages = ["en"] * len(segments)
+        elif language is None:
+            # (language token, probability) pairs per segment, e.g. ("<|uk|>", 0.93)
+            languages = [
+                self.pick_language({token[2:-2]: prob for token, prob in found})
+                for found in self.model.model.detect_language(encoder_output)
+            ]
+        else:
+            languages = [language] * len(segments)
+
+        tokenizers = [self._tokenizer(lang if self.model.model.is_multilingual else None) for lang in languages]
+        prompts = [tokenizer.sot_sequence + [tokenizer.no_timestamps] for tokenizer in tokenizers]
+        results = self.model.model.generate(
+            encoder_output,
+            prompts,
+            beam_size=1,  # Greedy decoding
+            max_length=448,
+            return_scores=True,
+            return_no_speech_prob=True,
+            suppress_blank=True,
+            suppress_tokens=[-1]
+        )
+        return [
+            {
+                # scores are length-normalized log probabilities
+                "text": "" if result.no_speech_prob > NO_SPEECH_THRESHOLD and result.scores[0] < LOGPROB_THRESHOLD else tokenizer.decode(result.sequences_ids[0]).strip(),
+                "language": lang
+            }
+            for result, tokenizer, lang in zip(results, tokenizers, languages)
+        ]
+
+    def describe(self) -> Dict[str, Any]:
+        return {**super().describe(), "compute_type": self.compute_type}
+
+
+def create_backend(
+    name: str,
+    model_size: str,
+    device: Optional[str] = None,
+    compute_type: str = "int8",
+    cpu_threads: int = 0,
+    languages: Optional[List[str]] = None
+) -> WhisperBackend:
+    if name == "faster-whisper":
+        return FasterWhisperBackend(model_size, device=device, compute_type=compute_type, cpu_threads=cpu_threads, languages=languages)
+    if name == "openai-whisper":
+        return OpenAIWhisperBackend(model_size, device=device, languages=languages)
+    raise ValueError(f"Unknown Whisper backend: {name}")
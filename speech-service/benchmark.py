@@ -0,0 +1,116 @@
+"""
+Compare Whisper backends on real-time factor and memory.
+
+Every configuration runs in its own process, so its peak RSS is one loaded
+model plus inference. RTF is processing time divided by audio duration
+(below 1 is faster than real time); the audio is cut into 30-second
+windows and decoded in batches of --batch-size, the way the scheduler
+batches them. --threads defaults to 1, the CPU limit in docker-compose.yml.
+
+    python benchmark.py samples/*.webm --config openai-whisper:tiny faster-whisper:base:int8 faster-whisper:small:int8
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from typing import List
+
+from audio import SAMPLE_RATE, WINDOW_SAMPLES, decode_audio
+
+DEFAULT_CONFIGS = ["openai-whisper:tiny", "openai-whisper:base", "faster-whisper:base:int8", "faster-whisper:small:int8"]
+
+
+def load_file(path: str):
+    """Decode any ffmpeg-readable file the way uploads are decoded"""
+    with open(path, "rb") as f:
+        return asyncio.run(decode_audio(f.read()))
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_config(config: str, files: List[str], args: argparse.Namespace) -> dict:
+    """Load one backend:model[:compute_type] and time it over every file."""
+    from backends import create_backend
+
+    name, model_size, *rest = config.split(":")
+    audio = [load_file(path) for path in files]
+    duration = sum(len(samples) for samples in audio) / SAMPLE_RATE
+    windows = [samples[start:start + WINDOW_SAMPLES] for samples in audio for start in range(0, len(samples), WINDOW_SAMPLES)]
+
+    started = time.perf_counter()
+    backend = create_backend(name, model_size, compute_type=rest[0] if rest else "int8", cpu_threads=args.threads)
+    backend.warm_up()
+    load_seconds = time.perf_counter() - started
+    rss_loaded = peak_rss_mb()
+
+    timings = []
+    texts = []
+    for _ in range(args.repeat):
+        began = time.perf_counter()
+        texts = []
+        for start in range(0, len(windows), args.batch_size):
+            texts += [result["text"] for result in backend.decode_batch(windows[start:start + args.batch_size], args.language)]
+        timings.append(time.perf_counter() - began)
+
+    return {
+        "config": config,
+        "audio_s": round(duration, 1),
+        "load_s": round(load_seconds, 2),
+        "rtf": round(statistics.median(timings) / duration, 3),
+        "rtf_best": round(min(timings) / duration, 3),
+        "rss_loaded_mb": round(rss_loaded),
+        "peak_rss_mb": round(peak_rss_mb()),
+        "sample": " ".join(texts)[:80]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="+", help="Audio files to transcribe")
+    parser.add_argument("--config", nargs="+", default=DEFAULT_CONFIGS, help="backend:model_size[:compute_type] to compare")
+    parser.add_argument("--batch-size", type=int, default=4, help="Windows decoded per batch")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per configuration; the median is reported")
+    parser.add_argument("--threads", type=int, default=1, help="CPU threads for inference")
+    parser.add_argument("--language", default=None, help="Language code to decode with (default: detect)")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_config(args.worker, args.files, args)))
+        return
+
+    # Thread count has to be fixed before torch/CTranslate2 are imported
+    env = {**os.environ, "OMP_NUM_THREADS": str(args.threads), "MKL_NUM_THREADS": str(args.threads)}
+    passthrough = ["--batch-size", str(args.batch_size), "--repeat", str(args.repeat), "--threads", str(args.threads)]
+    if args.language:
+        passthrough += ["--language", args.language]
+
+    print(f"{'config':<28} {'load s':>7} {'RTF':>7} {'best':>7} {'RSS MB':>8} {'peak MB':>8}  sample")
+    for config in args.config:
+        worker = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), *args.files, "--worker", config, *passthrough],
+            capture_output=True,
+            text=True,
+            env=env
+        )
+        if worker.returncode != 0:
+            error = (worker.stderr.strip().splitlines() or ["failed"])[-1]
+            print(f"{config:<28} {error}")
+            continue
+        result = json.loads(worker.stdout.strip().splitlines()[-1])
+        print(
+            f"{config:<28} {result['load_s']:>7} {result['rtf']:>7} {result['rtf_best']:>7} "
+            f"{result['rss_loaded_mb']:>8} {result['peak_rss_mb']:>8}  {result['sample']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,19 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, WebSocket, WebSocketDisconnect, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-import whisper  # This is actually openai-whisper
 import os
 import logging
 from dotenv import load_dotenv
-import torch
 from concurrent.futures import ThreadPoolExecutor
 import asyncio
 import signal
 import sys
+import numpy as np
+from typing import Optional
+from audio import SAMPLE_RATE, WINDOW_SAMPLES, AudioDecodeError, EnergyVAD, FfmpegStream, StreamSegmenter, decode_audio
+from backends import create_backend
+from scheduler import BatchScheduler
+from sessions import SessionLanguages
 
 # Configure logging
 logging.basicConfig(
@@ -21,17 +25,45 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
-# Initialize thread pool for transcription
-executor = ThreadPoolExecutor(max_workers=2)
+# Batches run one at a time on their own thread
+inference_executor = ThreadPoolExecutor(max_workers=1)
 
-# Initialize Whisper model with optimized settings
+# Inference runtime: openai-whisper (PyTorch fp32) or faster-whisper (CTranslate2, int8 by default)
+WHISPER_BACKEND = os.getenv("WHISPER_BACKEND", "openai-whisper")
+WHISPER_MODEL_SIZE = os.getenv("WHISPER_MODEL_SIZE", "tiny")
+WHISPER_DEVICE = os.getenv("WHISPER_DEVICE") or None
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
+WHISPER_CPU_THREADS = int(os.getenv("WHISPER_CPU_THREADS", "0"))
+
+# Language identification runs on a session's first segment and is cached per session
+WHISPER_LANGUAGES = [code.strip() for code in os.getenv("WHISPER_LANGUAGES", "uk,ru,en").split(",") if code.strip()]
+LANGUAGE_SESSION_MAX = int(os.getenv("LANGUAGE_SESSION_MAX", "10000"))
+LANGUAGE_SESSION_TTL_SECONDS = float(os.getenv("LANGUAGE_SESSION_TTL_SECONDS", "3600"))
+
+# Dynamic batching of Whisper segments across requests
+WHISPER_MAX_BATCH_SIZE = int(os.getenv("WHISPER_MAX_BATCH_SIZE", "8"))
+WHISPER_MAX_WAIT_MS = float(os.getenv("WHISPER_MAX_WAIT_MS", "50"))
+
+# Streaming transcription (/ws/transcribe)
+STREAM_VAD_THRESHOLD_DB = float(os.getenv("STREAM_VAD_THRESHOLD_DB", "-40"))
+STREAM_SILENCE_MS = int(os.getenv("STREAM_SILENCE_MS", "600"))
+STREAM_MIN_SPEECH_MS = int(os.getenv("STREAM_MIN_SPEECH_MS", "250"))
+STREAM_MAX_SEGMENT_SECONDS = float(os.getenv("STREAM_MAX_SEGMENT_SECONDS", "20"))
+STREAM_MAX_PENDING_SEGMENTS = int(os.getenv("STREAM_MAX_PENDING_SEGMENTS", "4"))
+
+# Load and warm up the Whisper model before accepting requests
 try:
-    logger.info("Loading Whisper model...")
-    model = whisper.load_model(
-        "tiny",  # Using tiny model for faster processing
-        device="cuda" if torch.cuda.is_available() else "cpu"
+    logger.info(f"Loading Whisper model {WHISPER_MODEL_SIZE} with {WHISPER_BACKEND}...")
+    backend = create_backend(
+        WHISPER_BACKEND,
+        WHISPER_MODEL_SIZE,
+        device=WHISPER_DEVICE,
+        compute_type=WHISPER_COMPUTE_TYPE,
+        cpu_threads=WHISPER_CPU_THREADS,
+        languages=WHISPER_LANGUAGES
     )
-    logger.info(f"Whisper model loaded successfully on {model.device}")
+    backend.warm_up()
+    logger.info(f"Whisper model loaded successfully on {backend.device}")
 except Exception as e:
     logger.error(f"Failed to load Whisper model: {e}")
     raise
@@ -65,11 +97,12 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Speech service shutting down...")
-    executor.shutdown(wait=True)
+    await scheduler.close()
+    inference_executor.shutdown(wait=True)
 
 def signal_handler(sig, frame):
     logger.info(f"Received signal {sig}, shutting down gracefully...")
-    executor.shutdown(wait=False)
+    inference_executor.shutdown(wait=False)
     sys.exit(0)
 
 signal.signal(signal.SIGINT, signal_handler)
@@ -79,11 +112,16 @@ signal.signal(signal.SIGTERM, signal_handler)
 async def health_check():
     return {
         "status": "healthy",
-        "model_loaded": model is not None,
-        "device": str(model.device),
-        "model_type": "tiny"
+        "model_loaded": backend is not None,
+        "model_type": backend.model_size,
+        **backend.describe()
     }
 
+@app.get("/metrics")
+async def get_metrics():
+    """Queue depth and batch sizes of the inference scheduler, and language cache hits"""
+    return {"scheduler": scheduler.metrics(), "session_languages": session_languages.metrics()}
+
 ALLOWED_AUDIO_TYPES = {
     'audio/webm',
     'audio/wav',
@@ -92,54 +130,88 @@ ALLOWED_AUDIO_TYPES = {
     'audio/ogg'
 }
 
-def transcribe_file(file_path: str):
-    """Run transcription in a separate thread"""
+def decode_batch(segments, language):
+    """Run up to 30-second segments through the backend as one batch (on the inference thread)"""
     try:
-        # Use faster settings for initial transcription
-        result = model.transcribe(
-            file_path,
-            fp16=False,  # Disable FP16 since it's not supported on CPU
-            language='ru',  # Set expected language
-            task='transcribe',
-            best_of=1,  # Reduce beam search
-            beam_size=1,  # Reduce beam size
-            temperature=0.0,  # Reduce randomness
-            compression_ratio_threshold=2.4,
-            no_speech_threshold=0.6,
-            condition_on_previous_text=False,
-            initial_prompt=None
-        )
-        return result
+        return backend.decode_batch(segments, language)
     except Exception as e:
-        logger.error(f"Transcription error in thread: {e}")
+        logger.error(f"Transcription error in batch: {e}")
         raise
 
+scheduler = BatchScheduler(
+    decode_batch,
+    inference_executor,
+    max_batch_size=WHISPER_MAX_BATCH_SIZE,
+    max_wait_ms=WHISPER_MAX_WAIT_MS
+)
+
+session_languages = SessionLanguages(LANGUAGE_SESSION_MAX, LANGUAGE_SESSION_TTL_SECONDS)
+
+async def transcribe(audio: np.ndarray, language: Optional[str] = None, session_id: Optional[str] = None) -> dict:
+    """
+    Transcribe 16 kHz float32 samples; each 30-second window is queued with the scheduler.
+    Without a language from the caller or the session's cache, the first window
+    is decoded with language identification and the rest use its result.
+    """
+    language = language or session_languages.get(session_id)
+    windows = [audio[start:start + WINDOW_SAMPLES] for start in range(0, len(audio), WINDOW_SAMPLES)]
+    results = []
+    if language is None and windows:
+        first = await scheduler.submit(windows[0], None)
+        results.append(first)
+        windows = windows[1:]
+        language = first["language"]
+        # A silent window says little about the language, so only speech is cached
+        if first["text"]:
+            session_languages.set(session_id, language)
+    results += await asyncio.gather(*(scheduler.submit(window, language) for window in windows))
+    return {
+        "text": " ".join(result["text"] for result in results if result["text"]),
+        "language": language
+    }
+
+def is_supported_language(language: Optional[str]) -> bool:
+    """A caller-supplied language must be one of WHISPER_LANGUAGES, when those are set"""
+    return not language or not WHISPER_LANGUAGES or language in WHISPER_LANGUAGES
+
 @app.post("/transcribe")
-async def transcribe_audio(file: UploadFile = File(...)):
+async def transcribe_audio(
+    file: UploadFile = File(...),
+    language: Optional[str] = Form(None),
+    session_id: Optional[str] = Form(None)
+):
+    """
+    Transcribe an uploaded recording. `language` skips identification;
+    otherwise the language detected for `session_id` is reused, or detected
+    now and cached for the session. The response carries the language code.
+    """
+    if not is_supported_language(language):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported language: {language}. Supported languages: {', '.join(WHISPER_LANGUAGES)}"
+        )
     if not file.content_type in ALLOWED_AUDIO_TYPES:
         raise HTTPException(
             status_code=400,
             detail=f"Unsupported audio format: {file.content_type}. Supported formats: {', '.join(ALLOWED_AUDIO_TYPES)}"
         )
 
-    temp_file_path = None
     try:
-        # Save the uploaded file temporarily
-        temp_file_path = f"temp_{file.filename}"
-        logger.info(f"Saving uploaded file to {temp_file_path}")
-        
         content = await file.read()
         if len(content) == 0:
             raise HTTPException(status_code=400, detail="Empty audio file")
-            
-        with open(temp_file_path, "wb") as buffer:
-            buffer.write(content)
-        
-        # Run transcription in thread pool
-        logger.info("Starting transcription...")
-        loop = asyncio.get_running_loop()
-        result = await loop.run_in_executor(executor, transcribe_file, temp_file_path)
-        logger.info("Transcription completed successfully")
+
+        # Decode in memory through an ffmpeg pipe; nothing is written to disk
+        try:
+            audio = await decode_audio(content)
+        except AudioDecodeError as e:
+            raise HTTPException(status_code=400, detail=f"Could not decode audio: {e}")
+        if len(audio) == 0:
+            raise HTTPException(status_code=400, detail="No audio in file")
+
+        logger.info(f"Starting transcription of {len(audio) / SAMPLE_RATE:.1f}s of audio...")
+        result = await transcribe(audio, language, session_id)
+        logger.info(f"Transcription completed successfully ({result['language']})")
         
         if not result or not result.get("text"):
             raise HTTPException(status_code=500, detail="Transcription produced no text")
@@ -153,14 +225,113 @@ async def transcribe_audio(file: UploadFile = File(...)):
     except Exception as e:
         logger.error(f"Transcription error: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
+
+@app.websocket("/ws/transcribe")
+async def transcribe_stream(
+    websocket: WebSocket,
+    audio_format: str = Query("webm", alias="format"),
+    language: Optional[str] = Query(None),
+    session_id: Optional[str] = Query(None)
+):
+    """
+    Transcribe audio while it is being recorded. The client sends binary
+    frames: chunks of any ffmpeg-readable stream (e.g. MediaRecorder webm) or,
+    with ?format=pcm, 16 kHz mono s16le. Each speech segment is transcribed as
+    soon as the VAD closes it and sent as {"type": "partial"}; after a "stop"
+    text frame the rest is flushed and {"type": "final"} carries the full text.
+    The connection is a session: the language is identified on the first
+    segment with speech (unless ?language= is given) and reused for the rest.
+    """
+    await websocket.accept()
+    if not is_supported_language(language):
+        await websocket.send_json({"type": "error", "detail": f"Unsupported language: {language}"})
+        await websocket.close(code=1008)
+        return
+    segmenter = StreamSegmenter(
+        EnergyVAD(STREAM_VAD_THRESHOLD_DB),
+        silence_ms=STREAM_SILENCE_MS,
+        min_speech_ms=STREAM_MIN_SPEECH_MS,
+        max_segment_s=STREAM_MAX_SEGMENT_SECONDS
+    )
+    # Bounded, so a busy model slows the client down instead of buffering audio
+    segments: asyncio.Queue = asyncio.Queue(maxsize=STREAM_MAX_PENDING_SEGMENTS)
+    decoder = await FfmpegStream.start() if audio_format != "pcm" else None
+
+    async def feed(data: bytes):
+        for segment in segmenter.feed(data):
+            await segments.put(segment)
+
+    async def finish():
+        for segment in segmenter.flush():
+            await segments.put(segment)
+        await segments.put(None)
+
+    async def receive():
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            if message.get("bytes"):
+                if decoder:
+                    await decoder.write(message["bytes"])
+                else:
+                    await feed(message["bytes"])
+            elif message.get("text") == "stop":
+                break
+        if decoder:
+            await decoder.close_input()
+        else:
+            await finish()
+
+    async def decode():
+        while chunk := await decoder.read():
+            await feed(chunk)
+        await finish()
+
+    async def transcribe_segments():
+        texts = []
+        index = 0
+        stream_language = language
+        while (segment := await segments.get()) is not None:
+            result = await transcribe(segment.audio, stream_language, session_id)
+            text = result["text"].strip()
+            if not text:
+                continue
+            stream_language = result["language"]
+            texts.append(text)
+            await websocket.send_json({
+                "type": "partial",
+                "segment": index,
+                "start": round(segment.start, 2),
+                "end": round(segment.end, 2),
+                "text": text,
+                "language": stream_language
+            })
+            index += 1
+        await websocket.send_json({"type": "final", "text": " ".join(texts), "language": stream_language})
+
+    tasks = [asyncio.create_task(receive()), asyncio.create_task(transcribe_segments())]
+    if decoder:
+        tasks.append(asyncio.create_task(decode()))
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            task.result()
+        await websocket.close()
+    except WebSocketDisconnect:
+        logger.info("Client disconnected during streaming transcription")
+    except Exception as e:
+        logger.error(f"Streaming transcription error: {str(e)}", exc_info=True)
+        try:
+            await websocket.send_json({"type": "error", "detail": str(e)})
+            await websocket.close(code=1011)
+        except Exception:
+            pass
     finally:
-        # Clean up temp file
-        if temp_file_path and os.path.exists(temp_file_path):
-            try:
-                os.remove(temp_file_path)
-                logger.info(f"Cleaned up temporary file: {temp_file_path}")
-            except Exception as e:
-                logger.error(f"Failed to clean up temporary file: {e}")
+        for task in tasks:
+            task.cancel()
+        if decoder:
+            await decoder.kill()
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, Hashable, List, NamedTuple, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class PendingSegment(NamedTuple):
+    audio: np.ndarray
+    key: Hashable
+    future: asyncio.Future
+    queued: float
+
+
+class BatchScheduler:
+    """
+    Runs audio segments from concurrent requests through the model together.
+    A single worker takes up to `max_batch_size` queued segments that share
+    decoding options, waiting at most `max_wait_ms` after the oldest one
+    arrived for the batch to fill. While a batch runs, new segments queue up,
+    so batches grow with load instead of requests contending for the CPU.
+
+    `run_batch(segments, key)` runs on `executor` and returns one result per
+    segment, in order.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[List[np.ndarray], Hashable], List[Any]],
+        executor: Executor,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 50.0
+    ):
+        self.run_batch = run_batch
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._pending: List[PendingSegment] = []
+        self._arrived: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+
+        self.batches = 0
+        self.segments = 0
+        self.batch_sizes: Dict[int, int] = {}
+        self.max_queue_depth = 0
+        self._queue_wait_total = 0.0
+        self._inference_total = 0.0
+
+    async def submit(self, audio: np.ndarray, key: Hashable = None) -> Any:
+        """Queue one segment (at most 30 seconds) and wait for its result."""
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done():
+            self._arrived = asyncio.Event()
+            self._worker = asyncio.create_task(self._work())
+
+        future = loop.create_future()
+        self._pending.append(PendingSegment(audio, key, future, loop.time()))
+        self.max_queue_depth = max(self.max_queue_depth, len(self._pending))
+        self._arrived.set()
+        return await future
+
+    async def _work(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._pending:
+                self._arrived.clear()
+                await self._arrived.wait()
+
+            deadline = self._pending[0].queued + self.max_wait
+            while len(self._pending) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                self._arrived.clear()
+                try:
+                    await asyncio.wait_for(self._arrived.wait(), timeout)
+                except asyncio.TimeoutError:
+                    break
+
+            batch = self._take_batch()
+            if batch:
+                await self._run(batch)
+
+    def _take_batch(self) -> List[PendingSegment]:
+        """The oldest segment and the next ones with the same key; cancelled requests are dropped."""
+        self._pending = [item for item in self._pending if not item.future.done()]
+        if not self._pending:
+            return []
+        key = self._pending[0].key
+        batch, rest = [], []
+        for item in self._pending:
+            if item.key == key and len(batch) < self.max_batch_size:
+                batch.append(item)
+            else:
+                rest.append(item)
+        self._pending = rest
+        return batch
+
+    async def _run(self, batch: List[PendingSegment]) -> None:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        self.batches += 1
+        self.segments += len(batch)
+        self.batch_sizes[len(batch)] = self.batch_sizes.get(len(batch), 0) + 1
+        self._queue_wait_total += sum(started - item.queued for item in batch)
+
+        try:
+            began = time.perf_counter()
+            results = await loop.run_in_executor(
+                self.executor, self.run_batch, [item.audio for item in batch], batch[0].key
+            )
+            self._inference_total += time.perf_counter() - began
+            for item, result in zip(batch, results):
+                if not item.future.done():
+                    item.future.set_result(result)
+        except Exception as e:
+            logger.error(f"Batch of {len(batch)} segments failed: {e}")
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+
+    async def close(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+        for item in self._pending:
+            if not item.future.done():
+                item.future.cancel()
+        self._pending = []
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": len(self._pending),
+            "max_queue_depth": self.max_queue_depth,
+            "batches": self.batches,
+            "segments": self.segments,
+            "avg_batch_size": self.segments / self.batches if self.batches else 0.0,
+            "batch_sizes": dict(sorted(self.batch_sizes.items())),
+            "avg_queue_wait_ms": 1000 * self._queue_wait_total / self.segments if self.segments else 0.0,
+            "avg_batch_ms": 1000 * self._inference_total / self.batches if self.batches else 0.0
+        }
@@ -0,0 +1,43 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class SessionLanguages:
+    """
+    The language detected for each session, so only a session's first
+    segment runs language identification and later ones decode with the
+    cached code. Bounded to `max_sessions` (least recently used go first);
+    entries expire `ttl_seconds` after they were detected.
+    """
+
+    def __init__(self, max_sessions: int = 10000, ttl_seconds: float = 3600.0):
+        self.max_sessions = max_sessions
+        self.ttl = ttl_seconds
+        self._languages: "OrderedDict[str, tuple]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, session_id: Optional[str]) -> Optional[str]:
+        if not session_id:
+            return None
+        entry = self._languages.get(session_id)
+        if entry is None or time.monotonic() - entry[1] > self.ttl:
+            self._languages.pop(session_id, None)
+            self.misses += 1
+            return None
+        self._languages.move_to_end(session_id)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, session_id: Optional[str], language: str) -> None:
+        if not session_id:
+            return
+        self._languages[session_id] = (language, time.monotonic())
+        self._languages.move_to_end(session_id)
+        while len(self._languages) > self.max_sessions:
+            self._languages.popitem(last=False)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {"sessions": len(self._languages), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,92 @@
+import asyncio
+import io
+import shutil
+import wave
+
+import numpy as np
+import pytest
+
+from audio import SAMPLE_RATE, AudioDecodeError, EnergyVAD, StreamSegmenter, decode_audio
+
+needs_ffmpeg = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+
+
+def pcm(seconds, amplitude):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (amplitude * 32767 * np.sin(2 * np.pi * 220 * t)).astype("<i2").tobytes()
+
+
+def segmenter(**kwargs):
+    return StreamSegmenter(EnergyVAD(-40.0), **kwargs)
+
+
+def test_speech_between_silences_becomes_one_segment():
+    audio = pcm(1.0, 0.0) + pcm(1.5, 0.5) + pcm(1.0, 0.0)
+    seg = segmenter()
+
+    # Odd-sized chunks, as they arrive from a decoder pipe
+    segments = []
+    for offset in range(0, len(audio), 4001):
+        segments += seg.feed(audio[offset:offset + 4001])
+
+    assert len(segments) == 1
+    assert segments[0].start == pytest.approx(0.7, abs=0.05)
+    assert segments[0].end == pytest.approx(3.1, abs=0.05)
+    assert segments[0].audio.dtype == np.float32
+    assert seg.flush() == []
+
+
+def test_short_blips_are_dropped():
+    seg = segmenter(min_speech_ms=250)
+
+    segments = seg.feed(pcm(0.5, 0.0) + pcm(0.1, 0.5) + pcm(1.0, 0.0))
+
+    assert segments == []
+
+
+def test_long_speech_is_cut_and_buffer_stays_bounded():
+    seg = segmenter(max_segment_s=2.0)
+    segments = []
+    peak = 0
+    for _ in range(10):
+        segments += seg.feed(pcm(1.0, 0.5))
+        peak = max(peak, seg.buffered_samples)
+    segments += seg.flush()
+
+    assert len(segments) == 5
+    assert all(len(segment.audio) <= 2 * SAMPLE_RATE for segment in segments)
+    assert peak <= 2 * SAMPLE_RATE
+
+
+def test_flush_returns_the_segment_in_progress():
+    seg = segmenter()
+
+    assert seg.feed(pcm(1.0, 0.5)) == []
+    segments = seg.flush()
+
+    assert len(segments) == 1
+    assert segments[0].end == pytest.approx(1.0, abs=0.05)
+
+
+def wav(data, rate):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(data)
+    return buffer.getvalue()
+
+
+@needs_ffmpeg
+def test_upload_is_decoded_and_resampled_in_memory():
+    audio = asyncio.run(decode_audio(wav(np.zeros(8000, dtype="<i2").tobytes() + pcm(0.5, 0.5)[:16000], 8000)))
+
+    assert audio.dtype == np.float32
+    assert len(audio) == pytest.approx(2 * SAMPLE_RATE, abs=200)
+
+
+@needs_ffmpeg
+def test_undecodable_upload_raises():
+    with pytest.raises(AudioDecodeError):
+        asyncio.run(decode_audio(b"not audio at all"))
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from audio import WINDOW_SAMPLES
+from backends import WhisperBackend, create_backend, pad_window
+
+
+def test_windows_are_padded_or_trimmed_to_30_seconds():
+    short = pad_window(np.ones(10, dtype=np.float64))
+    long = pad_window(np.ones(WINDOW_SAMPLES + 10, dtype=np.float32))
+
+    assert short.shape == long.shape == (WINDOW_SAMPLES,)
+    assert short.dtype == np.float32
+    assert short[:10].sum() == 10 and short[10:].sum() == 0
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        create_backend("onnx", "base")
+
+
+class Backend(WhisperBackend):
+    def decode_batch(self, segments, language):
+        return []
+
+
+def test_detection_picks_the_likeliest_allowed_language():
+    probs = {"ru": 0.5, "uk": 0.3, "pl": 0.6, "en": 0.1}
+
+    assert Backend("base", "cpu", ["uk", "ru", "en"]).pick_language(probs) == "ru"
+    assert Backend("base", "cpu", ["uk"]).pick_language(probs) == "uk"
+    # Without allowed languages, or none of them scored, every language counts
+    assert Backend("base", "cpu").pick_language(probs) == "pl"
+    assert Backend("base", "cpu", ["de"]).pick_language(probs) == "pl"
@@ -0,0 +1,95 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from scheduler import BatchScheduler
+
+
+class FakeModel:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def __call__(self, segments, key):
+        with self.lock:
+            self.batches.append((len(segments), key))
+        threading.Event().wait(self.delay)
+        return [f"{key}:{len(segment)}" for segment in segments]
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_concurrent_segments_share_a_batch():
+    model = FakeModel()
+
+    async def main():
+        scheduler = BatchScheduler(model, ThreadPoolExecutor(1), max_batch_size=8, max_wait_ms=50)
+        results = await asyncio.gather(*(scheduler.submit(np.zeros(n), "ru") for n in range(1, 6)))
+        await scheduler.close()
+        return results, scheduler.metrics()
+
+    results, metrics = run(main())
+
+    assert results == ["ru:1", "ru:2", "ru:3", "ru:4", "ru:5"]
+    assert model.batches == [(5, "ru")]
+    assert metrics["batch_sizes"] == {5: 1}
+    assert metrics["queue_depth"] == 0
+
+
+def test_batches_are_capped_and_split_by_key():
+    model = FakeModel()
+
+    async def main():
+        scheduler = BatchScheduler(model, ThreadPoolExecutor(1), max_batch_size=2, max_wait_ms=50)
+        keys = ["ru", "en", "ru", "ru", "en"]
+        results = await asyncio.gather(*(scheduler.submit(np.zeros(1), key) for key in keys))
+        await scheduler.close()
+        return results
+
+    results = run(main())
+
+    assert results == ["ru:1", "en:1", "ru:1", "ru:1", "en:1"]
+    assert sorted(model.batches) == [(1, "ru"), (2, "en"), (2, "ru")]
+
+
+def test_segments_arriving_during_a_batch_form_the_next_one():
+    model = FakeModel(delay=0.1)
+
+    async def main():
+        scheduler = BatchScheduler(model, ThreadPoolExecutor(1), max_batch_size=8, max_wait_ms=1)
+        first = asyncio.ensure_future(scheduler.submit(np.zeros(1)))
+        await asyncio.sleep(0.03)
+        rest = [asyncio.ensure_future(scheduler.submit(np.zeros(1))) for _ in range(4)]
+        await asyncio.sleep(0.01)
+        depth = scheduler.metrics()["queue_depth"]
+        await asyncio.gather(first, *rest)
+        await scheduler.close()
+        return depth, scheduler.metrics()
+
+    depth, metrics = run(main())
+
+    assert depth == 4
+    assert [size for size, _ in model.batches] == [1, 4]
+    assert metrics["max_queue_depth"] == 4
+    assert metrics["avg_batch_size"] == pytest.approx(2.5)
+
+
+def test_failed_batch_fails_every_request_in_it():
+    def broken(segments, key):
+        raise RuntimeError("model failed")
+
+    async def main():
+        scheduler = BatchScheduler(broken, ThreadPoolExecutor(1), max_wait_ms=10)
+        results = await asyncio.gather(*(scheduler.submit(np.zeros(1)) for _ in range(2)), return_exceptions=True)
+        await scheduler.close()
+        return results
+
+    results = run(main())
+
+    assert all(isinstance(result, RuntimeError) for result in results)
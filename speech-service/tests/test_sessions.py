@@ -0,0 +1,35 @@
+from sessions import SessionLanguages
+
+
+def test_language_is_cached_per_session():
+    languages = SessionLanguages()
+    languages.set("a", "uk")
+    languages.set(None, "en")
+
+    assert languages.get("a") == "uk"
+    assert languages.get("b") is None
+    assert languages.get(None) is None
+    assert languages.metrics() == {"sessions": 1, "hits": 1, "misses": 1}
+
+
+def test_least_recently_used_sessions_are_evicted():
+    languages = SessionLanguages(max_sessions=2)
+    languages.set("a", "uk")
+    languages.set("b", "ru")
+    languages.get("a")
+    languages.set("c", "en")
+
+    assert languages.get("b") is None
+    assert languages.get("a") == "uk"
+    assert languages.get("c") == "en"
+
+
+def test_entries_expire(monkeypatch):
+    languages = SessionLanguages(ttl_seconds=60)
+    now = [1000.0]
+    monkeypatch.setattr("sessions.time.monotonic", lambda: now[0])
+    languages.set("a", "uk")
+    now[0] += 61
+
+    assert languages.get("a") is None
+    assert languages.metrics()["sessions"] == 0
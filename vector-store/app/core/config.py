@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from pydantic import ConfigDict, Field
+from typing import Literal
 
 class Settings(BaseSettings):
     # Service settings
@@ -15,6 +16,42 @@ class Settings(BaseSettings):
         description="Confidence threshold for vector database matches"
     )
     
+    # "weaviate", or "faiss" for an embedded HNSW index persisted under FAISS_PATH
+    VECTOR_BACKEND: Literal["weaviate", "faiss"] = "weaviate"
+    FAISS_PATH: str = "/app/data/faiss"
+    FAISS_HNSW_M: int = 32
+    FAISS_EF_CONSTRUCTION: int = 200
+    FAISS_EF_SEARCH: int = 64
+    FAISS_SNAPSHOT_EVERY: int = Field(default=1000, description="Stores between automatic index snapshots")
+    
+    # Search strategy: "vector" (near_text), "bm25" or "hybrid"
+    SEARCH_STRATEGY: Literal["vector", "bm25", "hybrid"] = "vector"
+    HYBRID_ALPHA: float = Field(default=0.5, description="Hybrid weight of the vector score; 0 is pure BM25")
+    LEXICAL_SHORTCUT: bool = Field(
+        default=False,
+        description="Look verbatim repeats up by message before the vector search; costs a BM25 round trip on Weaviate"
+    )
+    SEARCH_RECALL_SAMPLE_RATE: float = Field(
+        default=0.05,
+        description="Share of bm25/hybrid searches re-run as vector searches to measure recall"
+    )
+    
+    # Embeddings: "weaviate" vectorizes through t2v-transformers, "local" runs
+    # the model in this process; callers may also send precomputed vectors
+    VECTORIZER: Literal["weaviate", "local"] = "weaviate"
+    # Same model as the t2v-transformers container, so stored vectors stay comparable
+    LOCAL_EMBEDDING_MODEL: str = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+    LOCAL_EMBEDDING_DEVICE: str = "cpu"
+    LOCAL_EMBEDDING_BATCH_SIZE: int = 32
+    LOCAL_EMBEDDING_MAX_WAIT_MS: float = 5.0
+    REVECTORIZE_PAGE_SIZE: int = 256
+    
+    # Write-behind batch imports for /store
+    WRITE_BATCH_SIZE: int = 100
+    WRITE_FLUSH_INTERVAL: float = 1.0
+    WRITE_MAX_PENDING: int = 10000
+    WRITE_MAX_RETRIES: int = 3
+    
     # Schema settings
     WEAVIATE_CLASS_NAME: str = "ChatMessage"
     
@@ -1,7 +1,7 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
-from app.services.weaviate_service import weaviate_service
+from app.services.vector_service import create_vector_service
 from app.models.schemas import SearchRequest, StoreRequest, FeedbackRequest, VectorResponse
 from typing import List
 import logging
@@ -25,21 +25,41 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Weaviate, or the embedded FAISS index with VECTOR_BACKEND=faiss
+vector_service = create_vector_service()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Write out pending objects (and the FAISS snapshot)"""
+    await vector_service.close()
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics")
+async def get_metrics():
+    """Per-strategy search latency and recall, and write buffer counters"""
+    return vector_service.metrics()
+
 @app.post("/search", response_model=List[VectorResponse])
 async def search_responses(request: SearchRequest):
     """Search for similar responses in the vector store."""
     try:
-        responses = await weaviate_service.search(
+        responses = await vector_service.search(
             text=request.text,
             mode=request.mode,
             threshold=request.threshold,
-            limit=request.limit
+            limit=request.limit,
+            offset=request.offset,
+            strategy=request.strategy,
+            alpha=request.alpha,
+            lexical_shortcut=request.lexical_shortcut,
+            vector=request.vector
         )
         return responses
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -47,17 +67,39 @@ async def search_responses(request: SearchRequest):
 async def store_response(request: StoreRequest):
     """Store a new response in the vector store."""
     try:
-        response = await weaviate_service.store(request)
+        response = await vector_service.store(request)
         return response
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/revectorize")
+async def start_revectorize():
+    """Re-embed all stored messages with the local model in the background."""
+    try:
+        return vector_service.start_revectorize()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/snapshot")
+async def take_snapshot():
+    """Persist the in-process index now (FAISS backend only)."""
+    try:
+        return await vector_service.snapshot()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/revectorize")
+async def revectorize_status():
+    return vector_service.revectorize_status
+
 @app.post("/feedback")
 async def update_feedback(request: FeedbackRequest):
     """Update feedback for a response."""
     try:
         logger.info(f"Received feedback request: {request}")
-        success = await weaviate_service.update_feedback(
+        success = await vector_service.update_feedback(
             response_id=request.response_id,
             is_positive=request.is_positive
         )
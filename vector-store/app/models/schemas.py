@@ -1,12 +1,21 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Literal, Dict, Any
+from typing import Optional, Literal, Dict, Any, List
 from datetime import datetime
+from uuid import UUID
 
 class SearchRequest(BaseModel):
     text: str
     mode: Literal["edit", "analyze"]
-    threshold: float = 0.85
-    limit: int = 5
+    # Minimum score (1 - cosine distance); defaults to VECTOR_DB_CONFIDENCE_THRESHOLD
+    threshold: Optional[float] = Field(default=None, ge=0.0, le=1.0)
+    limit: int = Field(default=5, ge=1, le=100)
+    offset: int = Field(default=0, ge=0)
+    # Unset fields use the service's SEARCH_STRATEGY, HYBRID_ALPHA and LEXICAL_SHORTCUT
+    strategy: Optional[Literal["vector", "bm25", "hybrid"]] = None
+    alpha: Optional[float] = Field(default=None, ge=0.0, le=1.0)
+    lexical_shortcut: Optional[bool] = None
+    # Precomputed query vector from the same model as the stored vectors
+    vector: Optional[List[float]] = None
 
 class FeedbackRequest(BaseModel):
     response_id: str
@@ -17,8 +26,15 @@ class VectorResponse(BaseModel):
     message: str
     response: Dict[str, Any]
     feedback: str = "neutral"
+    mode: Optional[str] = None
     score: Optional[float] = None
 
 class StoreRequest(BaseModel):
     message: str
-    response: Dict[str, Any] 
\ No newline at end of file
+    response: Dict[str, Any]
+    # Clients from before modes existed stored analyses
+    mode: Literal["edit", "analyze"] = "analyze"
+    # Stored as the object's vector instead of vectorizing the message
+    vector: Optional[List[float]] = None
+    # Caller-assigned UUID, so a retried store doesn't create a second copy
+    id: Optional[UUID] = None
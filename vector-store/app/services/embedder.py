@@ -0,0 +1,96 @@
+import asyncio
+import logging
+from typing import Optional, Dict, Any, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class LocalEmbedder:
+    """
+    sentence-transformers model run in-process, so searches and stores don't
+    wait on the vectorizer container. Concurrent `embed` calls are collected
+    and encoded together: a batch runs when it reaches `max_batch_size` texts
+    or `max_wait_ms` after its first text arrived. Vectors are normalized, so
+    cosine distance matches the t2v-transformers vectorizer.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        device: Optional[str] = None,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0
+    ):
+        # Imported here so the service doesn't load torch unless it embeds locally
+        from sentence_transformers import SentenceTransformer
+
+        logger.info(f"Loading embedding model {model_name}")
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name, device=device)
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+
+        self.batches = 0
+        self.texts = 0
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        vectors = self.model.encode(texts, batch_size=self.max_batch_size, normalize_embeddings=True)
+        return [vector.tolist() for vector in vectors]
+
+    async def embed(self, text: str) -> List[float]:
+        """Queue a text and wait for its vector."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    async def embed_many(self, texts: List[str]) -> List[List[float]]:
+        """Encode a list of texts directly, e.g. when re-vectorizing stored objects."""
+        self.batches += 1
+        self.texts += len(texts)
+        return await asyncio.to_thread(self._encode, texts)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending[:self.max_batch_size], self._pending[self.max_batch_size:]
+        task = asyncio.ensure_future(self._send(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+        if self._pending:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+
+    async def _send(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        try:
+            by_text = dict(zip(texts, await self.embed_many(texts)))
+            for text, future in batch:
+                if not future.done():
+                    future.set_result(by_text[text])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "model": self.model_name,
+            "batches": self.batches,
+            "texts": self.texts,
+            "avg_batch_size": self.texts / self.batches if self.batches else 0.0,
+            "pending": len(self._pending)
+        }
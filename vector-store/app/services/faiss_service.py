@@ -0,0 +1,402 @@
+import asyncio
+import glob
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Optional, Dict, List, Tuple
+
+import faiss
+import numpy as np
+
+from app.core.config import settings
+from app.models.schemas import VectorResponse, StoreRequest
+from app.services.search_metrics import SearchMetrics
+from app.services.vector_service import VectorService, normalize, properties_from_request, to_response
+
+logger = logging.getLogger(__name__)
+
+
+class FaissService(VectorService):
+    """
+    Embedded vector store for deployments that don't need Weaviate: one HNSW
+    index per mode, searched in-process, so filtering by mode is exact and a
+    lookup has no network hop.
+
+    Vectors are appended to `vectors.f32` and objects to `objects.sqlite`;
+    all metadata is also kept in memory. Index snapshots are written to
+    `snapshots/` every FAISS_SNAPSHOT_EVERY stores and on shutdown. At startup
+    the newest snapshot of each mode is memory-mapped and only rows stored
+    after it are added from the memory-mapped vector file. Vectors are
+    L2-normalized, so inner product is the cosine similarity Weaviate reports.
+
+    There is no vectorizer: stores and searches need a precomputed vector or
+    VECTORIZER=local, and only the "vector" search strategy is supported.
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._snapshot_dir = os.path.join(path, "snapshots")
+        os.makedirs(self._snapshot_dir, exist_ok=True)
+        self._vectors_path = os.path.join(path, "vectors.f32")
+        self._db = sqlite3.connect(os.path.join(path, "objects.sqlite"), check_same_thread=False)
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS objects ("
+            "row INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, properties TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);"
+        )
+        # Writes are serialized; HNSW search and add must not overlap
+        self._writes = asyncio.Lock()
+        self._index_lock = threading.Lock()
+
+        self.dim: Optional[int] = None
+        self._indexes: Dict[str, faiss.Index] = {}
+        # row -> (object id, properties)
+        self._objects: Dict[int, Tuple[str, dict]] = {}
+        self._rows_by_id: Dict[str, int] = {}
+        # (mode, normalized message) -> row, for the lexical shortcut
+        self._rows_by_message: Dict[Tuple[str, str], int] = {}
+        self._next_row = 0
+        self._stores_since_snapshot = 0
+        self._revectorize_task: Optional[asyncio.Task] = None
+        self._recall_tasks = set()
+        self.search_metrics = SearchMetrics()
+        self._load()
+
+    # Persistence
+
+    def _load(self) -> None:
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+        if row is None:
+            return
+        self.dim = int(row[0])
+        for row, object_id, properties in self._db.execute("SELECT row, id, properties FROM objects ORDER BY row"):
+            self._remember(row, object_id, json.loads(properties))
+
+        vectors = self._vector_file()
+        stored_rows = len(vectors) if vectors is not None else 0
+        self._next_row = max(stored_rows, max(self._objects, default=-1) + 1)
+        by_mode: Dict[str, List[int]] = {}
+        for row, (_, properties) in self._objects.items():
+            if row < stored_rows:
+                by_mode.setdefault(properties["mode"], []).append(row)
+            else:
+                logger.warning(f"Object in row {row} has no stored vector; it won't be searchable")
+
+        for mode, rows in by_mode.items():
+            index, covered = self._read_snapshot(mode)
+            rows = [row for row in rows if row > covered]
+            if rows:
+                index.add_with_ids(np.ascontiguousarray(vectors[rows]), np.asarray(rows, dtype=np.int64))
+                # Replayed rows aren't in a snapshot yet
+                self._stores_since_snapshot += len(rows)
+            self._indexes[mode] = index
+        logger.info(f"Loaded {len(self._objects)} objects in {len(self._indexes)} FAISS indexes")
+
+    def _vector_file(self) -> Optional[np.ndarray]:
+        """The stored vectors, memory-mapped as (rows, dim)."""
+        if self.dim is None or not os.path.exists(self._vectors_path):
+            return None
+        rows = os.path.getsize(self._vectors_path) // (self.dim * 4)
+        if rows == 0:
+            return None
+        return np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+
+    def _new_index(self) -> faiss.Index:
+        hnsw = faiss.IndexHNSWFlat(self.dim, settings.FAISS_HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        hnsw.hnsw.efConstruction = settings.FAISS_EF_CONSTRUCTION
+        hnsw.hnsw.efSearch = settings.FAISS_EF_SEARCH
+        return faiss.IndexIDMap2(hnsw)
+
+    def _snapshots(self, mode: str) -> List[Tuple[int, str]]:
+        """(last covered row, path) of a mode's snapshots, newest first"""
+        found = []
+        for path in glob.glob(os.path.join(self._snapshot_dir, f"{mode}.*.faiss")):
+            covered = os.path.basename(path)[len(mode) + 1:-len(".faiss")]
+            if covered.lstrip("-").isdigit():
+                found.append((int(covered), path))
+        return sorted(found, reverse=True)
+
+    def _read_snapshot(self, mode: str) -> Tuple[faiss.Index, int]:
+        """The newest snapshot of a mode and the last row it covers, or an empty index"""
+        for covered, path in self._snapshots(mode):
+            try:
+                index = faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            except RuntimeError:
+                try:
+                    index = faiss.read_index(path)
+                except RuntimeError as e:
+                    logger.error(f"Unreadable snapshot {path}: {e}")
+                    continue
+            if index.d == self.dim:
+                faiss.downcast_index(index.index).hnsw.efSearch = settings.FAISS_EF_SEARCH
+                return index, covered
+        return self._new_index(), -1
+
+    def _write_snapshots(self) -> Dict[str, int]:
+        """Write every index; the covered row is in the file name, so a snapshot and its position are replaced together."""
+        written = {}
+        for mode, index in list(self._indexes.items()):
+            covered = self._next_row - 1
+            path = os.path.join(self._snapshot_dir, f"{mode}.{covered}.faiss")
+            faiss.write_index(index, path + ".tmp")
+            os.replace(path + ".tmp", path)
+            for old_covered, old_path in self._snapshots(mode):
+                if old_covered != covered:
+                    os.remove(old_path)
+            written[mode] = index.ntotal
+        self._stores_since_snapshot = 0
+        return written
+
+    async def snapshot(self) -> dict:
+        async with self._writes:
+            written = await asyncio.to_thread(self._write_snapshots)
+        return {"snapshot": written}
+
+    async def close(self) -> None:
+        if self._stores_since_snapshot:
+            await self.snapshot()
+        self._db.close()
+
+    # Storage
+
+    def _remember(self, row: int, object_id: str, properties: dict) -> None:
+        self._objects[row] = (object_id, properties)
+        self._rows_by_id[object_id] = row
+        self._rows_by_message[(properties["mode"], normalize(properties["message"]))] = row
+
+    def _prepare(self, vector: List[float]) -> np.ndarray:
+        array = np.asarray([vector], dtype=np.float32)
+        if self.dim is not None and array.shape[1] != self.dim:
+            raise ValueError(f"Vector has {array.shape[1]} dimensions, the index has {self.dim}")
+        faiss.normalize_L2(array)
+        return array
+
+    def _append(self, object_id: str, properties: dict, vector: List[float]) -> None:
+        if self.dim is None:
+            self.dim = len(vector)
+            self._db.execute("INSERT INTO meta (key, value) VALUES ('dim', ?)", (str(self.dim),))
+        array = self._prepare(vector)
+        row = self._next_row
+        with open(self._vectors_path, "ab") as f:
+            # A row whose object insert never commits is skipped on load
+            f.seek(row * self.dim * 4)
+            f.truncate()
+            f.write(array.tobytes())
+        self._db.execute(
+            "INSERT INTO objects (row, id, properties) VALUES (?, ?, ?)",
+            (row, object_id, json.dumps(properties))
+        )
+        self._db.commit()
+
+        mode = properties["mode"]
+        if mode not in self._indexes:
+            self._indexes[mode] = self._new_index()
+        with self._index_lock:
+            self._indexes[mode].add_with_ids(array, np.asarray([row], dtype=np.int64))
+        self._remember(row, object_id, properties)
+        self._next_row += 1
+        self._stores_since_snapshot += 1
+
+    async def _vector_for(self, text: str, vector: Optional[List[float]]) -> List[float]:
+        if vector is not None:
+            return vector
+        if self.embedder is None:
+            raise ValueError("The FAISS backend needs a precomputed vector or VECTORIZER=local")
+        return await self.embedder.embed(text)
+
+    async def store(self, request: StoreRequest) -> VectorResponse:
+        object_id = str(request.id or uuid.uuid4())
+        if (row := self._rows_by_id.get(object_id)) is not None:
+            # A retried store; the index has no in-place update
+            return to_response(object_id, self._objects[row][1])
+        vector = await self._vector_for(request.message, request.vector)
+        properties = properties_from_request(request)
+        async with self._writes:
+            await asyncio.to_thread(self._append, object_id, properties, vector)
+            if self._stores_since_snapshot >= settings.FAISS_SNAPSHOT_EVERY:
+                await asyncio.to_thread(self._write_snapshots)
+        return to_response(object_id, properties)
+
+    async def update_feedback(self, response_id: str, is_positive: bool) -> bool:
+        row = self._rows_by_id.get(response_id)
+        if row is None:
+            logger.error(f"Response not found: {response_id}")
+            return False
+        object_id, properties = self._objects[row]
+        properties["feedback"] = "positive" if is_positive else "negative"
+        async with self._writes:
+            await asyncio.to_thread(self._update_properties, row, properties)
+        return True
+
+    def _update_properties(self, row: int, properties: dict) -> None:
+        self._db.execute("UPDATE objects SET properties = ? WHERE row = ?", (json.dumps(properties), row))
+        self._db.commit()
+
+    # Search
+
+    def _search(self, vector: List[float], mode: str, threshold: float, limit: int, offset: int) -> List[Tuple[int, float]]:
+        index = self._indexes.get(mode)
+        if index is None or index.ntotal == 0:
+            return []
+        query = self._prepare(vector)
+        with self._index_lock:
+            scores, rows = index.search(query, min(limit + offset, index.ntotal))
+        hits = [
+            (int(row), float(score)) for row, score in zip(rows[0], scores[0])
+            if row >= 0 and score >= threshold
+        ]
+        return hits[offset:]
+
+    def _exact_search(self, vector: List[float], mode: str, threshold: float, limit: int, offset: int) -> List[Tuple[int, float]]:
+        """Brute-force search over the stored vectors, the reference for recall samples"""
+        vectors = self._vector_file()
+        rows = [
+            row for row, (_, properties) in list(self._objects.items())
+            if properties["mode"] == mode and row < len(vectors)
+        ]
+        if not rows:
+            return []
+        scores = np.asarray(vectors[rows]) @ self._prepare(vector)[0]
+        order = np.argsort(-scores)[:limit + offset]
+        return [(rows[i], float(scores[i])) for i in order if scores[i] >= threshold][offset:]
+
+    def _lexical_match(self, text: str, mode: str, threshold: float, vector: Optional[List[float]]) -> List[Tuple[int, float]]:
+        """
+        The row storing `text` up to case and whitespace, scored against the
+        query `vector` and kept only at `threshold` or above. Without a query
+        vector only an identical message matches, with score 1.
+        """
+        row = self._rows_by_message.get((mode, normalize(text)))
+        if row is None:
+            return []
+        if vector is None:
+            return [(row, 1.0)] if self._objects[row][1]["message"] == text else []
+        score = float(np.asarray(self._vector_file()[row]) @ self._prepare(vector)[0])
+        return [(row, score)] if score >= threshold else []
+
+    async def search(
+        self,
+        text: str,
+        mode: str,
+        threshold: Optional[float] = None,
+        limit: int = 5,
+        offset: int = 0,
+        strategy: Optional[str] = None,
+        alpha: Optional[float] = None,
+        lexical_shortcut: Optional[bool] = None,
+        vector: Optional[List[float]] = None
+    ) -> List[VectorResponse]:
+        """
+        Nearest stored responses of `mode` scoring at least `threshold`.
+        With `lexical_shortcut` a message stored verbatim is looked up in the
+        lexical map first; it is scored like a vector hit and must meet
+        `threshold` too.
+        """
+        threshold = settings.VECTOR_DB_CONFIDENCE_THRESHOLD if threshold is None else threshold
+        strategy = strategy or settings.SEARCH_STRATEGY
+        if strategy != "vector":
+            raise ValueError(f"The FAISS backend doesn't support {strategy} search")
+        if lexical_shortcut is None:
+            lexical_shortcut = settings.LEXICAL_SHORTCUT
+
+        started = time.perf_counter()
+        hits = []
+        if lexical_shortcut and offset == 0:
+            hits = self._lexical_match(text, mode, threshold, vector)
+        shortcut = bool(hits)
+        if not shortcut:
+            vector = await self._vector_for(text, vector)
+            hits = self._search(vector, mode, threshold, limit, offset)
+            if random.random() < settings.SEARCH_RECALL_SAMPLE_RATE:
+                self._sample_recall(vector, mode, threshold, limit, offset, hits)
+        self.search_metrics.record(strategy, time.perf_counter() - started, shortcut)
+
+        return [to_response(*self._objects[row], score) for row, score in hits]
+
+    def _sample_recall(self, vector, mode, threshold, limit, offset, hits) -> None:
+        """Compare an HNSW result with an exact search in the background"""
+        returned = [row for row, _ in hits]
+
+        async def sample():
+            try:
+                reference = await asyncio.to_thread(self._exact_search, vector, mode, threshold, limit, offset)
+                self.search_metrics.record_recall("vector", returned, [row for row, _ in reference])
+            except Exception as e:
+                logger.warning(f"Recall sample failed: {e}")
+
+        task = asyncio.create_task(sample())
+        self._recall_tasks.add(task)
+        task.add_done_callback(self._recall_tasks.discard)
+
+    # Re-vectorization
+
+    def start_revectorize(self) -> dict:
+        """
+        Re-embed every stored message with the local model and rebuild the
+        indexes. Unlike Weaviate the dimension may change. Stores wait until
+        it finishes.
+        """
+        if self.embedder is None:
+            raise ValueError("Re-vectorization needs VECTORIZER=local")
+        if self._revectorize_task is None or self._revectorize_task.done():
+            self.revectorize_status = {"running": True, "processed": 0, "error": None}
+            self._revectorize_task = asyncio.create_task(self._revectorize())
+        return dict(self.revectorize_status)
+
+    async def _revectorize(self) -> None:
+        new_path = self._vectors_path + ".new"
+        try:
+            async with self._writes:
+                rows = list(range(self._next_row))
+                dim = None
+                with open(new_path, "wb") as f:
+                    for start in range(0, len(rows), settings.REVECTORIZE_PAGE_SIZE):
+                        page = rows[start:start + settings.REVECTORIZE_PAGE_SIZE]
+                        texts = [self._objects[row][1]["message"] if row in self._objects else "" for row in page]
+                        vectors = np.asarray(await self.embedder.embed_many(texts), dtype=np.float32)
+                        faiss.normalize_L2(vectors)
+                        dim = vectors.shape[1]
+                        f.write(vectors.tobytes())
+                        self.revectorize_status["processed"] += len(page)
+                await asyncio.to_thread(self._swap_vectors, new_path, dim)
+            logger.info(f"Re-vectorized {self.revectorize_status['processed']} objects")
+        except Exception as e:
+            logger.error(f"Re-vectorization failed: {e}")
+            self.revectorize_status["error"] = str(e)
+        finally:
+            self.revectorize_status["running"] = False
+
+    def _swap_vectors(self, new_path: str, dim: Optional[int]) -> None:
+        """Replace the vector file, rebuild every index from it and snapshot the result"""
+        if dim is None:
+            return
+        os.replace(new_path, self._vectors_path)
+        self.dim = dim
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('dim', ?)", (str(dim),))
+        self._db.commit()
+        vectors = self._vector_file()
+        by_mode: Dict[str, List[int]] = {}
+        for row, (_, properties) in self._objects.items():
+            by_mode.setdefault(properties["mode"], []).append(row)
+        indexes = {}
+        for mode, rows in by_mode.items():
+            indexes[mode] = self._new_index()
+            indexes[mode].add_with_ids(np.ascontiguousarray(vectors[rows]), np.asarray(rows, dtype=np.int64))
+        self._indexes = indexes
+        self._write_snapshots()
+
+    def metrics(self) -> dict:
+        return {
+            "search": self.search_metrics.metrics(),
+            "objects": len(self._objects),
+            "indexes": {mode: index.ntotal for mode, index in self._indexes.items()},
+            "stores_since_snapshot": self._stores_since_snapshot,
+            "embedder": self.embedder.metrics() if self.embedder is not None else None,
+            "revectorize": dict(self.revectorize_status)
+        }
@@ -0,0 +1,67 @@
+from collections import deque
+from typing import Dict, Any, Iterable
+
+
+class StrategyStats:
+    """Latency of one search strategy and its sampled recall against vector search."""
+
+    def __init__(self, window: int = 1000):
+        self.searches = 0
+        self.shortcuts = 0
+        self.latency_total = 0.0
+        self._latencies: "deque[float]" = deque(maxlen=window)
+        self.recall_samples = 0
+        self.recall_total = 0.0
+
+    def record(self, latency: float, shortcut: bool) -> None:
+        self.searches += 1
+        self.latency_total += latency
+        self._latencies.append(latency)
+        if shortcut:
+            self.shortcuts += 1
+
+    def _quantile(self, q: float) -> float:
+        if not self._latencies:
+            return 0.0
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "searches": self.searches,
+            "lexical_shortcuts": self.shortcuts,
+            "avg_latency": self.latency_total / self.searches if self.searches else 0.0,
+            "p50_latency": self._quantile(0.5),
+            "p95_latency": self._quantile(0.95),
+            "recall_samples": self.recall_samples,
+            "recall": self.recall_total / self.recall_samples if self.recall_samples else None
+        }
+
+
+class SearchMetrics:
+    """
+    Per-strategy search telemetry. Recall is measured on sampled requests
+    by re-running them as pure vector searches: the share of the vector
+    hits that the strategy also returned.
+    """
+
+    def __init__(self):
+        self._stats: Dict[str, StrategyStats] = {}
+
+    def _strategy(self, strategy: str) -> StrategyStats:
+        return self._stats.setdefault(strategy, StrategyStats())
+
+    def record(self, strategy: str, latency: float, shortcut: bool = False) -> None:
+        self._strategy(strategy).record(latency, shortcut)
+
+    def record_recall(self, strategy: str, returned: Iterable[str], reference: Iterable[str]) -> None:
+        reference = set(reference)
+        if not reference:
+            # Nothing qualified, so there was nothing to miss
+            return
+        stats = self._strategy(strategy)
+        stats.recall_samples += 1
+        stats.recall_total += len(reference & set(returned)) / len(reference)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {strategy: stats.metrics() for strategy, stats in self._stats.items()}
@@ -0,0 +1,137 @@
+import json
+import logging
+import math
+from abc import ABC, abstractmethod
+from typing import Optional, List
+
+from app.core.config import settings
+from app.models.schemas import VectorResponse, StoreRequest
+from app.services.embedder import LocalEmbedder
+
+logger = logging.getLogger(__name__)
+
+# Stored properties of a ChatMessage object
+SEARCH_PROPERTIES = [
+    "message",
+    "analysis_json",
+    "long_version",
+    "short_version",
+    "response_id",
+    "certainty",
+    "feedback",
+    "mode"
+]
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def cosine(a: List[float], b: List[float]) -> float:
+    """Cosine similarity, the score of a vector hit"""
+    norm = math.sqrt(sum(x * x for x in a) * sum(y * y for y in b))
+    return sum(x * y for x, y in zip(a, b)) / norm if norm else 0.0
+
+
+def properties_from_request(request: StoreRequest) -> dict:
+    """Flatten a store request into the stored properties"""
+    return {
+        "message": request.message,
+        "analysis_json": json.dumps(request.response.get("analysis", {})),
+        "long_version": request.response.get("long_version", ""),
+        "short_version": request.response.get("short_version", ""),
+        "response_id": request.response.get("id", ""),
+        "certainty": request.response.get("certainty", 0.0),
+        "feedback": "neutral",
+        "mode": request.mode
+    }
+
+
+def to_response(object_id: str, item: dict, score: Optional[float] = None) -> VectorResponse:
+    """Rebuild the API response from stored properties"""
+    try:
+        analysis = json.loads(item.get("analysis_json") or "{}")
+    except json.JSONDecodeError:
+        logger.error("Failed to decode analysis JSON")
+        analysis = {}
+
+    response_obj = {
+        "analysis": analysis,
+        "long_version": item.get("long_version", ""),
+        "short_version": item.get("short_version", ""),
+        "id": item.get("response_id", ""),
+        "certainty": item.get("certainty", 0.0)
+    }
+    return VectorResponse(
+        id=object_id,
+        message=item.get("message", ""),
+        response=response_obj,
+        feedback=item.get("feedback") or "neutral",
+        mode=item.get("mode"),
+        score=score
+    )
+
+
+class VectorService(ABC):
+    """
+    Storage and similarity search behind the vector-store API. Implemented by
+    WeaviateService and the embedded FaissService; VECTOR_BACKEND picks one.
+    """
+
+    def __init__(self):
+        # Without a local model, texts are vectorized by the backend (Weaviate only)
+        self.embedder = LocalEmbedder(
+            settings.LOCAL_EMBEDDING_MODEL,
+            device=settings.LOCAL_EMBEDDING_DEVICE,
+            max_batch_size=settings.LOCAL_EMBEDDING_BATCH_SIZE,
+            max_wait_ms=settings.LOCAL_EMBEDDING_MAX_WAIT_MS
+        ) if settings.VECTORIZER == "local" else None
+        self.revectorize_status = {"running": False, "processed": 0, "error": None}
+
+    @abstractmethod
+    async def search(
+        self,
+        text: str,
+        mode: str,
+        threshold: Optional[float] = None,
+        limit: int = 5,
+        offset: int = 0,
+        strategy: Optional[str] = None,
+        alpha: Optional[float] = None,
+        lexical_shortcut: Optional[bool] = None,
+        vector: Optional[List[float]] = None
+    ) -> List[VectorResponse]:
+        """Stored responses of `mode` scoring at least `threshold`, best first."""
+
+    @abstractmethod
+    async def store(self, request: StoreRequest) -> VectorResponse:
+        """Store a new response and return it with its id."""
+
+    @abstractmethod
+    async def update_feedback(self, response_id: str, is_positive: bool) -> bool:
+        """Record feedback; False when the response doesn't exist."""
+
+    @abstractmethod
+    def start_revectorize(self) -> dict:
+        """Start re-embedding stored messages with the local model."""
+
+    @abstractmethod
+    def metrics(self) -> dict:
+        pass
+
+    async def flush(self) -> None:
+        """Wait until stored responses are searchable."""
+
+    async def snapshot(self) -> dict:
+        raise ValueError(f"{type(self).__name__} does not take snapshots")
+
+    async def close(self) -> None:
+        pass
+
+
+def create_vector_service() -> VectorService:
+    if settings.VECTOR_BACKEND == "faiss":
+        from app.services.faiss_service import FaissService
+        return FaissService(settings.FAISS_PATH)
+    from app.services.weaviate_service import WeaviateService
+    return WeaviateService()
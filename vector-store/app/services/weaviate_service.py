@@ -1,19 +1,63 @@
+import asyncio
+import random
+import time
 import weaviate
+from weaviate.gql.get import HybridFusion
 from datetime import datetime, timezone
 from app.core.config import settings
 from app.models.schemas import VectorResponse, StoreRequest
+from app.services.write_buffer import WriteBuffer
+from app.services.search_metrics import SearchMetrics
+from app.services.vector_service import (
+    VectorService,
+    SEARCH_PROPERTIES,
+    cosine,
+    normalize,
+    properties_from_request,
+    to_response
+)
+import json
 import logging
 import uuid
-import json
+from typing import Optional, List
 
 logger = logging.getLogger(__name__)
 
-class WeaviateService:
+# Keyword matching (bm25, and the lexical half of hybrid) runs against the stored message
+LEXICAL_PROPERTIES = ["message"]
+
+# Stored objects are filtered by mode, so it is indexed but not vectorized
+MODE_PROPERTY = {
+    "name": "mode",
+    "dataType": ["text"],
+    "tokenization": "field",
+    "indexFilterable": True,
+    "moduleConfig": {
+        "text2vec-transformers": {
+            "skip": True
+        }
+    }
+}
+
+class WeaviateService(VectorService):
     def __init__(self):
+        super().__init__()
         self.client = weaviate.Client(
             url=f"http://{settings.WEAVIATE_HOST}:{settings.WEAVIATE_PORT}"
         )
         self._ensure_schema()
+        self.write_buffer = WriteBuffer(
+            self.client,
+            settings.WEAVIATE_CLASS_NAME,
+            max_batch_size=settings.WRITE_BATCH_SIZE,
+            flush_interval=settings.WRITE_FLUSH_INTERVAL,
+            max_pending=settings.WRITE_MAX_PENDING,
+            max_retries=settings.WRITE_MAX_RETRIES
+        )
+        self.search_metrics = SearchMetrics()
+        # Background recall samples, referenced until they finish
+        self._recall_tasks = set()
+        self._revectorize_task: Optional[asyncio.Task] = None
     
     def _list_collections(self):
         """List all collections in Weaviate."""
@@ -36,6 +80,7 @@ class WeaviateService:
             classes = [c["class"] for c in schema.get("classes", [])]
             if settings.WEAVIATE_CLASS_NAME in classes:
                 logger.info(f"Collection {settings.WEAVIATE_CLASS_NAME} already exists")
+                self._ensure_mode_property(schema)
                 return
         except Exception as e:
             logger.error(f"Error getting schema: {e}")
@@ -97,7 +142,8 @@ class WeaviateService:
                     {
                         "name": "feedback",
                         "dataType": ["text"]
-                    }
+                    },
+                    MODE_PROPERTY
                 ]
             }
             self.client.schema.create_class(class_obj)
@@ -108,122 +154,258 @@ class WeaviateService:
             if "already exists" not in str(e):
                 raise
 
-    async def search(self, text: str, mode: str, threshold: float = 0.85, limit: int = 5) -> list[VectorResponse]:
-        """Search for similar responses."""
-        try:
-            logger.info(f"Starting search with text: {text}, mode: {mode}, limit: {limit}")
-            # Get all objects with similarity score
-            result = (
-                self.client.query
-                .get(settings.WEAVIATE_CLASS_NAME, [
-                    "message",
-                    "analysis_json",
-                    "long_version",
-                    "short_version",
-                    "response_id",
-                    "certainty",
-                    "feedback"
-                ])
-                .with_near_text({
-                    "concepts": [text],
-                    "properties": ["message", "long_version", "short_version"]
-                })
-                .with_limit(limit)
-                .with_additional(["id", "distance"])
-                .do()
+    def _ensure_mode_property(self, schema: dict):
+        """
+        Add the mode property to collections created before searches were
+        filtered by it, and backfill it so the existing objects stay searchable.
+        """
+        for class_obj in schema.get("classes", []):
+            if class_obj["class"] != settings.WEAVIATE_CLASS_NAME:
+                continue
+            if not any(prop["name"] == "mode" for prop in class_obj.get("properties", [])):
+                logger.info(f"Adding mode property to {settings.WEAVIATE_CLASS_NAME}")
+                self.client.schema.property.create(settings.WEAVIATE_CLASS_NAME, MODE_PROPERTY)
+                self._backfill_mode()
+
+    def _backfill_mode(self):
+        """Set the mode of objects stored without one; only analyze responses carry an analysis."""
+        after, updated = None, 0
+        while page := self._page(after):
+            for item in page:
+                if not item.get("mode"):
+                    mode = "analyze" if json.loads(item.get("analysis_json") or "{}") else "edit"
+                    self.client.data_object.update({"mode": mode}, settings.WEAVIATE_CLASS_NAME, item["_additional"]["id"])
+                    updated += 1
+            after = page[-1]["_additional"]["id"]
+        logger.info(f"Backfilled the mode of {updated} objects")
+
+    def _query(
+        self,
+        text: str,
+        mode: str,
+        threshold: float,
+        limit: int,
+        offset: int,
+        strategy: str = "vector",
+        alpha: float = 0.5,
+        vector: Optional[List[float]] = None,
+        include_vector: bool = False
+    ) -> list:
+        """
+        Search objects of `mode`. Vector searches apply the threshold as a
+        distance cutoff inside Weaviate; hybrid scores are fused per query,
+        so the threshold is applied to them here; BM25 hits are returned by rank.
+        Without a query `vector`, Weaviate vectorizes `text` itself.
+        `include_vector` adds each BM25 hit's stored vector.
+        """
+        query = (
+            self.client.query
+            .get(settings.WEAVIATE_CLASS_NAME, SEARCH_PROPERTIES)
+            .with_where({
+                "path": ["mode"],
+                "operator": "Equal",
+                "valueText": mode
+            })
+            .with_limit(limit)
+            .with_offset(offset)
+        )
+        if strategy == "bm25":
+            query = query.with_bm25(text, properties=LEXICAL_PROPERTIES).with_additional(
+                ["id", "score", "vector"] if include_vector else ["id", "score"]
             )
-            
-            logger.info(f"Search result: {result}")
-            
-            responses = []
-            if result and "data" in result and "Get" in result["data"]:
-                objects = result["data"]["Get"][settings.WEAVIATE_CLASS_NAME]
-                logger.info(f"Found {len(objects)} objects")
-                for item in objects:
-                    # Convert distance to score (distance is inverse of similarity)
-                    distance = item.get("_additional", {}).get("distance", 1.0)
-                    score = 1.0 - distance if distance <= 1.0 else 0.0
-                    
-                    # Only include results with score above threshold
-                    if score >= settings.VECTOR_DB_CONFIDENCE_THRESHOLD:
-                        try:
-                            analysis = json.loads(item.get("analysis_json", "{}"))
-                        except json.JSONDecodeError:
-                            logger.error("Failed to decode analysis JSON")
-                            analysis = {}
-                        
-                        response_obj = {
-                            "analysis": analysis,
-                            "long_version": item.get("long_version", ""),
-                            "short_version": item.get("short_version", ""),
-                            "id": item.get("response_id", ""),
-                            "certainty": item.get("certainty", 0.0)
-                        }
-                        
-                        response_data = {
-                            "id": item.get("_additional", {}).get("id"),
-                            "message": item.get("message", ""),
-                            "response": response_obj,
-                            "feedback": item.get("feedback", "neutral"),
-                            "score": score
-                        }
-                        responses.append(VectorResponse(**response_data))
-                logger.info(f"Filtered to {len(responses)} objects above threshold {settings.VECTOR_DB_CONFIDENCE_THRESHOLD}")
+        elif strategy == "hybrid":
+            query = query.with_hybrid(
+                text,
+                alpha=alpha,
+                vector=vector,
+                properties=LEXICAL_PROPERTIES,
+                # Normalized fusion keeps scores in [0, 1] so the threshold stays meaningful
+                fusion_type=HybridFusion.RELATIVE_SCORE
+            ).with_additional(["id", "score"])
+        elif vector is not None:
+            query = query.with_near_vector({
+                "vector": vector,
+                # score = 1 - cosine distance, so the cutoff is applied by Weaviate
+                "distance": 1.0 - threshold
+            }).with_additional(["id", "distance"])
+        else:
+            query = query.with_near_text({
+                "concepts": [text],
+                "distance": 1.0 - threshold
+            }).with_additional(["id", "distance"])
+
+        result = query.do()
+        if "errors" in result:
+            raise RuntimeError(f"Weaviate search failed: {result['errors']}")
+        objects = result.get("data", {}).get("Get", {}).get(settings.WEAVIATE_CLASS_NAME) or []
+        for item in objects:
+            additional = item["_additional"]
+            if "distance" in additional:
+                item["score"] = 1.0 - additional["distance"]
             else:
-                logger.warning(f"No results found or invalid response format: {result}")
-            
-            return responses
+                item["score"] = float(additional.get("score") or 0.0)
+        if strategy == "hybrid":
+            objects = [item for item in objects if item["score"] >= threshold]
+        return objects
+
+    def _lexical_match(self, text: str, mode: str, threshold: float, vector: Optional[List[float]]) -> list:
+        """
+        The top BM25 hit when its message equals the query up to case and
+        whitespace, scored like a vector hit against the query `vector` and
+        kept only at `threshold` or above. Without a query vector only an
+        identical message matches; it would embed to the same vector (score 1).
+        """
+        objects = self._query(text, mode, 0.0, 1, 0, strategy="bm25", include_vector=vector is not None)
+        if not objects or normalize(objects[0].get("message", "")) != normalize(text):
+            return []
+        item = objects[0]
+        if vector is None:
+            item["score"] = 1.0
+            return [item] if item.get("message") == text else []
+        item["score"] = cosine(vector, item["_additional"].get("vector") or [])
+        return [item] if item["score"] >= threshold else []
+
+    async def search(
+        self,
+        text: str,
+        mode: str,
+        threshold: Optional[float] = None,
+        limit: int = 5,
+        offset: int = 0,
+        strategy: Optional[str] = None,
+        alpha: Optional[float] = None,
+        lexical_shortcut: Optional[bool] = None,
+        vector: Optional[List[float]] = None
+    ) -> list[VectorResponse]:
+        """
+        Search for similar responses of one mode, best first; `offset` pages
+        through further hits. `strategy` is "vector" (near-text), "bm25" or
+        "hybrid" weighted by `alpha` (1 = pure vector). Vector and hybrid hits
+        score at least `threshold`. With the lexical shortcut a message stored
+        verbatim is looked up with BM25 first; it is scored like a vector hit
+        and must meet `threshold` too. A precomputed query `vector` must come from the same model
+        as the stored vectors; otherwise the local model (VECTORIZER=local) or
+        Weaviate's vectorizer embeds `text`. Unset arguments fall back to the
+        service settings.
+        """
+        threshold = settings.VECTOR_DB_CONFIDENCE_THRESHOLD if threshold is None else threshold
+        strategy = strategy or settings.SEARCH_STRATEGY
+        alpha = settings.HYBRID_ALPHA if alpha is None else alpha
+        if lexical_shortcut is None:
+            lexical_shortcut = settings.LEXICAL_SHORTCUT
+        try:
+            started = time.perf_counter()
+            objects = []
+            if lexical_shortcut and strategy != "bm25" and offset == 0:
+                objects = await asyncio.to_thread(self._lexical_match, text, mode, threshold, vector)
+            shortcut = bool(objects)
+            if not shortcut:
+                if vector is None and strategy != "bm25" and self.embedder is not None:
+                    vector = await self.embedder.embed(text)
+                objects = await asyncio.to_thread(
+                    self._query, text, mode, threshold, limit, offset, strategy, alpha, vector
+                )
+            self.search_metrics.record(strategy, time.perf_counter() - started, shortcut)
+            logger.info(f"Found {len(objects)} {mode} objects with {strategy} search{' (lexical shortcut)' if shortcut else ''}")
+
+            if strategy != "vector" and random.random() < settings.SEARCH_RECALL_SAMPLE_RATE:
+                self._sample_recall(text, mode, threshold, limit, offset, strategy, objects, vector)
+            return [to_response(item["_additional"]["id"], item, item["score"]) for item in objects]
         except Exception as e:
             logger.error(f"Error searching: {e}")
             raise
 
+    def _sample_recall(self, text, mode, threshold, limit, offset, strategy, objects, vector) -> None:
+        """Re-run a search as a vector search in the background and record the strategy's recall."""
+        returned = [item["_additional"]["id"] for item in objects]
+
+        async def sample():
+            try:
+                if vector is None and self.embedder is not None:
+                    query_vector = await self.embedder.embed(text)
+                else:
+                    query_vector = vector
+                reference = await asyncio.to_thread(
+                    self._query, text, mode, threshold, limit, offset, "vector", 0.0, query_vector
+                )
+                self.search_metrics.record_recall(strategy, returned, [item["_additional"]["id"] for item in reference])
+            except Exception as e:
+                logger.warning(f"Recall sample failed: {e}")
+
+        task = asyncio.create_task(sample())
+        self._recall_tasks.add(task)
+        task.add_done_callback(self._recall_tasks.discard)
+
+    def metrics(self) -> dict:
+        return {
+            "search": self.search_metrics.metrics(),
+            "write_buffer": self.write_buffer.metrics(),
+            "embedder": self.embedder.metrics() if self.embedder is not None else None,
+            "revectorize": dict(self.revectorize_status)
+        }
+
+    def _page(self, after: Optional[str]) -> list:
+        """One page of stored objects in id order, starting after the `after` cursor."""
+        query = (
+            self.client.query
+            .get(settings.WEAVIATE_CLASS_NAME, SEARCH_PROPERTIES)
+            .with_additional(["id"])
+            .with_limit(settings.REVECTORIZE_PAGE_SIZE)
+        )
+        if after is not None:
+            query = query.with_after(after)
+        result = query.do()
+        if "errors" in result:
+            raise RuntimeError(f"Weaviate listing failed: {result['errors']}")
+        return result.get("data", {}).get("Get", {}).get(settings.WEAVIATE_CLASS_NAME) or []
+
+    def start_revectorize(self) -> dict:
+        """
+        Start re-embedding every stored message with the local model in the
+        background, e.g. after LOCAL_EMBEDDING_MODEL changed. Objects are
+        rewritten under their ids through the write buffer. The new vectors
+        must have the collection's dimension.
+        """
+        if self.embedder is None:
+            raise ValueError("Re-vectorization needs VECTORIZER=local")
+        if self._revectorize_task is None or self._revectorize_task.done():
+            self.revectorize_status = {"running": True, "processed": 0, "error": None}
+            self._revectorize_task = asyncio.create_task(self._revectorize())
+        return dict(self.revectorize_status)
+
+    async def _revectorize(self) -> None:
+        after = None
+        try:
+            while page := await asyncio.to_thread(self._page, after):
+                vectors = await self.embedder.embed_many([item.get("message") or "" for item in page])
+                for item, vector in zip(page, vectors):
+                    properties = {name: item[name] for name in SEARCH_PROPERTIES if item.get(name) is not None}
+                    await self.write_buffer.add(item["_additional"]["id"], properties, vector)
+                self.revectorize_status["processed"] += len(page)
+                after = page[-1]["_additional"]["id"]
+            await self.write_buffer.flush()
+            logger.info(f"Re-vectorized {self.revectorize_status['processed']} objects")
+        except Exception as e:
+            logger.error(f"Re-vectorization failed: {e}")
+            self.revectorize_status["error"] = str(e)
+        finally:
+            self.revectorize_status["running"] = False
+
     async def store(self, request: StoreRequest) -> VectorResponse:
         """Store a new response."""
         try:
-            # Generate UUID for the new object
-            new_id = str(uuid.uuid4())
+            # Use the caller's id or generate one; a stored id is overwritten
+            new_id = str(request.id or uuid.uuid4())
             
-            # Flatten the response object
-            properties = {
-                "message": request.message,
-                "analysis_json": json.dumps(request.response.get("analysis", {})),
-                "long_version": request.response.get("long_version", ""),
-                "short_version": request.response.get("short_version", ""),
-                "response_id": request.response.get("id", ""),
-                "certainty": request.response.get("certainty", 0.0),
-                "feedback": "neutral",
-                "_additional": {
-                    "id": new_id
-                }
-            }
-            
-            # Create object with properties
-            result = self.client.data_object.create(
-                data_object=properties,
-                class_name=settings.WEAVIATE_CLASS_NAME,
-                uuid=new_id  # Explicitly set the UUID
-            )
-            
-            if not result:
-                raise Exception("Failed to store object in Weaviate")
-            
-            # Reconstruct response object for return
-            response_obj = {
-                "analysis": json.loads(properties["analysis_json"]),
-                "long_version": properties["long_version"],
-                "short_version": properties["short_version"],
-                "id": properties["response_id"],
-                "certainty": properties["certainty"]
-            }
+            properties = properties_from_request(request)
             
-            return_data = {
-                "id": new_id,
-                "message": properties["message"],
-                "response": response_obj,
-                "feedback": properties["feedback"]
-            }
-                
-            return VectorResponse(**return_data)
+            vector = request.vector
+            if vector is None and self.embedder is not None:
+                vector = await self.embedder.embed(request.message)
+
+            # Queue the object; it is written with the next batch import
+            await self.write_buffer.add(new_id, properties, vector)
+            return to_response(new_id, properties)
         except Exception as e:
             logger.error(f"Error storing: {e}")
             raise
@@ -254,6 +436,11 @@ class WeaviateService:
                 logger.error(f"Invalid UUID format: {response_id}")
                 return False
 
+            # Make sure a freshly stored object has reached Weaviate
+            if self.write_buffer.is_pending(str(uuid_obj)) and not await self.write_buffer.wait_for(str(uuid_obj)):
+                logger.error(f"Object {response_id} was never stored")
+                return False
+
             # Debug: List all objects
             debug_result = self._list_all_objects()
             logger.info(f"Debug - all objects before update: {debug_result}")
@@ -281,4 +468,9 @@ class WeaviateService:
             logger.error(f"Unexpected error updating feedback: {e}")
             return False
 
-weaviate_service = WeaviateService() 
\ No newline at end of file
+    async def flush(self) -> None:
+        await self.write_buffer.flush()
+
+    async def close(self) -> None:
+        """Write out objects still waiting in the write buffer"""
+        await self.write_buffer.close() 
\ No newline at end of file
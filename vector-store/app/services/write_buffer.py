@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Optional, Dict, Any, List, Tuple
+
+import weaviate
+
+logger = logging.getLogger(__name__)
+
+# (object id, properties, vector, attempt); a None vector is computed by Weaviate's vectorizer
+PendingWrite = Tuple[str, Dict[str, Any], Optional[List[float]], int]
+
+
+class WriteBuffer:
+    """
+    Write-behind buffer for new objects. Objects are collected and sent with
+    one Weaviate batch import when `max_batch_size` is reached or
+    `flush_interval` seconds pass. `max_pending` bounds the queue so callers
+    wait when Weaviate falls behind; failed objects are retried up to
+    `max_retries` times.
+    """
+
+    def __init__(
+        self,
+        client: weaviate.Client,
+        class_name: str,
+        max_batch_size: int = 100,
+        flush_interval: float = 1.0,
+        max_pending: int = 10000,
+        max_retries: int = 3
+    ):
+        self.client = client
+        self.class_name = class_name
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self._max_pending = max_pending
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._retries: "deque[PendingWrite]" = deque()
+        self._batch: List[PendingWrite] = []
+        self._results: Dict[str, asyncio.Future] = {}
+        # client.batch is one shared buffer
+        self._batch_lock = threading.Lock()
+
+        self.written = 0
+        self.batches = 0
+        self.retried = 0
+        self.dropped = 0
+
+    def _ensure_worker(self) -> asyncio.Queue:
+        if self._worker is None or self._worker.done():
+            # Objects the previous writer still held are retried by the new one
+            self._retries.extend(self._batch)
+            self._batch = []
+            if self._queue is not None:
+                while not self._queue.empty():
+                    self._retries.append(self._queue.get_nowait())
+            self._queue = asyncio.Queue(maxsize=self._max_pending)
+            self._worker = asyncio.create_task(self._run())
+        return self._queue
+
+    async def add(self, object_id: str, properties: Dict[str, Any], vector: Optional[List[float]] = None) -> None:
+        """Queue an object; waits while the buffer is full. An existing id is overwritten."""
+        queue = self._ensure_worker()
+        self._results[object_id] = asyncio.get_running_loop().create_future()
+        await queue.put((object_id, properties, vector, 0))
+
+    def is_pending(self, object_id: str) -> bool:
+        return object_id in self._results
+
+    async def wait_for(self, object_id: str) -> bool:
+        """Wait until one queued object is written; False if it was dropped or is unknown."""
+        result = self._results.get(object_id)
+        if result is None:
+            return False
+        self._ensure_worker()
+        return await asyncio.shield(result)
+
+    async def _next_batch(self) -> List[PendingWrite]:
+        batch = []
+        while self._retries and len(batch) < self.max_batch_size:
+            batch.append(self._retries.popleft())
+        if not batch:
+            batch.append(await self._queue.get())
+
+        try:
+            async with asyncio.timeout(self.flush_interval):
+                while len(batch) < self.max_batch_size:
+                    batch.append(await self._queue.get())
+        except TimeoutError:
+            pass
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            self._batch = await self._next_batch()
+            await self._write(self._batch)
+            self._batch = []
+
+    def _import(self, batch: List[PendingWrite]) -> set:
+        """Send one batch import and return the ids that failed."""
+        with self._batch_lock:
+            for object_id, properties, vector, _ in batch:
+                self.client.batch.add_data_object(
+                    data_object=properties,
+                    class_name=self.class_name,
+                    uuid=object_id,
+                    vector=vector
+                )
+            try:
+                results = self.client.batch.create_objects() or []
+            finally:
+                # A failed import leaves its objects in the shared batch; don't resend them with the next one
+                self.client.batch.empty_objects()
+        return {
+            item.get("id") for item in results
+            if (item.get("result") or {}).get("errors")
+        }
+
+    def _settle(self, object_id: str, written: bool) -> None:
+        result = self._results.pop(object_id, None)
+        if result is not None and not result.done():
+            result.set_result(written)
+
+    async def _write(self, batch: List[PendingWrite]) -> None:
+        self.batches += 1
+        try:
+            failed = await asyncio.to_thread(self._import, batch)
+        except Exception as e:
+            logger.error(f"Batch import of {len(batch)} objects failed: {e}")
+            failed = {object_id for object_id, _, _, _ in batch}
+
+        for object_id, properties, vector, attempt in batch:
+            if object_id not in failed:
+                self.written += 1
+                self._settle(object_id, True)
+            elif attempt < self.max_retries:
+                self.retried += 1
+                self._retries.append((object_id, properties, vector, attempt + 1))
+            else:
+                logger.error(f"Dropping object {object_id} after {attempt + 1} failed attempts")
+                self.dropped += 1
+                self._settle(object_id, False)
+
+    async def flush(self) -> None:
+        """Wait until every object queued so far has been written or dropped."""
+        if self._results:
+            self._ensure_worker()
+            await asyncio.gather(*(asyncio.shield(result) for result in list(self._results.values())))
+
+    async def close(self) -> None:
+        """Flush outstanding objects and stop the background writer."""
+        await self.flush()
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "queued": (self._queue.qsize() if self._queue is not None else 0) + len(self._retries),
+            "pending": len(self._results),
+            "written": self.written,
+            "batches": self.batches,
+            "retried": self.retried,
+            "dropped": self.dropped
+        }
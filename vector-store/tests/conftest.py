@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Add the vector-store directory to the Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
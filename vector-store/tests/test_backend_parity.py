@@ -0,0 +1,171 @@
+"""
+The same scenarios against every vector backend. FAISS always runs; the
+Weaviate backend runs when WEAVIATE_TEST_URL points at a Weaviate instance
+(e.g. http://localhost:8081) and uses a throwaway class.
+"""
+import asyncio
+import math
+import os
+import uuid
+from urllib.parse import urlparse
+
+import pytest
+
+from app.core.config import settings
+from app.models.schemas import StoreRequest
+
+pytest.importorskip("faiss")
+
+A = [1.0, 0.0, 0.0, 0.0]
+B = [0.8, 0.6, 0.0, 0.0]
+C = [0.0, 0.0, 1.0, 0.0]
+
+
+@pytest.fixture(params=["faiss", "weaviate"])
+def service(request, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "VECTORIZER", "weaviate")
+    monkeypatch.setattr(settings, "SEARCH_STRATEGY", "vector")
+    monkeypatch.setattr(settings, "SEARCH_RECALL_SAMPLE_RATE", 0.0)
+    if request.param == "faiss":
+        from app.services.faiss_service import FaissService
+        yield FaissService(str(tmp_path))
+        return
+
+    url = os.environ.get("WEAVIATE_TEST_URL")
+    if not url:
+        pytest.skip("WEAVIATE_TEST_URL is not set")
+    from app.services.weaviate_service import WeaviateService
+    parsed = urlparse(url)
+    monkeypatch.setattr(settings, "WEAVIATE_HOST", parsed.hostname)
+    monkeypatch.setattr(settings, "WEAVIATE_PORT", parsed.port or 80)
+    monkeypatch.setattr(settings, "WEAVIATE_CLASS_NAME", f"ParityTest{uuid.uuid4().hex[:8]}")
+    monkeypatch.setattr(settings, "WRITE_FLUSH_INTERVAL", 0.01)
+    service = WeaviateService()
+    yield service
+    service.client.schema.delete_class(settings.WEAVIATE_CLASS_NAME)
+
+
+def run(service, scenario):
+    async def main():
+        try:
+            return await scenario()
+        finally:
+            await service.close()
+    return asyncio.run(main())
+
+
+async def store(service, message, vector, mode="edit"):
+    stored = await service.store(StoreRequest(
+        message=message,
+        response={"long_version": f"Long {message}", "short_version": f"Short {message}"},
+        mode=mode,
+        vector=vector
+    ))
+    await service.flush()
+    return stored
+
+
+def test_nearest_hits_above_threshold_best_first(service):
+    async def scenario():
+        a = await store(service, "first message", A)
+        b = await store(service, "second message", B)
+        await store(service, "unrelated message", C)
+        hits = await service.search("query", "edit", threshold=0.5, vector=A, lexical_shortcut=False)
+        return a, b, hits
+
+    a, b, hits = run(service, scenario)
+
+    assert [hit.id for hit in hits] == [a.id, b.id]
+    assert [hit.score for hit in hits] == [pytest.approx(1.0, abs=1e-3), pytest.approx(0.8, abs=1e-3)]
+    assert hits[1].response["short_version"] == "Short second message"
+    assert hits[1].mode == "edit"
+
+
+def test_search_only_returns_the_requested_mode(service):
+    async def scenario():
+        await store(service, "rewrite me", A, mode="edit")
+        analyzed = await store(service, "analyze me", B, mode="analyze")
+        return analyzed, await service.search("query", "analyze", threshold=0.5, vector=A, lexical_shortcut=False)
+
+    analyzed, hits = run(service, scenario)
+
+    assert [hit.id for hit in hits] == [analyzed.id]
+
+
+def test_offset_pages_through_hits(service):
+    async def scenario():
+        await store(service, "first message", A)
+        b = await store(service, "second message", B)
+        page = await service.search("query", "edit", threshold=0.5, limit=1, offset=1, vector=A, lexical_shortcut=False)
+        return b, page
+
+    b, page = run(service, scenario)
+
+    assert [hit.id for hit in page] == [b.id]
+
+
+def test_verbatim_message_short_circuits(service):
+    async def scenario():
+        stored = await store(service, "Hello there", A)
+        found = await service.search("  hello   THERE ", "edit", threshold=0.99, vector=A, lexical_shortcut=True)
+        # A verbatim repeat is scored like any hit; a distant vector misses the threshold
+        distant = await service.search("  hello   THERE ", "edit", threshold=0.99, vector=C, lexical_shortcut=True)
+        return stored, found, distant
+
+    stored, found, distant = run(service, scenario)
+
+    assert [hit.id for hit in found] == [stored.id]
+    assert found[0].score == pytest.approx(1.0)
+    assert distant == []
+
+
+def test_feedback_is_returned_with_later_hits(service):
+    async def scenario():
+        stored = await store(service, "first message", A)
+        updated = await service.update_feedback(stored.id, True)
+        missing = await service.update_feedback(str(uuid.uuid4()), True)
+        hits = await service.search("query", "edit", threshold=0.5, vector=A, lexical_shortcut=False)
+        return updated, missing, hits
+
+    updated, missing, hits = run(service, scenario)
+
+    assert updated is True
+    assert missing is False
+    assert hits[0].feedback == "positive"
+
+
+def test_objects_stored_before_modes_are_backfilled(monkeypatch):
+    url = os.environ.get("WEAVIATE_TEST_URL")
+    if not url:
+        pytest.skip("WEAVIATE_TEST_URL is not set")
+    import weaviate
+    from app.services.weaviate_service import WeaviateService
+    parsed = urlparse(url)
+    class_name = f"ParityTest{uuid.uuid4().hex[:8]}"
+    monkeypatch.setattr(settings, "WEAVIATE_HOST", parsed.hostname)
+    monkeypatch.setattr(settings, "WEAVIATE_PORT", parsed.port or 80)
+    monkeypatch.setattr(settings, "WEAVIATE_CLASS_NAME", class_name)
+    monkeypatch.setattr(settings, "VECTORIZER", "weaviate")
+    monkeypatch.setattr(settings, "SEARCH_RECALL_SAMPLE_RATE", 0.0)
+    client = weaviate.Client(url)
+    client.schema.create_class({
+        "class": class_name,
+        "vectorizer": "none",
+        "properties": [
+            {"name": "message", "dataType": ["text"]},
+            {"name": "analysis_json", "dataType": ["text"]}
+        ]
+    })
+    analyzed = client.data_object.create({"message": "old analysis", "analysis_json": '{"tone": "calm"}'}, class_name, vector=A)
+    edited = client.data_object.create({"message": "old rewrite", "analysis_json": "{}"}, class_name, vector=A)
+
+    service = WeaviateService()
+    try:
+        hits = run(service, lambda: asyncio.gather(
+            service.search("query", "analyze", threshold=0.5, vector=A, lexical_shortcut=False),
+            service.search("query", "edit", threshold=0.5, vector=A, lexical_shortcut=False)
+        ))
+    finally:
+        client.schema.delete_class(class_name)
+
+    assert [[hit.id for hit in mode_hits] for mode_hits in hits] == [[analyzed], [edited]]
@@ -0,0 +1,96 @@
+import asyncio
+import os
+
+import pytest
+
+from app.core.config import settings
+from app.models.schemas import StoreRequest
+
+pytest.importorskip("faiss")
+
+from app.services.faiss_service import FaissService
+
+
+@pytest.fixture(autouse=True)
+def faiss_settings(monkeypatch):
+    monkeypatch.setattr(settings, "VECTORIZER", "weaviate")
+    monkeypatch.setattr(settings, "SEARCH_STRATEGY", "vector")
+    monkeypatch.setattr(settings, "SEARCH_RECALL_SAMPLE_RATE", 0.0)
+
+
+def request(message, vector, mode="edit"):
+    return StoreRequest(message=message, response={"long_version": message}, mode=mode, vector=vector)
+
+
+def vector(i, dim=8):
+    return [1.0 if j == i else 0.1 for j in range(dim)]
+
+
+def test_restart_loads_snapshot_and_replays_later_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "FAISS_SNAPSHOT_EVERY", 3)
+
+    async def fill():
+        service = FaissService(str(tmp_path))
+        ids = [(await service.store(request(f"Message {i}", vector(i)))).id for i in range(5)]
+        # No close(): rows 3 and 4 are only in the vector file, as after a crash
+        return ids
+
+    ids = asyncio.run(fill())
+    assert os.listdir(tmp_path / "snapshots") == ["edit.2.faiss"]
+
+    async def reopen():
+        service = FaissService(str(tmp_path))
+        hits = [await service.search("query", "edit", threshold=0.9, vector=vector(i), lexical_shortcut=False) for i in range(5)]
+        await service.close()
+        return service, hits
+
+    service, hits = asyncio.run(reopen())
+
+    assert [found[0].id for found in hits] == ids
+    assert service.metrics()["indexes"] == {"edit": 5}
+    assert os.listdir(tmp_path / "snapshots") == ["edit.4.faiss"]
+
+
+def test_vectors_are_required_without_local_model(tmp_path):
+    service = FaissService(str(tmp_path))
+
+    async def run():
+        await service.store(request("Message", vector(0)))
+        with pytest.raises(ValueError):
+            await service.store(request("Other", None))
+        with pytest.raises(ValueError):
+            await service.search("query", "edit", vector=vector(0, dim=4))
+        with pytest.raises(ValueError):
+            await service.search("query", "edit", strategy="bm25")
+
+    asyncio.run(run())
+
+
+class FakeEmbedder:
+    async def embed(self, text):
+        return [float(len(text)), 1.0, 0.0]
+
+    async def embed_many(self, texts):
+        return [await self.embed(text) for text in texts]
+
+    def metrics(self):
+        return {}
+
+
+def test_revectorize_rebuilds_indexes_with_new_dimension(tmp_path):
+    service = FaissService(str(tmp_path))
+
+    async def run():
+        stored = await service.store(request("Message", vector(0)))
+        service.embedder = FakeEmbedder()
+        service.start_revectorize()
+        await service._revectorize_task
+        hits = await service.search("Other text", "edit", threshold=0.99, lexical_shortcut=False)
+        await service.close()
+        return stored, hits
+
+    stored, hits = asyncio.run(run())
+
+    assert service.dim == 3
+    assert service.revectorize_status == {"running": False, "processed": 1, "error": None}
+    assert [hit.id for hit in hits] == [stored.id]